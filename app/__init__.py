@@ -185,7 +185,6 @@ def create_app(config_class=Config):
     from .models import User  # noqa: F401
     from .auth.utils import has_role
     from flask_login import current_user
-    from app.models import Notification
 
     @login_manager.user_loader
     def load_user(user_id):
@@ -207,42 +206,41 @@ def create_app(config_class=Config):
             "route_exists": _route_exists,
         }
 
-    @app.context_processor
-    def inject_notif_unread():
-        if getattr(current_user, "is_authenticated", False):
-            count = Notification.query.filter(
-                Notification.user_id == current_user.id,
-                Notification.read_at.is_(None),
-            ).count()
-            return {"notif_unread": count}
-        return {"notif_unread": 0}
-
     @app.context_processor
     def inject_notifications():
         from app.models import Notification as NotificationModel
-
-        if getattr(current_user, "is_authenticated", False):
-            notifs = (
+        from sqlalchemy.orm import undefer
+
+        poll_seconds = int(app.config.get("NOTIFICATION_POLL_SECONDS") or 0)
+        if not getattr(current_user, "is_authenticated", False):
+            return {"notifications": [], "notif_unread": 0, "notification_poll_seconds": 0}
+        unread = (
+            NotificationModel.query
+            .filter(
+                NotificationModel.user_id == current_user.id,
+                NotificationModel.read_at.is_(None),
+            )
+            .count()
+        )
+        ctx = {"notif_unread": unread, "notification_poll_seconds": poll_seconds}
+        if poll_seconds <= 0:
+            # Zonder polling vult de server de bel bij elke render
+            ctx["notifications"] = (
                 NotificationModel.query
+                .options(undefer(NotificationModel.payload))
                 .filter(NotificationModel.user_id == current_user.id)
                 .order_by(NotificationModel.created_at.desc())
                 .limit(10)
                 .all()
             )
-            unread = (
-                NotificationModel.query
-                .filter(
-                    NotificationModel.user_id == current_user.id,
-                    NotificationModel.read_at.is_(None),
-                )
-                .count()
-            )
-            return {"notifications": notifs, "notif_unread": unread}
-        return {"notifications": [], "notif_unread": 0}
+        return ctx
 
     @app.context_processor
     def inject_griffie_counts():
         from app.models import Motie
+        # Met polling komen deze tellingen via het statusendpoint binnen
+        if app.config.get("NOTIFICATION_POLL_SECONDS"):
+            return {}
         try:
             if hasattr(current_user, 'role') and (current_user.has_role('griffie') or current_user.has_role('superadmin')):
                 advice_count = Motie.query.filter(Motie.status.ilike('Advies griffie')).count()
@@ -409,6 +407,8 @@ def create_app(config_class=Config):
 
     # Registreer tenant-scoping events na app-initialisatie
     _register_tenant_scoping_events()
+    from .dashboard.rollup import register_rollup_events
+    register_rollup_events()
     _register_error_handlers(app)
 
     # CLI-commando's registreren op dezelfde app-instantie (voorkomt dubbele context)
@@ -512,9 +512,11 @@ def _register_tenant_scoping_events():
             return
         try:
             from app.models import (
-                Motie, User, Party, MotieShare, Notification, AdviceSession, MotieVersion, DashboardLayout
+                Motie, User, Party, MotieShare, Notification, AdviceSession, MotieVersion, DashboardLayout,
+                ExportJob,
             )
-            for model in (Motie, User, Party, MotieShare, Notification, AdviceSession, MotieVersion, DashboardLayout):
+            for model in (Motie, User, Party, MotieShare, Notification, AdviceSession, MotieVersion, DashboardLayout,
+                          ExportJob):
                 execute_state.statement = execute_state.statement.options(
                     with_loader_criteria(model, lambda cls: cls.tenant_id == tenant.id, include_aliases=True)
                 )
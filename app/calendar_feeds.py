@@ -0,0 +1,495 @@
+"""Externe vergaderagenda's: ICS-feeds per tenant, op de achtergrond ververst.
+
+Het dashboard leest alleen uit ``calendar_event``. Een feed wordt opnieuw opgehaald als de
+laatste controle ouder is dan ``CALENDAR_REFRESH_SECONDS``; dat gebeurt in een
+achtergrondthread (of met ``flask refresh-calendars`` vanuit cron), met ``If-None-Match`` /
+``If-Modified-Since`` zodat een ongewijzigde feed alleen een 304 kost. Welke feeds een tenant
+heeft volgt uit de settings van de request-tenant (in productie die uit het tenantregister);
+het dashboard geeft die mee aan de verversing, cron ververst de feeds die zo geregistreerd zijn.
+
+De parser leest de feed regel voor regel van de verbinding, plakt gevouwen regels aan elkaar,
+rekent TZID/UTC-tijden om naar ``CALENDAR_TIMEZONE`` en klapt RRULE's uit binnen de horizon
+(EXDATE en losse RECURRENCE-ID-uitzonderingen worden gerespecteerd).
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil.rrule import rrulestr
+from flask import current_app
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.orm import contains_eager
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Motio/1.0 (agenda)"
+MAX_FEED_BYTES = 20 * 1024 * 1024
+MAX_OCCURRENCES = 500  # per herhalende afspraak binnen de horizon
+MAX_EVENTS_PER_FEED = 5000
+_CHECK_INTERVAL = 60.0  # seconden tussen twee verversingscontroles per tenant, per proces
+
+# Veelvoorkomende Windows-tijdzonenamen (Outlook/Exchange-feeds)
+_WINDOWS_TZ = {
+    "W. Europe Standard Time": "Europe/Amsterdam",
+    "Romance Standard Time": "Europe/Brussels",
+    "Central Europe Standard Time": "Europe/Budapest",
+    "GMT Standard Time": "Europe/London",
+    "UTC": "UTC",
+}
+
+
+# ---- parser ----------------------------------------------------------------------
+
+def iter_unfolded_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Logische ICS-regels uit ruwe regels: vervolgregels (beginnend met spatie/tab) horen bij de vorige."""
+    current: str | None = None
+    for raw in chunks:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """``NAAM;PARAM=waarde;...:waarde`` -> (NAAM, {PARAM: waarde}, waarde); let op quotes in parameters."""
+    in_quotes = False
+    split_at = -1
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == ":" and not in_quotes:
+            split_at = i
+            break
+    if split_at < 0:
+        return line.upper(), {}, ""
+    head, value = line[:split_at], line[split_at + 1:]
+    parts = re.findall(r'(?:[^;"]|"[^"]*")+', head)
+    name = parts[0].upper() if parts else ""
+    params = {}
+    for part in parts[1:]:
+        key, _, val = part.partition("=")
+        params[key.upper()] = val.strip('"')
+    return name, params, value
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def iter_vevents(lines: Iterable[str]) -> Iterator[Dict[str, List[Tuple[Dict[str, str], str]]]]:
+    """Eén dict per VEVENT: eigenschap -> [(parameters, waarde), ...]; VALARM e.d. worden overgeslagen."""
+    event: Dict[str, List[Tuple[Dict[str, str], str]]] | None = None
+    depth = 0
+    for line in lines:
+        name, params, value = parse_content_line(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT":
+                event, depth = {}, 0
+            elif event is not None:
+                depth += 1
+        elif name == "END":
+            if value.upper() == "VEVENT" and event is not None:
+                yield event
+                event = None
+            elif event is not None:
+                depth -= 1
+        elif event is not None and depth == 0:
+            event.setdefault(name, []).append((params, value))
+
+
+def _zone(tzid: str | None, default: ZoneInfo) -> ZoneInfo:
+    if not tzid:
+        return default
+    tzid = _WINDOWS_TZ.get(tzid, tzid).lstrip("/")
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        return default
+
+
+def parse_ics_datetime(value: str, params: Dict[str, str], local: ZoneInfo) -> Tuple[datetime, bool]:
+    """(tijdstip met tijdzone, hele dag?). Datums krijgen middernacht in ``local``; 'zwevende'
+    tijden zonder TZID worden als lokale tijd gelezen."""
+    value = value.strip()
+    if params.get("VALUE", "").upper() == "DATE" or (len(value) == 8 and value.isdigit()):
+        day = datetime.strptime(value[:8], "%Y%m%d")
+        return day.replace(tzinfo=local), True
+    moment = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return moment.replace(tzinfo=timezone.utc), False
+    return moment.replace(tzinfo=_zone(params.get("TZID"), local)), False
+
+
+_DURATION_RE = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def parse_duration(value: str) -> timedelta | None:
+    m = _DURATION_RE.match(value.strip().upper())
+    if not m:
+        return None
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == "-" else delta
+
+
+def _first(event, name):
+    values = event.get(name)
+    return values[0] if values else (None, None)
+
+
+def _local_naive(moment: datetime, local: ZoneInfo) -> datetime:
+    return moment.astimezone(local).replace(tzinfo=None)
+
+
+def expand_events(vevents: Iterable[Dict[str, Any]], window_start: datetime, window_end: datetime,
+                  local: ZoneInfo) -> List[Dict[str, Any]]:
+    """Zet VEVENTs om naar rijen voor ``calendar_event`` binnen [window_start, window_end).
+
+    ``window_start``/``window_end`` zijn naïeve lokale tijden. Herhalingen worden in de
+    tijdzone van de afspraak zelf uitgerekend, zodat 19:30 ook na de zomertijdwissel 19:30 blijft.
+    """
+    masters = []
+    overridden: set[tuple[str, datetime]] = set()
+    rows: List[Dict[str, Any]] = []
+
+    def _row(uid, start, end, all_day, event):
+        return {
+            "uid": (uid or "")[:255] or None,
+            "start": start,
+            "end": end,
+            "all_day": all_day,
+            "summary": (_unescape(_first(event, "SUMMARY")[1] or "") or None),
+            "location": (_unescape(_first(event, "LOCATION")[1] or "") or None),
+            "url": (_first(event, "URL")[1] or None),
+        }
+
+    def _in_window(start, end):
+        return start < window_end and (end or start) >= window_start
+
+    for event in vevents:
+        params, value = _first(event, "DTSTART")
+        if not value:
+            continue
+        try:
+            start, all_day = parse_ics_datetime(value, params, local)
+        except ValueError:
+            continue
+        end = None
+        end_params, end_value = _first(event, "DTEND")
+        if end_value:
+            try:
+                end, _ = parse_ics_datetime(end_value, end_params, local)
+            except ValueError:
+                end = None
+        if end is None:
+            duration = parse_duration(_first(event, "DURATION")[1] or "")
+            if duration is not None:
+                end = start + duration
+        uid = _first(event, "UID")[1]
+
+        rid_params, rid_value = _first(event, "RECURRENCE-ID")
+        if rid_value:
+            try:
+                rid, _ = parse_ics_datetime(rid_value, rid_params, local)
+                overridden.add((uid, _local_naive(rid, local)))
+            except ValueError:
+                pass
+            status = (_first(event, "STATUS")[1] or "").upper()
+            if status != "CANCELLED":
+                s, e = _local_naive(start, local), _local_naive(end, local) if end else None
+                if _in_window(s, e):
+                    rows.append(_row(uid, s, e, all_day, event))
+            continue
+        if (_first(event, "STATUS")[1] or "").upper() == "CANCELLED":
+            continue
+        masters.append((event, uid, start, end, all_day))
+
+    for event, uid, start, end, all_day in masters:
+        duration = end - start if end else None
+        rule = _first(event, "RRULE")[1]
+        if not rule:
+            s = _local_naive(start, local)
+            e = _local_naive(end, local) if end else None
+            if _in_window(s, e):
+                rows.append(_row(uid, s, e, all_day, event))
+            continue
+
+        excluded = set()
+        for ex_params, ex_value in event.get("EXDATE", []):
+            for part in ex_value.split(","):
+                try:
+                    excluded.add(_local_naive(parse_ics_datetime(part, ex_params, local)[0], local))
+                except ValueError:
+                    continue
+        try:
+            # Herhalen in de eigen tijdzone van DTSTART (wandkloktijd blijft gelijk over DST heen)
+            tz = start.tzinfo
+            recurrence = rrulestr(rule, dtstart=start, ignoretz=False, forceset=True)
+            lower = window_start.replace(tzinfo=local).astimezone(tz) - (duration or timedelta(0))
+            upper = window_end.replace(tzinfo=local).astimezone(tz)
+            occurrences = []
+            for occurrence in recurrence.xafter(lower, count=MAX_OCCURRENCES, inc=True):
+                if occurrence >= upper:
+                    break
+                occurrences.append(occurrence)
+        except (ValueError, TypeError):
+            logger.info("Agenda: RRULE %r van %s niet te verwerken; alleen de eerste keer getoond", rule, uid)
+            occurrences = [start]
+        for occurrence in occurrences:
+            s = _local_naive(occurrence, local)
+            if s in excluded or (uid, s) in overridden:
+                continue
+            e = _local_naive(occurrence + duration, local) if duration is not None else None
+            if _in_window(s, e):
+                rows.append(_row(uid, s, e, all_day, event))
+    rows.sort(key=lambda r: r["start"])
+    return rows[:MAX_EVENTS_PER_FEED]
+
+
+# ---- feeds per tenant ------------------------------------------------------------
+
+def configured_feeds(tenant) -> List[Tuple[str, str]]:
+    """(naam, url) van alle feeds van een tenant: tenant.settings["calendar_feeds"] + de globale feed."""
+    feeds: List[Tuple[str, str]] = []
+    settings = (getattr(tenant, "settings", None) or {}) if tenant is not None else {}
+    for entry in settings.get("calendar_feeds") or []:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        url = (entry.get("url") or "").strip() if isinstance(entry, dict) else ""
+        if url:
+            feeds.append(((entry.get("naam") or "Vergaderingen").strip()[:120], url))
+    legacy = current_app.config.get("HAARLEM_MEETINGS_ICS")
+    if legacy and all(url != legacy for _naam, url in feeds):
+        feeds.append(("Gemeenteraad Haarlem", legacy))
+    return feeds
+
+
+def sync_feeds(tenant_id: int | None, configured: List[Tuple[str, str]]) -> None:
+    """Zorg dat er precies één actieve ``CalendarFeed`` is per geconfigureerde URL."""
+    from app.models import CalendarFeed
+
+    t = CalendarFeed.__table__
+    tenant_cond = t.c.tenant_id.is_(None) if tenant_id is None else t.c.tenant_id == tenant_id
+    existing = {row.url: row for row in db.session.execute(select(t.c.id, t.c.url, t.c.naam, t.c.actief).where(tenant_cond))}
+    wanted = dict((url, naam) for naam, url in configured)
+    for url, naam in wanted.items():
+        row = existing.get(url)
+        if row is None:
+            db.session.execute(insert(t).values(
+                tenant_id=tenant_id, naam=naam, url=url, actief=True, created_at=datetime.utcnow(),
+            ))
+        elif row.naam != naam or not row.actief:
+            db.session.execute(update(t).where(t.c.id == row.id).values(naam=naam, actief=True))
+    gone = [row.id for url, row in existing.items() if url not in wanted and row.actief]
+    if gone:
+        db.session.execute(update(t).where(t.c.id.in_(gone)).values(actief=False))
+    db.session.commit()
+
+
+def _claim_feed(feed_id: int, stale_before: datetime | None) -> bool:
+    """Zet checked_at; slaagt voor één worker per verversingsronde."""
+    from app.models import CalendarFeed
+
+    t = CalendarFeed.__table__
+    stmt = update(t).where(t.c.id == feed_id).values(checked_at=datetime.utcnow())
+    if stale_before is not None:
+        stmt = stmt.where(or_(t.c.checked_at.is_(None), t.c.checked_at < stale_before))
+    claimed = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def refresh_feed(feed_id: int, *, force: bool = False) -> str:
+    """Ververs één feed. Geeft 'updated', 'not_modified', 'skipped' of 'error' terug."""
+    from app.models import CalendarEvent, CalendarFeed
+
+    cfg = current_app.config
+    refresh_seconds = int(cfg.get("CALENDAR_REFRESH_SECONDS") or 900)
+    now = datetime.utcnow()
+    if not _claim_feed(feed_id, None if force else now - timedelta(seconds=refresh_seconds)):
+        return "skipped"
+    feed = db.session.get(CalendarFeed, feed_id)
+    local = _zone(cfg.get("CALENDAR_TIMEZONE") or "Europe/Amsterdam", ZoneInfo("UTC"))
+
+    request = urllib.request.Request(feed.url, headers={"User-Agent": USER_AGENT, "Accept": "text/calendar"})
+    if feed.etag:
+        request.add_header("If-None-Match", feed.etag)
+    if feed.last_modified:
+        request.add_header("If-Modified-Since", feed.last_modified)
+
+    today = datetime.now(local).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    window_end = today + timedelta(days=int(cfg.get("CALENDAR_HORIZON_DAYS") or 180))
+    try:
+        with urllib.request.urlopen(request, timeout=float(cfg.get("CALENDAR_FETCH_TIMEOUT") or 10)) as resp:
+            def _limited():
+                total = 0
+                for chunk in resp:
+                    total += len(chunk)
+                    if total > MAX_FEED_BYTES:
+                        raise ValueError(f"feed groter dan {MAX_FEED_BYTES} bytes")
+                    yield chunk
+            rows = expand_events(iter_vevents(iter_unfolded_lines(_limited())), today - timedelta(days=1), window_end, local)
+            etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304:
+            feed.fetched_at, feed.error = now, None
+            db.session.commit()
+            return "not_modified"
+        return _fail(feed, f"HTTP {exc.code}")
+    except (urllib.error.URLError, OSError, ValueError) as exc:
+        return _fail(feed, str(exc) or exc.__class__.__name__)
+
+    e = CalendarEvent.__table__
+    db.session.execute(delete(e).where(e.c.feed_id == feed.id))
+    if rows:
+        db.session.execute(insert(e), [{**row, "tenant_id": feed.tenant_id, "feed_id": feed.id} for row in rows])
+    feed.etag, feed.last_modified = (etag or "")[:255] or None, (last_modified or "")[:64] or None
+    feed.fetched_at, feed.error = now, None
+    db.session.commit()
+    logger.info("Agenda %s ververst: %s afspraken", feed.url, len(rows))
+    return "updated"
+
+
+def _fail(feed, message: str) -> str:
+    logger.info("Agenda %s ophalen mislukt: %s", feed.url, message)
+    feed.error = message[:1000]
+    db.session.commit()
+    return "error"
+
+
+def _active_feed_ids(tenant_id: int | None) -> List[int]:
+    from app.models import CalendarFeed
+
+    t = CalendarFeed.__table__
+    tenant_cond = t.c.tenant_id.is_(None) if tenant_id is None else t.c.tenant_id == tenant_id
+    return list(db.session.execute(select(t.c.id).where(tenant_cond, t.c.actief.is_(True))).scalars())
+
+
+def refresh_tenant_calendars(tenant_id: int | None, feeds: List[Tuple[str, str]] | None = None, *,
+                             force: bool = False) -> Dict[str, int]:
+    """Ververs de actieve feeds van één tenant.
+
+    ``feeds`` is de configuratie (``configured_feeds``) van de tenant zoals het request die
+    kent; de feedtabel wordt daar eerst mee gelijkgetrokken. Zonder ``feeds`` (cron) worden
+    alleen de al geregistreerde feeds ververst, zodat een job zonder request-tenant de
+    configuratie niet met een andere bron overschrijft. Zonder tenant geldt de globale feed.
+    """
+    if feeds is None and tenant_id is None:
+        feeds = configured_feeds(None)
+    if feeds is not None:
+        sync_feeds(tenant_id, feeds)
+    results: Dict[str, int] = {}
+    for feed_id in _active_feed_ids(tenant_id):
+        outcome = refresh_feed(feed_id, force=force)
+        results[outcome] = results.get(outcome, 0) + 1
+    return results
+
+
+def refresh_all_calendars(*, force: bool = False) -> Dict[str, int]:
+    """Alle geregistreerde feeds van alle tenants (voor cron of een aparte worker)."""
+    from app.models import CalendarFeed
+
+    t = CalendarFeed.__table__
+    tenant_ids = set(db.session.execute(select(t.c.tenant_id).where(t.c.actief.is_(True)).distinct()).scalars())
+    tenant_ids.add(None)
+    totals: Dict[str, int] = {}
+    for tenant_id in tenant_ids:
+        for outcome, count in refresh_tenant_calendars(tenant_id, force=force).items():
+            totals[outcome] = totals.get(outcome, 0) + count
+    return totals
+
+
+# ---- achtergrond + lezen --------------------------------------------------------
+
+_inflight: set = set()
+_inflight_lock = threading.Lock()
+_last_check: Dict[Any, float] = {}
+
+
+def _needs_refresh(tenant_id: int | None, feeds: List[Tuple[str, str]]) -> bool:
+    from app.models import CalendarFeed
+
+    t = CalendarFeed.__table__
+    tenant_cond = t.c.tenant_id.is_(None) if tenant_id is None else t.c.tenant_id == tenant_id
+    registered = db.session.execute(select(t.c.url, t.c.checked_at).where(tenant_cond, t.c.actief.is_(True))).all()
+    if {url for url, _ in registered} != {url for _naam, url in feeds}:
+        return True
+    stale_before = datetime.utcnow() - timedelta(seconds=int(current_app.config.get("CALENDAR_REFRESH_SECONDS") or 900))
+    return any(checked_at is None or checked_at < stale_before for _url, checked_at in registered)
+
+
+def schedule_refresh(tenant_id: int | None, feeds: List[Tuple[str, str]]) -> None:
+    """Start een verversing op de achtergrond als de feeds van deze tenant verouderd zijn.
+
+    ``tenant_id`` is het (integer) id waaronder de afspraken staan en ``feeds`` de
+    configuratie van de request-tenant (``configured_feeds(g.tenant)``); de thread krijgt
+    beide mee en laadt de tenant niet opnieuw. Kijkt hooguit eens per ``_CHECK_INTERVAL``
+    seconden per tenant; een lopende verversing wordt niet nog eens gestart.
+    """
+    if time.monotonic() - _last_check.get(tenant_id, 0.0) < _CHECK_INTERVAL:
+        return
+    _last_check[tenant_id] = time.monotonic()
+    if not _needs_refresh(tenant_id, feeds):
+        return
+    with _inflight_lock:
+        if tenant_id in _inflight:
+            return
+        _inflight.add(tenant_id)
+    app = current_app._get_current_object()
+    feeds = list(feeds)
+
+    def _run():
+        try:
+            with app.app_context():
+                try:
+                    refresh_tenant_calendars(tenant_id, feeds)
+                finally:
+                    db.session.remove()
+        except Exception:
+            logger.warning("Agenda's van tenant %s verversen mislukt", tenant_id, exc_info=True)
+        finally:
+            with _inflight_lock:
+                _inflight.discard(tenant_id)
+
+    threading.Thread(target=_run, name="calendar-refresh", daemon=True).start()
+
+
+def upcoming_events(tenant_id: int | None, limit: int = 5, now: datetime | None = None):
+    """De eerstvolgende afspraken uit de actieve feeds van een tenant (alleen uit de database)."""
+    from app.models import CalendarEvent, CalendarFeed
+
+    if now is None:
+        local = _zone(current_app.config.get("CALENDAR_TIMEZONE"), ZoneInfo("UTC"))
+        now = datetime.now(local).replace(tzinfo=None)
+    tenant_cond = CalendarEvent.tenant_id.is_(None) if tenant_id is None else CalendarEvent.tenant_id == tenant_id
+    return db.session.execute(
+        select(CalendarEvent)
+        .join(CalendarEvent.feed)
+        .options(contains_eager(CalendarEvent.feed))
+        .where(
+            tenant_cond,
+            CalendarFeed.actief.is_(True),
+            or_(
+                CalendarEvent.start >= now,
+                CalendarEvent.all_day.is_(True) & (CalendarEvent.start >= datetime.combine(now.date(), datetime.min.time())),
+            ),
+        )
+        .order_by(CalendarEvent.start.asc(), CalendarEvent.id.asc())
+        .limit(limit)
+    ).scalars().all()
@@ -55,8 +55,113 @@ class Config:
 
     # Application settings
     APP_NAME = "Motio"
+    # Publieke basis-URL voor links in mails die buiten een request worden opgebouwd (CLI-jobs).
+    # Heeft de tenant van de ontvanger een domein in tenant_domain, dan wordt die host gebruikt
+    # (met het schema van deze URL); dit is de terugval.
+    APP_BASE_URL = os.environ.get("APP_BASE_URL") or "http://localhost:5000"
     GEMEENTE_NAAM = os.environ.get("GEMEENTE_NAAM") or "[GEMEENTE NAAM]"
 
+    # Notificaties: gelezen notificaties ouder dan dit aantal dagen gaan naar het archief
+    try:
+        NOTIFICATION_RETENTION_DAYS = int(os.environ.get("NOTIFICATION_RETENTION_DAYS", "90") or "90")
+    except ValueError:
+        NOTIFICATION_RETENTION_DAYS = 90
+
+    # De bel en badge ververst de browser door periodiek een goedkoop statusendpoint op te
+    # vragen; 0 = alleen bij het laden van de pagina (bel wordt dan server-side gevuld).
+    try:
+        NOTIFICATION_POLL_SECONDS = int(os.environ.get("NOTIFICATION_POLL_SECONDS", "60") or "60")
+    except ValueError:
+        NOTIFICATION_POLL_SECONDS = 60
+
+    # Bulk-export van moties (DOCX in ZIP). 0 processen = renderen in de request-thread.
+    try:
+        EXPORT_BULK_MAX = int(os.environ.get("EXPORT_BULK_MAX", "1000") or "1000")
+        EXPORT_RENDER_PROCESSES = int(os.environ.get("EXPORT_RENDER_PROCESSES", "2") or "2")
+    except ValueError:
+        EXPORT_BULK_MAX = 1000
+        EXPORT_RENDER_PROCESSES = 2
+
+    # Renderer voor bulk-exports (ZIP, exportjobs, vergaderbundel): "native" vult een
+    # voorgecompileerd sjabloon met lxml, "docxtpl" rendert via Jinja. Losse exports blijven docxtpl.
+    # Pariteit met docxtpl: tests/test_docx_renderers.py en flask check-docx-renderer.
+    EXPORT_BULK_RENDERER = os.environ.get("EXPORT_BULK_RENDERER", "native")
+
+    # Cache van gerenderde DOCX-bestanden, gedeeld door alle workers. Leeg = <instance>/docx_cache;
+    # EXPORT_CACHE_MAX_BYTES=0 zet de cache uit.
+    EXPORT_CACHE_DIR = os.environ.get("EXPORT_CACHE_DIR") or None
+    try:
+        EXPORT_CACHE_MAX_BYTES = int(os.environ.get("EXPORT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)) or "0")
+    except ValueError:
+        EXPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+    # Resultaten van jaarplanning-uploads (uitvoer + vorige run voor het wijzigingenoverzicht).
+    # Leeg = <instance>/jaarplanning_cache; JAARPLANNING_CACHE_MAX_BYTES=0 zet de cache uit.
+    JAARPLANNING_CACHE_DIR = os.environ.get("JAARPLANNING_CACHE_DIR") or None
+    try:
+        JAARPLANNING_CACHE_MAX_BYTES = int(os.environ.get("JAARPLANNING_CACHE_MAX_BYTES", str(128 * 1024 * 1024)) or "0")
+    except ValueError:
+        JAARPLANNING_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+    # Spreektijden-PDF's (los en per vergaderweek). Leeg = <instance>/spreektijden_cache;
+    # SPREEKTIJDEN_CACHE_MAX_BYTES=0 zet de cache uit.
+    SPREEKTIJDEN_CACHE_DIR = os.environ.get("SPREEKTIJDEN_CACHE_DIR") or None
+    try:
+        SPREEKTIJDEN_CACHE_MAX_BYTES = int(os.environ.get("SPREEKTIJDEN_CACHE_MAX_BYTES", str(32 * 1024 * 1024)) or "0")
+    except ValueError:
+        SPREEKTIJDEN_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+    # Exportjobs op de achtergrond: resultaat-ZIP's in EXPORT_JOB_DIR (leeg = <instance>/export_jobs)
+    EXPORT_JOB_DIR = os.environ.get("EXPORT_JOB_DIR") or None
+    try:
+        EXPORT_JOB_WORKERS = int(os.environ.get("EXPORT_JOB_WORKERS", "1") or "1")
+    except ValueError:
+        EXPORT_JOB_WORKERS = 1
+    # 'flask run-export-jobs' zet jobs die langer dan STALE_MINUTES op 'running' staan (worker
+    # gestopt of herstart) op mislukt, en ruimt afgeronde jobs plus hun ZIP na RETENTION_HOURS op.
+    try:
+        EXPORT_JOB_STALE_MINUTES = int(os.environ.get("EXPORT_JOB_STALE_MINUTES", "60") or "60")
+        EXPORT_JOB_RETENTION_HOURS = int(os.environ.get("EXPORT_JOB_RETENTION_HOURS", "24") or "24")
+    except ValueError:
+        EXPORT_JOB_STALE_MINUTES = 60
+        EXPORT_JOB_RETENTION_HOURS = 24
+
+    # Dashboardwidgets worden los geladen; hun resultaat blijft zo lang per gebruiker bewaard (0 = uit)
+    try:
+        DASHBOARD_WIDGET_TTL = int(os.environ.get("DASHBOARD_WIDGET_TTL", "30") or "0")
+    except ValueError:
+        DASHBOARD_WIDGET_TTL = 30
+
+    # Onafhankelijke dashboardqueries tegelijk uitvoeren, elk op een eigen verbinding (0/1 = na elkaar).
+    # Houd dit ruim onder de pool_size van de database-engine.
+    try:
+        DB_QUERY_WORKERS = int(os.environ.get("DB_QUERY_WORKERS", "4") or "0")
+    except ValueError:
+        DB_QUERY_WORKERS = 4
+
+    # Externe vergaderagenda's (ICS). Feeds per tenant staan in tenant.settings["calendar_feeds"]
+    # (lijst van {"naam", "url"}); HAARLEM_MEETINGS_ICS geldt als extra feed voor elke tenant.
+    # Feeds worden op de achtergrond ververst als de laatste controle ouder is dan REFRESH_SECONDS.
+    HAARLEM_MEETINGS_ICS = os.environ.get("HAARLEM_MEETINGS_ICS") or None
+    CALENDAR_TIMEZONE = os.environ.get("CALENDAR_TIMEZONE") or "Europe/Amsterdam"
+    try:
+        CALENDAR_REFRESH_SECONDS = int(os.environ.get("CALENDAR_REFRESH_SECONDS", "900") or "900")
+        CALENDAR_HORIZON_DAYS = int(os.environ.get("CALENDAR_HORIZON_DAYS", "180") or "180")
+        CALENDAR_FETCH_TIMEOUT = float(os.environ.get("CALENDAR_FETCH_TIMEOUT", "10") or "10")
+    except ValueError:
+        CALENDAR_REFRESH_SECONDS = 900
+        CALENDAR_HORIZON_DAYS = 180
+        CALENDAR_FETCH_TIMEOUT = 10.0
+
+    # Partijlogo's voor Word-exports: verkleind opgeslagen, URL-logo's periodiek gerevalideerd
+    PARTY_LOGO_CACHE_DIR = os.environ.get("PARTY_LOGO_CACHE_DIR") or None
+    try:
+        PARTY_LOGO_MAX_PX = int(os.environ.get("PARTY_LOGO_MAX_PX", "300") or "300")
+        PARTY_LOGO_REVALIDATE_SECONDS = int(os.environ.get("PARTY_LOGO_REVALIDATE_SECONDS", "86400") or "86400")
+    except ValueError:
+        PARTY_LOGO_MAX_PX = 300
+        PARTY_LOGO_REVALIDATE_SECONDS = 86400
+
     # Config logo upload
     LOGO_UPLOAD_FOLDER = os.path.join(basedir, "app", "static", "img", "partijen")
     ALLOWED_LOGO_EXTENSIONS = {"png", "jpg", "jpeg", "webp", "svg"}
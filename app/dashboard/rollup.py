@@ -0,0 +1,405 @@
+"""Voorberekende dashboardstatistieken (tabel ``dashboard_rollup``).
+
+Per tenant één rij met statusaantallen, het aantal moties, het opgetelde aantal indieners
+(voor het gemiddelde) en de laatste activiteit. Per gebruiker dezelfde cijfers over de eigen
+moties (indiener of mede-indiener), plus het aantal moties dat met hem of haar gedeeld is;
+die tellen, net als vroeger, los van de tenant van de motie.
+
+Bijwerken gaat in dezelfde transactie als de wijziging zelf:
+  - de tenantrij krijgt in ``after_flush`` deltas uit de attribuuthistorie van ``Motie``
+    (nieuw, verwijderd, andere status, mede-indieners erbij of eraf); een rollback, ook van
+    een savepoint, draait die dus mee terug;
+  - van elke betrokken gebruiker wordt de rij in ``before_commit`` opnieuw uitgerekend, met
+    een paar kleine queries per gebruiker.
+Schrijfpaden die buiten de ORM om gaan (de share-INSERT) melden hun doelen met ``touch_rollup``.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, Tuple
+
+from sqlalchemy import and_, case, distinct, event, func, insert, literal_column, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import attributes
+
+from app import db
+
+_PENDING = "dashboard_rollup_pending"
+_DELETED = "dashboard_rollup_deleted"
+UNKNOWN_STATUS = "Onbekend"
+
+
+def _tenant_cond(column, tenant_id):
+    return column.is_(None) if tenant_id is None else column == tenant_id
+
+
+def _pending(session) -> Dict[str, set]:
+    return session.info.setdefault(
+        _PENDING, {"users": set(), "parties": set(), "moties": set(), "tenants": set()}
+    )
+
+
+def touch_rollup(session=None, *, user_ids: Iterable[int] = (), party_ids: Iterable[int] = (),
+                 motie_ids: Iterable[int] = ()) -> None:
+    """Laat de rijen van deze gebruikers (of partijleden, of betrokkenen bij deze moties)
+    bij de volgende commit opnieuw uitrekenen."""
+    pending = _pending(session or db.session())
+    pending["users"].update(u for u in user_ids if u)
+    pending["parties"].update(p for p in party_ids if p)
+    pending["moties"].update(m for m in motie_ids if m)
+
+
+# ---- uitrekenen ----------------------------------------------------------------
+
+def compute_stats(session, tenant_id: int | None, user_id: int | None = None,
+                  now: datetime | None = None) -> Dict[str, Any]:
+    """Rekent de cijfers voor één rollup-rij uit (tenant als ``user_id`` None is)."""
+    from app.models import Motie, MotieShare, User, motie_medeindieners as mmi
+
+    m = Motie.__table__
+    if user_id is None:
+        cond = [_tenant_cond(m.c.tenant_id, tenant_id)]
+    else:
+        # Eigen moties en shares zonder tenantfilter, zoals de losse dashboardqueries dat
+        # altijd deden; ``tenant_id`` is voor een gebruikersrij alleen informatief
+        cond = [or_(
+            m.c.indiener_id == user_id,
+            m.c.id.in_(select(mmi.c.motie_id).where(mmi.c.user_id == user_id)),
+        )]
+    coauthors = select(func.count()).where(mmi.c.motie_id == m.c.id).scalar_subquery()
+    rows = session.execute(
+        select(
+            m.c.status,
+            func.count(),
+            func.sum(case((m.c.indiener_id.isnot(None), 1), else_=0) + coauthors),
+            func.max(m.c.updated_at),
+        )
+        .where(*cond)
+        .group_by(m.c.status)
+    ).all()
+
+    counts: Dict[str, int] = {}
+    values: Dict[str, Any] = {"indieners_totaal": 0, "laatste_activiteit": None}
+    for status, aantal, indieners, laatste in rows:
+        key = status or UNKNOWN_STATUS
+        counts[key] = counts.get(key, 0) + aantal
+        values["indieners_totaal"] += int(indieners or 0)
+        if laatste and (values["laatste_activiteit"] is None or laatste > values["laatste_activiteit"]):
+            values["laatste_activiteit"] = laatste
+    values["status_counts"] = counts
+    values["motie_count"] = sum(counts.values())
+
+    values["gedeeld_count"], values["gedeeld_verloopt_op"] = 0, None
+    if user_id is not None:
+        s = MotieShare.__table__
+        now = now or datetime.utcnow()
+        partij_id = session.execute(
+            select(User.__table__.c.partij_id).where(User.__table__.c.id == user_id)
+        ).scalar()
+        target = s.c.target_user_id == user_id
+        if partij_id:
+            target = or_(target, s.c.target_party_id == partij_id)
+        gedeeld, verloopt = session.execute(
+            select(func.count(distinct(s.c.motie_id)), func.min(s.c.expires_at)).where(
+                s.c.actief.is_(True),
+                target,
+                or_(s.c.expires_at.is_(None), s.c.expires_at > now),
+            )
+        ).one()
+        values["gedeeld_count"], values["gedeeld_verloopt_op"] = gedeeld or 0, verloopt
+    return values
+
+
+def store_stats(session, tenant_id: int | None, user_id: int | None, values: Dict[str, Any]) -> None:
+    """Schrijf één rollup-rij als upsert, zodat twee gelijktijdige eerste bezoeken niet botsen.
+
+    Postgres en SQLite gebruiken ON CONFLICT DO UPDATE op de partiële unieke indexen van
+    ``DashboardRollup``; overige dialecten doen UPDATE en bij 0 rijen een INSERT in een
+    savepoint, met een tweede UPDATE als iemand anders net eerder was.
+    """
+    from app.models import DashboardRollup
+
+    t = DashboardRollup.__table__
+    values = {**values, "tenant_id": tenant_id, "updated_at": datetime.utcnow()}
+    if user_id is None:
+        where = and_(_tenant_cond(t.c.tenant_id, tenant_id), t.c.user_id.is_(None))
+        target = {"index_elements": [func.coalesce(t.c.tenant_id, literal_column("0"))], "index_where": t.c.user_id.is_(None)}
+    else:
+        where = t.c.user_id == user_id
+        target = {"index_elements": [t.c.user_id], "index_where": t.c.user_id.isnot(None)}
+
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(t).values(user_id=user_id, **values)
+        session.execute(stmt.on_conflict_do_update(**target, set_=values))
+        return
+
+    if session.execute(update(t).where(where).values(**values)).rowcount:
+        return
+    try:
+        with session.begin_nested():
+            session.execute(insert(t).values(user_id=user_id, **values))
+    except IntegrityError:
+        session.execute(update(t).where(where).values(**values))
+
+
+def refresh_users(session, user_ids: Iterable[int]) -> int:
+    from app.models import User
+
+    u = User.__table__
+    ids = [uid for uid in set(user_ids) if uid]
+    if not ids:
+        return 0
+    owners = session.execute(select(u.c.id, u.c.tenant_id).where(u.c.id.in_(ids))).all()
+    for uid, tenant_id in owners:
+        store_stats(session, tenant_id, uid, compute_stats(session, tenant_id, uid))
+    return len(owners)
+
+
+def rebuild_rollup(tenant_id: int | None = None, *, all_tenants: bool = True) -> Tuple[int, int]:
+    """Alle rollup-rijen (of die van één tenant) opnieuw uitrekenen. Geeft (tenants, gebruikers)."""
+    from app.models import DashboardRollup, Motie, Tenant, User
+
+    session = db.session
+    t = DashboardRollup.__table__
+    if all_tenants:
+        session.execute(t.delete())
+        tenant_ids = set(session.execute(select(Tenant.__table__.c.id)).scalars())
+        tenant_ids |= set(session.execute(select(distinct(Motie.__table__.c.tenant_id))).scalars())
+        users = select(User.__table__.c.id)
+    else:
+        session.execute(t.delete().where(_tenant_cond(t.c.tenant_id, tenant_id)))
+        tenant_ids = {tenant_id}
+        users = select(User.__table__.c.id).where(_tenant_cond(User.__table__.c.tenant_id, tenant_id))
+    for tid in tenant_ids:
+        store_stats(session, tid, None, compute_stats(session, tid))
+    refreshed = refresh_users(session, session.execute(users).scalars())
+    session.commit()
+    return len(tenant_ids), refreshed
+
+
+# ---- lezen ---------------------------------------------------------------------
+
+def dashboard_rollup(tenant_id: int | None, user, now: datetime | None = None):
+    """(tenantrij, gebruikersrij) in één query.
+
+    Ontbrekende rijen, en een gebruikersrij waarin een share inmiddels verlopen is, worden
+    hier uitgerekend en opgeslagen.
+    """
+    from app.models import DashboardRollup
+
+    now = now or datetime.utcnow()
+    user_id = user.id
+    t = DashboardRollup.__table__
+    rows = db.session.execute(
+        select(t).where(or_(
+            and_(_tenant_cond(t.c.tenant_id, tenant_id), t.c.user_id.is_(None)),
+            t.c.user_id == user_id,
+        ))
+    ).mappings().all()
+    tenant_row = next((r for r in rows if r["user_id"] is None), None)
+    user_row = next((r for r in rows if r["user_id"] == user_id), None)
+
+    stale = False
+    if tenant_row is None:
+        values = compute_stats(db.session, tenant_id)
+        store_stats(db.session, tenant_id, None, values)
+        tenant_row = {"tenant_id": tenant_id, "user_id": None, **values}
+        stale = True
+    if user_row is None or (user_row["gedeeld_verloopt_op"] and user_row["gedeeld_verloopt_op"] <= now):
+        user_tenant = user.tenant_id
+        values = compute_stats(db.session, user_tenant, user_id, now)
+        store_stats(db.session, user_tenant, user_id, values)
+        user_row = {"tenant_id": user_tenant, "user_id": user_id, **values}
+        stale = True
+    if stale:
+        db.session.commit()
+    return dict(tenant_row), dict(user_row)
+
+
+# ---- bijwerken vanuit de sessie ------------------------------------------------
+
+def _before_flush(session, flush_context, instances):
+    """Verwijderde moties en partijen: vastleggen wie erbij betrokken was, nu dat nog kan."""
+    from app.models import Motie, MotieShare, Party, User, motie_medeindieners as mmi
+
+    deleted = []
+    for obj in session.deleted:
+        if isinstance(obj, Motie) and obj.id is not None:
+            coauthors = list(session.execute(
+                select(mmi.c.user_id).where(mmi.c.motie_id == obj.id)
+            ).scalars())
+            s = MotieShare.__table__
+            targets = session.execute(
+                select(s.c.target_user_id, s.c.target_party_id).where(s.c.motie_id == obj.id)
+            ).all()
+            attrs = attributes.instance_state(obj).committed_state
+            status = attrs.get("status", obj.status)
+            indiener_id = attrs.get("indiener_id", obj.indiener_id)
+            deleted.append({
+                "tenant_id": obj.tenant_id,
+                "status": status or UNKNOWN_STATUS,
+                "indieners": (1 if indiener_id else 0) + len(coauthors),
+                "users": [indiener_id, *coauthors, *(t[0] for t in targets)],
+                "parties": [t[1] for t in targets],
+            })
+        elif isinstance(obj, Party) and obj.id is not None:
+            members = session.execute(
+                select(User.__table__.c.id).where(User.__table__.c.partij_id == obj.id)
+            ).scalars()
+            _pending(session)["users"].update(members)
+    session.info[_DELETED] = deleted
+
+
+def _after_flush(session, flush_context):
+    from app.models import Motie, MotieShare, User
+
+    pending = _pending(session)
+    deltas: Dict[Any, Dict[str, Any]] = {}
+
+    def delta(tenant_id):
+        return deltas.setdefault(tenant_id, {"status": {}, "moties": 0, "indieners": 0, "activiteit": None})
+
+    def bump(d, status, n):
+        key = status or UNKNOWN_STATUS
+        d["status"][key] = d["status"].get(key, 0) + n
+
+    now = datetime.utcnow()
+    for info in session.info.pop(_DELETED, []):
+        d = delta(info["tenant_id"])
+        bump(d, info["status"], -1)
+        d["moties"] -= 1
+        d["indieners"] -= info["indieners"]
+        pending["users"].update(u for u in info["users"] if u)
+        pending["parties"].update(p for p in info["parties"] if p)
+
+    for obj in session.new:
+        if isinstance(obj, Motie):
+            d = delta(obj.tenant_id)
+            bump(d, obj.status, 1)
+            d["moties"] += 1
+            d["indieners"] += (1 if obj.indiener_id else 0) + len(attributes.get_history(obj, "mede_indieners").added)
+            d["activiteit"] = now
+            pending["moties"].add(obj.id)
+        elif isinstance(obj, MotieShare):
+            pending["users"].add(obj.target_user_id)
+            pending["parties"].add(obj.target_party_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Motie):
+            d = delta(obj.tenant_id)
+            status = attributes.get_history(obj, "status")
+            if status.has_changes():
+                if status.deleted:
+                    bump(d, status.deleted[0], -1)
+                    bump(d, status.added[0] if status.added else None, 1)
+                else:
+                    pending["tenants"].add(obj.tenant_id)  # oude status niet geladen
+            for name in ("indiener_id", "indiener"):
+                hist = attributes.get_history(obj, name)
+                if hist.has_changes():
+                    pending["tenants"].add(obj.tenant_id)
+                    pending["users"].update(
+                        getattr(v, "id", v) for v in hist.deleted if v is not None
+                    )
+            coauthors = attributes.get_history(obj, "mede_indieners")
+            d["indieners"] += len(coauthors.added) - len(coauthors.deleted)
+            pending["users"].update(u.id for u in coauthors.deleted)
+            if session.is_modified(obj, include_collections=False):
+                d["activiteit"] = now
+            pending["moties"].add(obj.id)
+        elif isinstance(obj, MotieShare):
+            pending["users"].add(obj.target_user_id)
+            pending["parties"].add(obj.target_party_id)
+            for name in ("target_user_id", "target_party_id"):
+                for old in attributes.get_history(obj, name).deleted:
+                    pending["users" if name == "target_user_id" else "parties"].add(old)
+        elif isinstance(obj, User) and attributes.get_history(obj, "partij_id").has_changes():
+            pending["users"].add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, MotieShare):
+            pending["users"].add(obj.target_user_id)
+            pending["parties"].add(obj.target_party_id)
+
+    if deltas:
+        _apply_tenant_deltas(session, pending, deltas)
+
+
+def _apply_tenant_deltas(session, pending, deltas) -> None:
+    from app.models import DashboardRollup
+
+    t = DashboardRollup.__table__
+    conn = session.connection()
+    for tenant_id, d in deltas.items():
+        if not (d["status"] or d["moties"] or d["indieners"] or d["activiteit"]):
+            continue
+        row = conn.execute(
+            select(t.c.id, t.c.status_counts)
+            .where(_tenant_cond(t.c.tenant_id, tenant_id), t.c.user_id.is_(None))
+            .with_for_update()
+        ).first()
+        if row is None:
+            pending["tenants"].add(tenant_id)  # nog geen rij: bij de commit volledig uitrekenen
+            continue
+        counts = dict(row.status_counts or {})
+        for status, n in d["status"].items():
+            counts[status] = counts.get(status, 0) + n
+            if counts[status] <= 0:
+                del counts[status]
+        values = {
+            "status_counts": counts,
+            "motie_count": t.c.motie_count + d["moties"],
+            "indieners_totaal": t.c.indieners_totaal + d["indieners"],
+            "updated_at": datetime.utcnow(),
+        }
+        if d["activiteit"]:
+            values["laatste_activiteit"] = case(
+                (or_(t.c.laatste_activiteit.is_(None), t.c.laatste_activiteit < d["activiteit"]), d["activiteit"]),
+                else_=t.c.laatste_activiteit,
+            )
+        conn.execute(update(t).where(t.c.id == row.id).values(**values))
+
+
+def _before_commit(session):
+    from app.models import Motie, User, motie_medeindieners as mmi
+
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if not pending or not any(pending.values()):
+        return
+    users = {u for u in pending["users"] if u}
+    parties = [p for p in pending["parties"] if p]
+    if parties:
+        u = User.__table__
+        users.update(session.execute(select(u.c.id).where(u.c.partij_id.in_(parties))).scalars())
+    moties = [m for m in pending["moties"] if m]
+    if moties:
+        m = Motie.__table__
+        users.update(session.execute(select(m.c.indiener_id).where(m.c.id.in_(moties))).scalars())
+        users.update(session.execute(select(mmi.c.user_id).where(mmi.c.motie_id.in_(moties))).scalars())
+    for tenant_id in pending["tenants"]:
+        store_stats(session, tenant_id, None, compute_stats(session, tenant_id))
+    refresh_users(session, users)
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+        session.info.pop(_DELETED, None)
+
+
+def register_rollup_events() -> None:
+    for name, fn in (
+        ("before_flush", _before_flush),
+        ("after_flush", _after_flush),
+        ("before_commit", _before_commit),
+        ("after_transaction_end", _after_transaction_end),
+    ):
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
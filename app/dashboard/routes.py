@@ -3,14 +3,15 @@ from flask_login import login_required, current_user
 from app.auth.utils import login_and_active_required
 from flask import g
 from app.dashboard import bp
+from app.calendar_feeds import configured_feeds, schedule_refresh, upcoming_events
+from app.dashboard.rollup import dashboard_rollup
+from app.dashboard.widgets import cached_widget, widget_response
 from app.models import Motie, User, motie_medeindieners, MotieShare, Notification
+from app.parallel_queries import submit_query
 from app import db
-from sqlalchemy import func, or_, case, and_, cast, Float
+from sqlalchemy import func, or_, and_
 from sqlalchemy.orm import selectinload
 from datetime import datetime, date
-from urllib.request import urlopen
-from urllib.error import URLError
-import ssl
 
 
 @bp.before_request
@@ -23,22 +24,26 @@ def _dashboard_role_guard():
             abort(403)
 
 
+def _current_tenant_id():
+    t = getattr(g, 'tenant', None)
+    tenant_id = getattr(t, "id", None) if t else None
+    if tenant_id is not None and not isinstance(tenant_id, int):
+        try:
+            tenant_id = int(tenant_id)
+        except (TypeError, ValueError):
+            tenant_id = None
+    return tenant_id
+
+
 def _moties_for_user_query(user):
     base = Motie.query.options(
         selectinload(Motie.mede_indieners),
         selectinload(Motie.indiener),
     )
     # Tenant scoping (voorbeeld): filter op actieve tenant indien beschikbaar
-    t = getattr(g, 'tenant', None)
-    if t:
-        tenant_id = getattr(t, "id", None)
-        if not isinstance(tenant_id, int):
-            try:
-                tenant_id = int(tenant_id)
-            except (TypeError, ValueError):
-                tenant_id = None
-        if tenant_id is not None:
-            base = base.filter(Motie.tenant_id == tenant_id)
+    tenant_id = _current_tenant_id()
+    if tenant_id is not None:
+        base = base.filter(Motie.tenant_id == tenant_id)
     if getattr(user, 'has_role', None) and user.has_role('superadmin'):
         return base
     return base.filter(
@@ -49,81 +54,10 @@ def _moties_for_user_query(user):
     )
 
 
-def _normalize_date(value):
-    if value is None:
-        return None
-
-
-def _parse_ics_events(ics_text: str):
-    events = []
-    current = None
-    for raw in ics_text.splitlines():
-        line = raw.strip()
-        if line == 'BEGIN:VEVENT':
-            current = {}
-        elif line == 'END:VEVENT':
-            if current:
-                events.append(current)
-            current = None
-        elif current is not None:
-            if line.startswith('DTSTART'):
-                # Handle formats: DTSTART:YYYYMMDD or DTSTART;TZID=...:YYYYMMDDTHHMMSS
-                try:
-                    _, val = line.split(':', 1)
-                    if len(val) == 8 and val.isdigit():
-                        dt = datetime.strptime(val, '%Y%m%d')
-                    else:
-                        # Trim timezone and parse basic timestamp
-                        if 'T' in val:
-                            dt = datetime.strptime(val[:15], '%Y%m%dT%H%M%S')
-                        else:
-                            dt = datetime.strptime(val[:8], '%Y%m%d')
-                    current['start'] = dt
-                except Exception:
-                    pass
-            elif line.startswith('SUMMARY:'):
-                current['summary'] = line[len('SUMMARY:'):].strip()
-            elif line.startswith('LOCATION:'):
-                current['location'] = line[len('LOCATION:'):].strip()
-            elif line.startswith('URL:'):
-                current['url'] = line[len('URL:'):].strip()
-    return events
-
-
-def _fetch_haarlem_meetings(max_items: int = 5):
-    url = current_app.config.get('HAARLEM_MEETINGS_ICS')
-    if not url:
-        return []
-    try:
-        # Some environments require an unverified context for simple fetches
-        ctx = ssl.create_default_context()
-        with urlopen(url, timeout=4, context=ctx) as resp:
-            data = resp.read().decode('utf-8', errors='ignore')
-        events = _parse_ics_events(data)
-        today = datetime.utcnow().date()
-        upcoming = []
-        for ev in events:
-            dt = ev.get('start')
-            if not dt:
-                continue
-            d = dt.date()
-            if d >= today:
-                upcoming.append(ev)
-        upcoming.sort(key=lambda e: e.get('start'))
-        return upcoming[:max_items]
-    except URLError:
-        return []
-    except Exception:
-        current_app.logger.exception('Fout bij ophalen Haarlem vergaderingen ICS')
-        return []
-    if isinstance(value, date):
-        return value
-    if isinstance(value, datetime):
-        return value.date()
-    try:
-        return datetime.fromisoformat(str(value)).date()
-    except Exception:
-        return None
+def _widget_version(*rows):
+    """Versie van de moties-gegevens voor de widget-URL's: wijzigt bij elke motie- of sharewijziging."""
+    stamps = [row.get("updated_at") for row in rows if row.get("updated_at")]
+    return max(stamps).strftime('%Y%m%d%H%M%S%f') if stamps else None
 
 
 @bp.route('/')
@@ -131,34 +65,64 @@ def _fetch_haarlem_meetings(max_items: int = 5):
 def home():
     if (getattr(current_user, "role", "") or "").lower() == "bestuursadviseur":
         return redirect(url_for('griffie.toepassingen'))
-    query = _moties_for_user_query(current_user)
 
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 20))
+    # Alleen het raamwerk en de kengetallen; de lijsten komen per widget via home_widget
+    user_id = current_user.id
+    unread = submit_query(lambda: Notification.query.filter_by(user_id=user_id, read_at=None).count())
+    # De rollup kan ontbrekende rijen aanvullen (schrijven), dus die blijft in de request-thread
+    tenant_stats, user_stats = dashboard_rollup(_current_tenant_id(), current_user)
+    own_stats = tenant_stats if current_user.has_role('superadmin') else user_stats
+    total = own_stats["motie_count"]
+    status_counts = own_stats["status_counts"]
+    avg_indieners = (
+        tenant_stats["indieners_totaal"] / tenant_stats["motie_count"]
+        if tenant_stats["motie_count"] else None
+    )
+    latest = tenant_stats["laatste_activiteit"]
+    gedeeld_total = user_stats["gedeeld_count"]
+    unread_notifications = unread.result()
+
+    version = _widget_version(tenant_stats, user_stats)
+    widget_urls = {
+        naam: url_for('dashboard.home_widget', naam=naam, v=version)
+        for naam in ('mijn_moties', 'gedeeld', 'vergaderingen', 'activiteit')
+    }
+    widget_urls['notificaties'] = url_for('dashboard.home_widget', naam='notificaties', v=unread_notifications)
+    widget_urls['agenda'] = url_for('dashboard.home_widget', naam='agenda')
+    widget_urls['status'] = url_for('dashboard.moties_per_status', v=version)
+    widget_urls['samenwerking'] = url_for('dashboard.collaborator_overview', v=version)
+
+    moties_index_shared_url = (
+        url_for('moties.index_shared')
+        if 'moties.index_shared' in current_app.view_functions
+        else None
+    )
+
+    return render_template(
+        'dashboard/index.html',
+        title="Dashboard",
+        avg_indieners=avg_indieners,
+        latest=latest,
+        total=total,
+        gedeeld_total=gedeeld_total,
+        status_counts=status_counts,
+        unread_notifications=unread_notifications,
+        moties_index_shared_url=moties_index_shared_url,
+        widget_urls=widget_urls,
+    )
+
+
+def _widget_mijn_moties():
     items = (
-        query.order_by(Motie.created_at.desc())
-        .offset((page - 1) * per_page)
-        .limit(per_page)
+        _moties_for_user_query(current_user)
+        .order_by(Motie.created_at.desc())
+        .limit(5)
         .all()
     )
-    total = query.count()
-
-    mmi = motie_medeindieners
-    per_motie = (
-        db.session.query(
-            Motie.id.label("motie_id"),
-            (
-                case((Motie.indiener_id.isnot(None), 1), else_=0)
-                + func.count(mmi.c.user_id)
-            ).label("totaal_indieners"),
-        )
-        .outerjoin(mmi, mmi.c.motie_id == Motie.id)
-        .group_by(Motie.id)
-    ).subquery()
+    return {"items": items}
 
-    avg_indieners = db.session.query(cast(func.avg(per_motie.c.totaal_indieners), Float)).scalar()
-    latest = db.session.query(func.max(Motie.updated_at)).scalar()
 
+def _widget_gedeeld():
     gedeeld_q = (
         db.session.query(Motie)
         .join(MotieShare, MotieShare.motie_id == Motie.id)
@@ -180,117 +144,125 @@ def home():
         .order_by(Motie.updated_at.desc())
         .distinct()
     )
-    gedeeld_met_mij = gedeeld_q.limit(6).all()
-    gedeeld_total = gedeeld_q.count()
+    return {"gedeeld_met_mij": gedeeld_q.limit(6).all()}
 
-    status_query = db.session.query(Motie.status, func.count(Motie.id))
-    if not current_user.has_role('superadmin'):
-        status_query = status_query.filter(
-            or_(
-                Motie.indiener_id == current_user.id,
-                Motie.mede_indieners.any(User.id == current_user.id),
-            )
-        )
-    status_counts = dict(status_query.group_by(Motie.status).all())
 
-    notifications_recent = (
-        Notification.query.filter_by(user_id=current_user.id)
-        .order_by(Notification.created_at.desc())
-        .limit(5)
+def _widget_vergaderingen():
+    upcoming = (
+        _moties_for_user_query(current_user)
+        .filter(Motie.vergaderdatum >= date.today())
+        .order_by(Motie.vergaderdatum.asc(), Motie.id.asc())
+        .limit(4)
         .all()
     )
-    unread_notifications = Notification.query.filter_by(user_id=current_user.id, read_at=None).count()
+    return {"upcoming_meetings": [(motie, motie.vergaderdatum) for motie in upcoming]}
 
-    meeting_candidates = (
-        query.filter(Motie.gemeenteraad_datum.isnot(None))
-        .order_by(Motie.gemeenteraad_datum.asc())
-        .limit(10)
-        .all()
-    )
-    upcoming_meetings = []
-    today = date.today()
-    for motie in meeting_candidates:
-        normalized = _normalize_date(motie.gemeenteraad_datum)
-        if normalized and normalized >= today:
-            upcoming_meetings.append((motie, normalized))
-        if len(upcoming_meetings) >= 4:
-            break
 
+def _widget_activiteit():
     recent_activity = (
-        query.order_by(Motie.updated_at.desc())
+        _moties_for_user_query(current_user)
+        .order_by(Motie.updated_at.desc())
         .limit(6)
         .all()
     )
+    return {"recent_activity": recent_activity}
 
-    moties_index_shared_url = (
-        url_for('moties.index_shared')
-        if 'moties.index_shared' in current_app.view_functions
-        else None
+
+def _widget_notificaties():
+    notifications_recent = (
+        Notification.query.filter_by(user_id=current_user.id)
+        .order_by(Notification.created_at.desc())
+        .limit(5)
+        .all()
     )
+    return {"notifications_recent": notifications_recent}
 
-    # Haarlem vergaderingen (extern ICS, optioneel via config HAARLEM_MEETINGS_ICS)
-    haarlem_meetings = _fetch_haarlem_meetings(max_items=5)
 
-    return render_template(
-        'dashboard/index.html',
-        title="Dashboard",
-        avg_indieners=avg_indieners,
-        latest=latest,
-        total=total,
-        per_page=per_page,
-        page=page,
-        gedeeld_total=gedeeld_total,
-        gedeeld_met_mij=gedeeld_met_mij,
-        items=items,
-        status_counts=status_counts,
-        notifications_recent=notifications_recent,
-        unread_notifications=unread_notifications,
-        upcoming_meetings=upcoming_meetings,
-        recent_activity=recent_activity,
-        moties_index_shared_url=moties_index_shared_url,
-        haarlem_meetings=haarlem_meetings,
+def _widget_agenda():
+    # Externe vergaderagenda's: alleen uit de tabel lezen, verversen gebeurt op de achtergrond
+    tenant_id = _current_tenant_id()
+    events = submit_query(lambda: upcoming_events(tenant_id, limit=5))
+    try:
+        schedule_refresh(tenant_id, configured_feeds(getattr(g, 'tenant', None)))
+    except Exception:
+        current_app.logger.exception('Verversen van externe agenda\'s niet gestart')
+    return {"haarlem_meetings": events.result()}
+
+
+# naam -> (gegevens, eigen maximale TTL in seconden of None voor DASHBOARD_WIDGET_TTL)
+HOME_WIDGETS = {
+    'mijn_moties': (_widget_mijn_moties, None),
+    'gedeeld': (_widget_gedeeld, None),
+    'vergaderingen': (_widget_vergaderingen, None),
+    'activiteit': (_widget_activiteit, None),
+    'notificaties': (_widget_notificaties, 10),
+    'agenda': (_widget_agenda, None),
+}
+
+
+@bp.route('/widgets/<naam>')
+@login_and_active_required
+def home_widget(naam):
+    widget = HOME_WIDGETS.get(naam)
+    if widget is None:
+        abort(404)
+    build, ttl = widget
+    html = cached_widget(
+        f'dashboard.{naam}',
+        lambda: render_template(f'dashboard/widgets/{naam}.html', **build()),
+        ttl=ttl,
+        vary=(request.args.get('v'),),
     )
+    return widget_response(html, ttl)
 
 
 @bp.route('/metrics/moties-per-status')
 @login_and_active_required
 def moties_per_status():
-    status_counts = (
-        db.session.query(Motie.status, func.count(Motie.id))
-        .filter(
-            or_(
-                Motie.indiener_id == current_user.id,
-                Motie.mede_indieners.any(User.id == current_user.id),
+    def _build():
+        status_counts = (
+            db.session.query(Motie.status, func.count(Motie.id))
+            .filter(
+                or_(
+                    Motie.indiener_id == current_user.id,
+                    Motie.mede_indieners.any(User.id == current_user.id),
+                )
             )
+            .group_by(Motie.status)
+            .all()
         )
-        .group_by(Motie.status)
-        .all()
-    )
-    data = [
-        {
-            "status": status or "Onbekend",
-            "count": count,
-        }
-        for status, count in status_counts
-    ]
-    return jsonify(data)
+        return [
+            {
+                "status": status or "Onbekend",
+                "count": count,
+            }
+            for status, count in status_counts
+        ]
+
+    refresh = bool(request.args.get('vernieuw'))
+    data = cached_widget('dashboard.moties_per_status', _build, vary=(request.args.get('v'),), refresh=refresh)
+    return widget_response(jsonify(data), 0 if refresh else None)
 
 
 @bp.route('/metrics/collaborators')
 @login_and_active_required
 def collaborator_overview():
-    mmi = motie_medeindieners
-    rows = (
-        db.session.query(User.naam, func.count(Motie.id).label('aantal'))
-        .join(mmi, mmi.c.user_id == User.id)
-        .join(Motie, Motie.id == mmi.c.motie_id)
-        .filter(Motie.indiener_id == current_user.id)
-        .group_by(User.naam)
-        .order_by(func.count(Motie.id).desc())
-        .limit(5)
-        .all()
-    )
-    return jsonify([
-        {"naam": naam, "aantal": aantal}
-        for naam, aantal in rows
-    ])
+    def _build():
+        mmi = motie_medeindieners
+        rows = (
+            db.session.query(User.naam, func.count(Motie.id).label('aantal'))
+            .join(mmi, mmi.c.user_id == User.id)
+            .join(Motie, Motie.id == mmi.c.motie_id)
+            .filter(Motie.indiener_id == current_user.id)
+            .group_by(User.naam)
+            .order_by(func.count(Motie.id).desc())
+            .limit(5)
+            .all()
+        )
+        return [
+            {"naam": naam, "aantal": aantal}
+            for naam, aantal in rows
+        ]
+
+    data = cached_widget('dashboard.collaborator_overview', _build, vary=(request.args.get('v'),))
+    return widget_response(jsonify(data))
@@ -0,0 +1,90 @@
+"""Dashboardwidgets die los van de pagina worden geladen.
+
+De pagina zelf bevat alleen het raamwerk; elke widget heeft een eigen endpoint dat de
+browser parallel ophaalt. Het resultaat van zo'n endpoint wordt per tenant en gebruiker
+kort bewaard (``DASHBOARD_WIDGET_TTL`` seconden), zodat heen en weer klikken naar het
+dashboard de queries niet steeds opnieuw uitvoert.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from flask import current_app, g, make_response
+from flask_login import current_user
+
+MAX_ENTRIES = 4096
+
+
+class WidgetCache:
+    """Kleine in-process cache met een eigen verlooptijd per item."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._items: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._items[key]
+                return None
+            return item[1]
+
+    def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._items) >= self.max_entries:
+                for k in [k for k, (expires, _v) in self._items.items() if expires < now]:
+                    del self._items[k]
+                while len(self._items) >= self.max_entries:
+                    # Oudste eerst (dicts houden de invoegvolgorde aan)
+                    del self._items[next(iter(self._items))]
+            self._items[key] = (now + ttl, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+widget_cache = WidgetCache()
+
+
+def widget_ttl(default: float | None = None) -> float:
+    """TTL volgens de config; een widget kan een kortere eigen waarde meegeven."""
+    configured = float(current_app.config.get("DASHBOARD_WIDGET_TTL") or 0)
+    if default is None:
+        return configured
+    return min(configured, default)
+
+
+def cached_widget(name: str, build: Callable[[], Any], *, ttl: float | None = None, vary: tuple = (),
+                  refresh: bool = False) -> Any:
+    """Resultaat van ``build()`` voor deze widget, tenant en gebruiker; uit de cache als dat kan.
+
+    ``vary`` komt in de sleutel, bijvoorbeeld een versie van de onderliggende gegevens zodat
+    een gewijzigde motie niet op het verlopen van de TTL hoeft te wachten. ``refresh`` slaat
+    de cache over en legt het nieuwe resultaat vast (de knop 'Vernieuwen').
+    """
+    seconds = widget_ttl(ttl)
+    if seconds <= 0:
+        return build()
+    tenant = getattr(g, "tenant", None)
+    key = (name, getattr(tenant, "id", None), getattr(current_user, "id", None), *vary)
+    value = None if refresh else widget_cache.get(key)
+    if value is None:
+        value = build()
+        widget_cache.put(key, value, seconds)
+    return value
+
+
+def widget_response(body, ttl: float | None = None):
+    """Fragment of JSON van een widget, met dezelfde korte levensduur in de browser."""
+    resp = make_response(body)
+    seconds = int(widget_ttl(ttl))
+    resp.headers["Cache-Control"] = f"private, max-age={seconds}" if seconds > 0 else "no-store"
+    return resp
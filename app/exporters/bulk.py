@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from app.exporters.docx_cache import DocxCache
+from app.exporters.motie_docx import export_filename, render_export_data_to_docx_bytes
+
+
+# ---- procespool --------------------------------------------------------------
+# Eén pool per worker-proces. 'spawn' omdat forken vanuit een threaded gunicorn-worker
+# open databaseverbindingen en locks zou meekopiëren.
+_EXECUTOR: ProcessPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor(processes: int) -> ProcessPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _EXECUTOR
+
+
+def _reset_executor() -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
+
+
+def iter_rendered_docx(items: Iterable[Dict[str, Any]], tpl_path: Path | str,
+                       *, processes: int = 0, cache: DocxCache | None = None,
+                       renderer: str = "docxtpl") -> Iterator[tuple[bytes, str]]:
+    """Render ``motie_export_data``-items in dezelfde volgorde als aangeleverd.
+
+    Met ``processes`` > 0 gebeurt het renderen parallel in een procespool; er zijn dan
+    hooguit 2 × ``processes`` documenten tegelijk onderweg. Met 0 wordt in deze thread
+    gerenderd. Documenten die al in ``cache`` staan worden niet opnieuw gerenderd.
+    ``renderer`` gaat door naar ``render_export_data_to_docx_bytes``.
+    """
+    pool = _executor(processes) if processes > 0 else None
+    window: deque = deque()
+
+    def _collect(entry) -> tuple[bytes, str]:
+        key, data, pending = entry
+        if isinstance(pending, bytes):
+            return pending, export_filename(data)
+        content, filename = pending.result() if pool else pending
+        if cache is not None:
+            cache.put(key, content)
+        return content, filename
+
+    try:
+        for data in items:
+            key = cache.key(data, tpl_path, renderer) if cache is not None else None
+            pending = cache.get(key) if cache is not None else None
+            if pending is None:
+                if pool:
+                    pending = pool.submit(render_export_data_to_docx_bytes, data, str(tpl_path), renderer)
+                else:
+                    pending = render_export_data_to_docx_bytes(data, tpl_path, renderer)
+            window.append((key, data, pending))
+            if len(window) >= max(processes, 1) * 2:
+                yield _collect(window.popleft())
+        while window:
+            yield _collect(window.popleft())
+    except BrokenProcessPool:
+        _reset_executor()
+        raise
+    finally:
+        for _key, _data, pending in window:
+            if hasattr(pending, "cancel"):
+                pending.cancel()
+
+
+# ---- streaming ZIP -------------------------------------------------------------
+
+def unique_name(name: str, existing: set[str]) -> str:
+    """Zorgt dat bestandsnamen uniek zijn binnen de zip."""
+    if name not in existing:
+        existing.add(name)
+        return name
+    base, ext = (name.rsplit(".", 1) + [""])[:2]
+    ext = f".{ext}" if ext else ""
+    i = 2
+    while f"{base} ({i}){ext}" in existing:
+        i += 1
+    unique = f"{base} ({i}){ext}"
+    existing.add(unique)
+    return unique
+
+
+class _ChunkSink:
+    """Schrijfdoel zonder seek/tell: ZipFile schrijft dan data descriptors en kan streamen."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[tuple[str, bytes]]) -> Iterator[bytes]:
+    """Lever ZIP-bytes op zodra elk bestand klaar is; ``entries`` geeft (naam, inhoud)."""
+    sink = _ChunkSink()
+    with ZipFile(sink, "w", ZIP_DEFLATED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    tail = sink.drain()
+    if tail:
+        yield tail
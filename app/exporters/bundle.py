@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import io
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt
+from docxcompose.composer import Composer
+
+from app.exporters.bulk import iter_rendered_docx
+from app.exporters.docx_cache import DocxCache
+
+READY_STATUS = "Klaar om in te dienen"
+
+
+def bundle_query(datum: date | str, agendapunt: str | None = None):
+    """Alle moties die klaar zijn om in te dienen voor één raadsvergadering.
+
+    ``datum`` is een ``date`` (via de index op ``vergaderdatum``) of, voor moties waarvan
+    de ingevulde tekst geen datum is, die tekst zelf.
+    """
+    from app.models import Motie
+    from app.exporters.motie_docx import motie_export_query
+
+    on_date = Motie.vergaderdatum == datum if isinstance(datum, date) else Motie.gemeenteraad_datum == datum
+    q = (
+        motie_export_query()
+        .filter(Motie.status.ilike(READY_STATUS), on_date)
+    )
+    if agendapunt:
+        q = q.filter(Motie.agendapunt == agendapunt)
+    return q.order_by(Motie.agendapunt.asc(), Motie.id.asc())
+
+
+def bundle_title(datum: str, agendapunt: str | None = None) -> str:
+    titel = f"Moties raadsvergadering {datum}"
+    return f"{titel}, agendapunt {agendapunt}" if agendapunt else titel
+
+
+def _indieners(data: Dict[str, Any]) -> str:
+    return ", ".join(
+        f"{o['naam']} ({o['afkorting']})" if o.get("afkorting") else o["naam"]
+        for o in data.get("ondertekenaars", [])
+    )
+
+
+# ---- DOCX ------------------------------------------------------------------------
+
+def _bookmark(p, name: str, bm_id: int) -> None:
+    """Zet een bladwijzer om de hele alinea ``p`` (CT_P)."""
+    start = OxmlElement("w:bookmarkStart")
+    start.set(qn("w:id"), str(bm_id))
+    start.set(qn("w:name"), name)
+    end = OxmlElement("w:bookmarkEnd")
+    end.set(qn("w:id"), str(bm_id))
+    ppr = p.find(qn("w:pPr"))
+    p.insert(p.index(ppr) + 1 if ppr is not None else 0, start)
+    p.append(end)
+
+
+def _run(text: str) -> Any:
+    r = OxmlElement("w:r")
+    t = OxmlElement("w:t")
+    t.set(qn("xml:space"), "preserve")
+    t.text = text
+    r.append(t)
+    return r
+
+
+def _field_runs(instr: str, placeholder: str) -> list:
+    """Runs voor een Word-veld (bijv. PAGEREF); Word vult het bij openen in."""
+    begin = OxmlElement("w:r")
+    fc = OxmlElement("w:fldChar")
+    fc.set(qn("w:fldCharType"), "begin")
+    fc.set(qn("w:dirty"), "true")
+    begin.append(fc)
+    code = OxmlElement("w:r")
+    it = OxmlElement("w:instrText")
+    it.set(qn("xml:space"), "preserve")
+    it.text = f" {instr} "
+    code.append(it)
+    sep = OxmlElement("w:r")
+    fc = OxmlElement("w:fldChar")
+    fc.set(qn("w:fldCharType"), "separate")
+    sep.append(fc)
+    end = OxmlElement("w:r")
+    fc = OxmlElement("w:fldChar")
+    fc.set(qn("w:fldCharType"), "end")
+    end.append(fc)
+    return [begin, code, sep, _run(placeholder), end]
+
+
+def _style_or_none(doc, name: str):
+    try:
+        return doc.styles[name]
+    except KeyError:
+        return None
+
+
+def _add_toc(master, entries: List[tuple[str, str]]) -> None:
+    """Inhoudsopgave met klikbare titels en paginanummers (PAGEREF naar de bladwijzers)."""
+    heading = master.add_paragraph(style=_style_or_none(master, "Heading 1"))
+    heading.add_run("Inhoudsopgave").bold = True
+    for label, anchor in entries:
+        p = master.add_paragraph()
+        p.paragraph_format.tab_stops.add_tab_stop(Pt(450), alignment=2, leader=1)  # rechts, puntjes
+        link = OxmlElement("w:hyperlink")
+        link.set(qn("w:anchor"), anchor)
+        link.set(qn("w:history"), "1")
+        link.append(_run(label))
+        p._p.append(link)
+        tab = OxmlElement("w:r")
+        tab.append(OxmlElement("w:tab"))
+        p._p.append(tab)
+        for r in _field_runs(f"PAGEREF {anchor} \\h", ""):
+            p._p.append(r)
+
+    # Velden laten bijwerken bij openen, zodat de paginanummers kloppen
+    settings = master.settings.element
+    upd = settings.find(qn("w:updateFields"))
+    if upd is None:
+        upd = OxmlElement("w:updateFields")
+        settings.append(upd)
+    upd.set(qn("w:val"), "true")
+
+
+def render_bundle_docx(items: List[Dict[str, Any]], tpl_path: Path | str, *, titel: str,
+                       processes: int = 0, cache: DocxCache | None = None,
+                       renderer: str = "docxtpl") -> bytes:
+    """Eén Word-document met voorblad, inhoudsopgave en elke motie op een nieuwe pagina.
+
+    Elke motie wordt met het gedeelde sjabloon (en de DOCX-cache) gerenderd en daarna
+    met docxcompose achter elkaar gezet; stijlen, nummering en logo's gaan mee.
+    """
+    if not items:
+        raise ValueError("Geen moties voor de bundel")
+    rendered = [
+        content
+        for content, _name in iter_rendered_docx(
+            items, tpl_path, processes=processes, cache=cache, renderer=renderer,
+        )
+    ]
+
+    # Het eerste document levert stijlen, pagina-instellingen en kop/voettekst
+    master = Document(io.BytesIO(rendered[0]))
+    body = master.element.body
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+
+    cover = master.add_paragraph(style=_style_or_none(master, "Title"))
+    cover.add_run(titel).bold = True
+    master.add_paragraph(f"{len(items)} motie(s)")
+    anchors = [f"motie_{i}" for i in range(1, len(items) + 1)]
+    _add_toc(master, [(f"{i}. {d['titel']}", a) for i, (d, a) in enumerate(zip(items, anchors), start=1)])
+
+    composer = Composer(master)
+    for i, content in enumerate(rendered):
+        master.add_page_break()
+        sub = Document(io.BytesIO(content))
+        first_p = sub.element.body.find(qn("w:p"))
+        if first_p is not None:
+            _bookmark(first_p, anchors[i], 1000 + i)
+        composer.append(sub)
+
+    out = io.BytesIO()
+    composer.save(out)
+    return out.getvalue()
+
+
+# ---- PDF -------------------------------------------------------------------------
+
+def render_bundle_pdf(items: List[Dict[str, Any]], *, titel: str) -> bytes:
+    """Dezelfde bundel als PDF, met inhoudsopgave en paginanummers."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import (
+        Image,
+        ListFlowable,
+        ListItem,
+        PageBreak,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        Table,
+    )
+    from reportlab.platypus.tableofcontents import TableOfContents
+
+    class _BundleDoc(SimpleDocTemplate):
+        def afterFlowable(self, flowable):
+            key = getattr(flowable, "_toc_key", None)
+            if key:
+                self.canv.bookmarkPage(key)
+                self.notify("TOCEntry", (0, flowable._toc_text, self.page, key))
+
+    styles = getSampleStyleSheet()
+    body = styles["BodyText"]
+    label = ParagraphStyle("BundleLabel", parent=body, fontName="Helvetica-Bold", spaceBefore=8)
+    toc = TableOfContents()
+    toc.levelStyles = [ParagraphStyle("BundleToc", parent=body, leftIndent=0, firstLineIndent=0)]
+
+    # Eén ImageReader per logo voor de hele bundel
+    logo_readers: Dict[str, Any] = {}
+
+    def _logo(path: str):
+        reader = logo_readers.get(path)
+        if reader is None:
+            reader = logo_readers[path] = ImageReader(path)
+        w, h = reader.getSize()
+        height = 14 * mm
+        return Image(reader, width=height * w / h if h else height, height=height)
+
+    def _bullets(values: Iterable[str]):
+        values = [v for v in values if str(v).strip()]
+        if not values:
+            return []
+        return [ListFlowable(
+            [ListItem(Paragraph(escape(str(v)), body), leftIndent=12) for v in values],
+            bulletType="bullet",
+            start="•",
+            leftIndent=12,
+        )]
+
+    def _page_number(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawRightString(A4[0] - 20 * mm, 10 * mm, f"{titel} – pagina {doc.page}")
+        canvas.restoreState()
+
+    elements: list = [
+        Paragraph(escape(titel), styles["Title"]),
+        Paragraph(f"{len(items)} motie(s)", body),
+        Spacer(1, 12),
+        Paragraph("Inhoudsopgave", styles["Heading2"]),
+        toc,
+    ]
+    for i, data in enumerate(items, start=1):
+        elements.append(PageBreak())
+        kop_tekst = f"{i}. {data['titel']}"
+        kop = Paragraph(escape(kop_tekst), styles["Heading1"])
+        kop._toc_key = f"motie_{i}"
+        kop._toc_text = escape(kop_tekst)
+        elements.append(kop)
+
+        meta = []
+        if data.get("agendapunt"):
+            meta.append(f"Agendapunt {escape(str(data['agendapunt']))}")
+        if data.get("gemeenteraad_datum"):
+            meta.append(f"Raadsvergadering van {escape(str(data['gemeenteraad_datum']))}")
+        if meta:
+            elements.append(Paragraph(" · ".join(meta), body))
+        if data.get("constaterende_dat"):
+            elements += [Paragraph("We stellen vast dat:", label), *_bullets(data["constaterende_dat"])]
+        if data.get("overwegende_dat"):
+            elements += [Paragraph("We overwegen dat:", label), *_bullets(data["overwegende_dat"])]
+        if data.get("opdracht_formulering"):
+            elements.append(Paragraph(escape(data["opdracht_formulering"]), label))
+        elements += _bullets(data.get("draagt_college_op") or [])
+        elements.append(Paragraph("En gaat over tot de orde van de dag.", body))
+
+        elements.append(Paragraph("Ingediend door:", label))
+        elements.append(Paragraph(escape(_indieners(data)) or "-", body))
+        logos = []
+        for party in data.get("partijen", []):
+            if party.get("logo_path"):
+                try:
+                    logos.append(_logo(party["logo_path"]))
+                except Exception:
+                    continue
+        if logos:
+            elements += [Spacer(1, 6), Table([logos], hAlign="LEFT")]
+
+    buffer = io.BytesIO()
+    doc = _BundleDoc(
+        buffer,
+        pagesize=A4,
+        title=titel,
+        leftMargin=20 * mm,
+        rightMargin=20 * mm,
+        topMargin=20 * mm,
+        bottomMargin=20 * mm,
+    )
+    doc.multiBuild(elements, onFirstPage=_page_number, onLaterPages=_page_number)
+    return buffer.getvalue()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from flask import current_app
+
+from app.exporters.motie_docx import export_filename, render_export_data_to_docx_bytes
+
+# Verhogen als de renderer anders gaat renderen: oude cachebestanden worden dan niet meer geraakt
+CACHE_FORMAT = "motie-docx-2"
+_SWEEP_INTERVAL = 10.0  # seconden tussen twee opruimrondes per proces
+
+logger = logging.getLogger(__name__)
+
+_last_sweep: dict[str, float] = {}  # per cachemap, per proces
+_digest_memo: dict[tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def _file_digest(path: str | Path) -> str | None:
+    """sha256 van een bestand, onthouden per (pad, mtime, grootte)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    memo_key = (str(path), st.st_mtime_ns, st.st_size)
+    digest = _digest_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 16), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with _digest_lock:
+            _digest_memo[memo_key] = digest
+    return digest
+
+
+class ContentCache:
+    """Bestanden op schijf onder een hash-sleutel, gedeeld door alle workers.
+
+    Bij een hit wordt de mtime bijgewerkt; bij het opruimen gaan de langst niet gebruikte
+    bestanden eerst weg (LRU) tot de totale grootte onder ``max_bytes`` zit.
+    """
+
+    suffix = ".bin"
+    label = "Cache"
+
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            content = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def put(self, key: str, content: bytes) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(content)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("%s: schrijven naar %s mislukt", self.label, path, exc_info=True)
+            return
+        if time.monotonic() - _last_sweep.get(str(self.directory), 0.0) > _SWEEP_INTERVAL:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Verwijder de minst recent gebruikte bestanden tot de cache binnen de limiet past."""
+        _last_sweep[str(self.directory)] = time.monotonic()
+        entries = []
+        total = 0
+        for sub in self.directory.glob("*/"):
+            try:
+                with os.scandir(sub) as it:
+                    for entry in it:
+                        if not entry.name.endswith(self.suffix):
+                            continue
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                        total += st.st_size
+            except OSError:
+                continue
+        removed = 0
+        if total <= self.max_bytes:
+            return removed
+        for _mtime, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            if total <= self.max_bytes:
+                break
+        return removed
+
+
+class DocxCache(ContentCache):
+    """Gerenderde DOCX-bestanden, geadresseerd op de inhoud.
+
+    De sleutel is een hash van de exportdata, het sjabloon en de partijlogo's, dus een
+    gewijzigde motie of een nieuw sjabloon levert vanzelf een nieuwe sleutel op.
+    """
+
+    suffix = ".docx"
+    label = "DOCX-cache"
+
+    def key(self, data: Dict[str, Any], tpl_path: str | Path, renderer: str = "docxtpl") -> str:
+        logos = [
+            [party.get("id"), _file_digest(party["logo_path"]) if party.get("logo_path") else None]
+            for party in data.get("partijen", [])
+        ]
+        material = json.dumps(
+            [CACHE_FORMAT, renderer, _file_digest(tpl_path), logos, data],
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def docx_cache() -> DocxCache | None:
+    """Cache volgens de app-config; None als EXPORT_CACHE_MAX_BYTES 0 is."""
+    max_bytes = int(current_app.config.get("EXPORT_CACHE_MAX_BYTES") or 0)
+    if max_bytes <= 0:
+        return None
+    directory = current_app.config.get("EXPORT_CACHE_DIR") or os.path.join(current_app.instance_path, "docx_cache")
+    return DocxCache(directory, max_bytes)
+
+
+def render_export_data_cached(data: Dict[str, Any], tpl_path: str | Path,
+                              cache: DocxCache | None, renderer: str = "docxtpl") -> tuple[bytes, str]:
+    """Zoals ``render_export_data_to_docx_bytes``, maar eerst in de cache kijken."""
+    if cache is None:
+        return render_export_data_to_docx_bytes(data, tpl_path, renderer)
+    key = cache.key(data, tpl_path, renderer)
+    content = cache.get(key)
+    if content is None:
+        content, _ = render_export_data_to_docx_bytes(data, tpl_path, renderer)
+        cache.put(key, content)
+    return content, export_filename(data)
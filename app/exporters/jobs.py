@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from app import db
+from app.models import ExportJob, Motie
+from app.exporters.bulk import iter_rendered_docx, stream_zip, unique_name
+from app.exporters.docx_cache import docx_cache
+from app.exporters.motie_docx import motie_export_data, motie_export_query
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS_INTERVAL = 1.0  # seconden tussen twee voortgangsupdates in de database
+EXPIRE_BATCH_SIZE = 500
+STALE_ERROR = "Export onderbroken (server herstart of gestopt); start de export opnieuw."
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def export_job_dir() -> Path:
+    return Path(current_app.config.get("EXPORT_JOB_DIR") or os.path.join(current_app.instance_path, "export_jobs"))
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(1, int(current_app.config.get("EXPORT_JOB_WORKERS") or 1)),
+                thread_name_prefix="export-job",
+            )
+        return _EXECUTOR
+
+
+def start_export_job(job_id: int) -> None:
+    """Laat een job in een achtergrondthread van dit proces draaien.
+
+    Jobs die hier niet afkomen (bijv. na een herstart) pakt ``flask run-export-jobs`` op;
+    een job die midden in het werk bleef hangen zet dat commando op mislukt.
+    """
+    app = current_app._get_current_object()
+
+    def _run():
+        with app.app_context():
+            run_export_job(job_id)
+
+    _executor().submit(_run)
+
+
+def _claim(job_id: int) -> bool:
+    """Zet queued -> running; slaagt voor precies één worker."""
+    claimed = db.session.execute(
+        update(ExportJob)
+        .where(ExportJob.id == job_id, ExportJob.status == ExportJob.STATUS_QUEUED)
+        .values(status=ExportJob.STATUS_RUNNING, started_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def _set_progress(job_id: int, **values) -> None:
+    db.session.execute(update(ExportJob).where(ExportJob.id == job_id).values(**values))
+    db.session.commit()
+
+
+def run_export_job(job_id: int) -> bool:
+    """Voer één exportjob uit; het resultaat komt als ZIP in ``export_job_dir()``."""
+    if not _claim(job_id):
+        return False
+    job = db.session.get(ExportJob, job_id)
+    out_dir = export_job_dir()
+    out_path = out_dir / f"{job.id}.zip"
+    tmp_path = out_dir / f"{job.id}.zip.part"
+    try:
+        params = job.params or {}
+        moties = (
+            motie_export_query()
+            .filter(Motie.id.in_(params.get("motie_ids") or []))
+            .order_by(Motie.id.asc())
+            .all()
+        )
+        items = [motie_export_data(m) for m in moties]
+        _set_progress(job.id, total=len(items), done=0)
+
+        processes = int(current_app.config.get("EXPORT_RENDER_PROCESSES") or 0)
+        rendered = iter_rendered_docx(
+            items,
+            params["template"],
+            processes=processes,
+            cache=docx_cache(),
+            renderer=current_app.config.get("EXPORT_BULK_RENDERER") or "docxtpl",
+        )
+
+        def entries():
+            names: set[str] = set()
+            last = time.monotonic()
+            for count, (content, filename) in enumerate(rendered, start=1):
+                yield unique_name(filename, names), content
+                if time.monotonic() - last >= _PROGRESS_INTERVAL or count == len(items):
+                    _set_progress(job.id, done=count)
+                    last = time.monotonic()
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as fh:
+            for chunk in stream_zip(entries()):
+                fh.write(chunk)
+        os.replace(tmp_path, out_path)
+        _set_progress(
+            job.id,
+            status=ExportJob.STATUS_DONE,
+            done=len(items),
+            result_path=str(out_path),
+            finished_at=datetime.utcnow(),
+        )
+        return True
+    except Exception as exc:
+        logger.exception("Exportjob %s mislukt", job_id)
+        db.session.rollback()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        _set_progress(
+            job_id,
+            status=ExportJob.STATUS_FAILED,
+            error=str(exc)[:1000] or exc.__class__.__name__,
+            finished_at=datetime.utcnow(),
+        )
+        return False
+    finally:
+        db.session.remove()
+
+
+def run_queued_export_jobs() -> int:
+    """Verwerk alle wachtende jobs (voor een aparte worker of cron). Geeft het aantal uitgevoerde jobs."""
+    ran = 0
+    while True:
+        job_id = db.session.execute(
+            db.select(ExportJob.id)
+            .where(ExportJob.status == ExportJob.STATUS_QUEUED)
+            .order_by(ExportJob.id.asc())
+            .limit(1)
+        ).scalar()
+        if job_id is None:
+            return ran
+        if run_export_job(job_id):
+            ran += 1
+
+
+def fail_stale_export_jobs(minutes: int | None = None) -> int:
+    """Zet jobs die al langer dan ``minutes`` op 'running' staan op mislukt.
+
+    Zo'n job hoort bij een worker die gestopt of herstart is; zonder dit blijft de
+    statuspagina er eindeloos op wachten. Een half geschreven ``.part``-bestand ruimt
+    ``expire_export_jobs`` later op.
+    """
+    if minutes is None:
+        minutes = int(current_app.config.get("EXPORT_JOB_STALE_MINUTES") or 60)
+    now = datetime.utcnow()
+    failed = db.session.execute(
+        update(ExportJob)
+        .where(
+            ExportJob.status == ExportJob.STATUS_RUNNING,
+            ExportJob.started_at < now - timedelta(minutes=minutes),
+        )
+        .values(status=ExportJob.STATUS_FAILED, error=STALE_ERROR, finished_at=now)
+    ).rowcount
+    db.session.commit()
+    return failed
+
+
+def _remove(path) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def expire_export_jobs(hours: int | None = None) -> int:
+    """Verwijder afgeronde jobs ouder dan ``hours`` met hun ZIP, plus losse bestanden in de map.
+
+    Geeft het aantal verwijderde jobs terug.
+    """
+    if hours is None:
+        hours = int(current_app.config.get("EXPORT_JOB_RETENTION_HOURS") or 24)
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    total = 0
+    while True:
+        batch = db.session.execute(
+            select(ExportJob.id, ExportJob.result_path)
+            .where(
+                ExportJob.status.in_([ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED]),
+                ExportJob.finished_at < cutoff,
+            )
+            .order_by(ExportJob.id.asc())
+            .limit(EXPIRE_BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        db.session.execute(delete(ExportJob).where(ExportJob.id.in_([row.id for row in batch])))
+        db.session.commit()
+        for row in batch:
+            if row.result_path:
+                _remove(row.result_path)
+        total += len(batch)
+
+    # Bestanden zonder (lopende) job: resten van een afgebroken export of een verwijderde job
+    out_dir = export_job_dir()
+    if out_dir.is_dir():
+        active = {
+            str(out_dir / f"{job_id}.zip{suffix}")
+            for job_id in db.session.execute(
+                select(ExportJob.id).where(ExportJob.status.in_([ExportJob.STATUS_QUEUED, ExportJob.STATUS_RUNNING]))
+            ).scalars()
+            for suffix in ("", ".part")
+        }
+        active.update(
+            path for path in db.session.execute(
+                select(ExportJob.result_path).where(ExportJob.result_path.isnot(None))
+            ).scalars()
+        )
+        old = cutoff.timestamp()
+        for entry in out_dir.iterdir():
+            if entry.is_file() and str(entry) not in active and entry.stat().st_mtime < old:
+                _remove(entry)
+    return total
@@ -2,13 +2,22 @@ from __future__ import annotations
 from io import BytesIO
 from pathlib import Path
 from typing import Iterable, Dict, Any, Optional
+from docx import Document
+from docx.document import Document as DocxDocument
 from docx.shared import Pt, Cm
 from docxtpl import DocxTemplate, InlineImage
+from docxtpl.subdoc import Subdoc
+from jinja2 import Environment
 from slugify import slugify
 from flask import current_app, g
 from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 from collections import OrderedDict
+import copy
 import os
+import re
+import threading
 
 
 
@@ -27,50 +36,57 @@ _BULLET_STYLE_CANDIDATES = [
     "Párrafo de lista",              # ES
 ]
 
-try:
-    import requests  # alleen nodig voor externe logo_url
-except Exception:
-    requests = None
-
-
 def _party_logo_inline(doc, party, width_cm=2.5):
-    """Maak een InlineImage voor het partijlogo (lokaal bestand of via URL)."""
-    if not party:
-        return None
+    """Maak een InlineImage voor het partijlogo.
 
-    # 1) lokaal bestand proberen
-    if getattr(party, "logo_filename", None):
-        local_path = os.path.join(current_app.static_folder, "img", "partijen", party.logo_filename)
-        if os.path.exists(local_path):
-            return InlineImage(doc, local_path, width=Cm(width_cm))
-
-    # 2) URL proberen (optioneel)
-    if getattr(party, "logo_url", None) and requests:
-        try:
-            r = requests.get(party.logo_url, timeout=6)
-            r.raise_for_status()
-            return InlineImage(doc, BytesIO(r.content), width=Cm(width_cm))
-        except Exception:
-            pass
-
-    return None
+    ``party`` is een dict uit ``motie_export_data``; ``logo_path`` wijst naar het al
+    verkleinde logo uit de logo-opslag, dus hier is geen netwerk nodig.
+    """
+    if not party or not party.get("logo_path"):
+        return None
+    if not os.path.exists(party["logo_path"]):
+        return None
+    return InlineImage(doc, party["logo_path"], width=Cm(width_cm))
 
 
 def _chunk(lst, n):
     return [lst[i:i + n] for i in range(0, len(lst), n)]
 
 
-def _find_available_style(doc: DocxTemplate) -> str | None:
-    styles = doc.docx.styles
+def _find_available_style(doc) -> str | None:
+    """Eerste beschikbare opsommingsstijl; ``doc`` is een DocxTemplate of python-docx Document."""
+    styles = doc.docx.styles if isinstance(doc, DocxTemplate) else doc.styles
     names = {s.name for s in styles if s.type == WD_STYLE_TYPE.PARAGRAPH}
     for name in _BULLET_STYLE_CANDIDATES:
         if name in names:
             return name
     return None
 
-def build_bullet_list(doc: DocxTemplate, items):
-    sd = doc.new_subdoc()
-    style_name = _find_available_style(doc)
+
+_AUTO_STYLE = object()
+_BLANK_SUBDOC = None
+
+
+class _BlankSubdoc(Subdoc):
+    """Subdoc op een kopie van een lege body.
+
+    ``DocxTemplate.new_subdoc()`` opent per aanroep het standaarddocument van python-docx;
+    voor een paar opsommingsalinea's is een gekloonde lege body genoeg.
+    """
+
+    def __init__(self, tpl: DocxTemplate):
+        global _BLANK_SUBDOC
+        if _BLANK_SUBDOC is None:
+            _BLANK_SUBDOC = Document().element
+        self.tpl = tpl
+        self.docx = tpl.get_docx()
+        self.subdocx = DocxDocument(copy.deepcopy(_BLANK_SUBDOC), self.docx.part)
+
+
+def build_bullet_list(doc: DocxTemplate, items, style_name=_AUTO_STYLE):
+    sd = _BlankSubdoc(doc)
+    if style_name is _AUTO_STYLE:
+        style_name = _find_available_style(doc)
 
     for txt in (items or []):
         t = str(txt).strip()
@@ -102,6 +118,10 @@ def _ensure_iter(value) -> list[str]:
         return [str(v).strip() for v in value if str(v).strip()]
     return [str(value)]
 
+def _plain_text(value) -> str:
+    # Tekstvakken uit de browser leveren \r\n; in Word wordt elke \n een regeleinde
+    return str(value or "").replace("\r\n", "\n").replace("\r", "\n")
+
 def _filename_for_motie(title: str) -> str:
     # 'Motie <titel>.docx' met veilige bestandsnaam
     safe = slugify(title or "", lowercase=False, separator=" ")
@@ -122,29 +142,155 @@ def _template_path() -> Path:
     # Fallback naar algemene template
     return base / "app" / "templates_word" / "motie.docx"
 
+
+class _CompiledXmlEnvironment(Environment):
+    """Jinja-omgeving die gecompileerde sjabloon-XML onthoudt.
+
+    docxtpl compileert de body, kop- en voetteksten bij elke render opnieuw, terwijl de
+    bron voor hetzelfde sjabloon steeds gelijk is.
+    """
+
+    max_entries = 64
+
+    def __init__(self):
+        super().__init__(autoescape=True)
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals is not None or template_class is not None:
+            return super().from_string(source, globals, template_class)
+        template = self._compiled.get(source)
+        if template is None:
+            template = super().from_string(source)
+            with self._lock:
+                if len(self._compiled) < self.max_entries:
+                    self._compiled[source] = template
+        return template
+
+
+LIST_FIELDS = ("constaterende_dat", "overwegende_dat", "draagt_college_op")
+_LIST_PLACEHOLDER = re.compile(r"\s*\{\{\s*(\w+)\s*\}\}\s*")
+_ROW_LOOP = re.compile(r"^\{%\s*for\s+row\s+in\s+(\w+)\s*%\}\{%\s*set\s+r\s*=\s*row\s*%\}")
+_ROW_ENDFOR = re.compile(r"\{%\s*endfor\s*%\}$")
+
+
+def _control_row(text: str):
+    """Tabelrij met alleen een ``{%tr ... %}``-tag; docxtpl vervangt de hele rij door de tag."""
+    tr = OxmlElement("w:tr")
+    tc = OxmlElement("w:tc")
+    p = OxmlElement("w:p")
+    r = OxmlElement("w:r")
+    t = OxmlElement("w:t")
+    t.text = text
+    r.append(t)
+    p.append(r)
+    tc.append(p)
+    tr.append(tc)
+    return tr
+
+
+def _normalize_template(document) -> tuple[dict[str, int], set[str]]:
+    """Maak de sjabloonconstructies eenduidig voor docxtpl (eenmalig per ingelezen sjabloon).
+
+    - Een alinea met alleen ``{{ constaterende_dat }}`` (enz.) wordt ``{{p ... }}``: de
+      opsomming vervangt dan de hele alinea in plaats van in een ``<w:t>`` te belanden.
+    - Een tabel waarvan de enige rij ``{% for row in X %}{% set r = row %}`` ... ``{% endfor %}``
+      bevat, krijgt een ``{%tr for r in X %}``-lus: elke groep wordt een eigen tabelrij.
+
+    Geeft (kolommen per rijlus, omgezette lijstvelden) terug.
+    """
+    body = document.element.body
+    lists: set[str] = set()
+    for p in body.iter(qn("w:p")):
+        texts = list(p.iter(qn("w:t")))
+        m = _LIST_PLACEHOLDER.fullmatch("".join(t.text or "" for t in texts))
+        if m and m.group(1) in LIST_FIELDS:
+            texts[0].text = "{{p %s }}" % m.group(1)
+            for t in texts[1:]:
+                t.text = ""
+            lists.add(m.group(1))
+
+    row_sizes: dict[str, int] = {}
+    for tbl in body.iter(qn("w:tbl")):
+        rows = tbl.findall(qn("w:tr"))
+        if len(rows) != 1:
+            continue
+        texts = list(rows[0].iter(qn("w:t")))
+        if not texts:
+            continue
+        m = _ROW_LOOP.match(texts[0].text or "")
+        if not m or not _ROW_ENDFOR.search(texts[-1].text or ""):
+            continue
+        texts[0].text = texts[0].text[m.end():]
+        texts[-1].text = _ROW_ENDFOR.sub("", texts[-1].text)
+        rows[0].addprevious(_control_row("{%%tr for r in %s %%}" % m.group(1)))
+        rows[0].addnext(_control_row("{%tr endfor %}"))
+        row_sizes[m.group(1)] = len(rows[0].findall(qn("w:tc")))
+    return row_sizes, lists
+
+
+def _drop_empty_tables(body) -> None:
+    """Een rijlus zonder groepen laat een tabel zonder rijen achter; die opent Word niet."""
+    for tbl in list(body.iter(qn("w:tbl"))):
+        if tbl.find(qn("w:tr")) is None:
+            tbl.getparent().remove(tbl)
+
+
+class _ParsedTemplate:
+    """Eenmaal ingelezen Word-sjabloon; renders werken op een kopie van ``docx``."""
+
+    __slots__ = ("path", "mtime_ns", "docx", "bullet_style", "jinja_env", "row_sizes", "list_fields", "native")
+
+    def __init__(self, path: Path, mtime_ns: int):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.docx = Document(str(path))
+        self.row_sizes, self.list_fields = _normalize_template(self.docx)
+        self.bullet_style = _find_available_style(self.docx)
+        self.jinja_env = _CompiledXmlEnvironment()
+        self.native = {}  # zie app.exporters.motie_native
+
+
+# Per worker-proces: sjabloonpad (dus per tenant) -> ingelezen sjabloon
+_TEMPLATE_CACHE: dict[str, _ParsedTemplate] = {}
+_TEMPLATE_CACHE_LOCK = threading.Lock()
+
+
+def _parsed_template(path: Path) -> _ParsedTemplate:
+    mtime_ns = path.stat().st_mtime_ns
+    key = str(path)
+    entry = _TEMPLATE_CACHE.get(key)
+    if entry is None or entry.mtime_ns != mtime_ns:
+        entry = _ParsedTemplate(path, mtime_ns)
+        with _TEMPLATE_CACHE_LOCK:
+            _TEMPLATE_CACHE[key] = entry
+    return entry
+
 # ---- public API ------------------------------------------------------------
 
-def render_motie_to_docx_bytes(motie, *, vergadering: Optional[str] = None,
-                               datum: Optional[str] = None) -> tuple[bytes, str]:
-    tpl_path = _template_path()
-    if not tpl_path.exists():
-        raise FileNotFoundError(
-            f"Word-sjabloon niet gevonden op {tpl_path}. "
-            f"Zet je vaste format in app/templates_word/motie_template.docx of update _template_path()."
-        )
-    doc = DocxTemplate(str(tpl_path))
+def motie_export_query():
+    """Query voor moties met alles wat ``motie_export_data`` leest.
+
+    Indiener, mede-indieners en hun partijen komen met selectinload mee, zodat een export
+    van N moties een vast aantal queries kost in plaats van enkele per motie.
+    """
+    from sqlalchemy.orm import selectinload
+    from app import db
+    from app.models import Motie, User
 
-    # --- Basisvelden ---
-    titel = getattr(motie, "titel", "") or ""
-    opdracht_formulering = getattr(motie, "opdracht_formulering", "") or ""
-    gemeenteraad_datum = getattr(motie, "gemeenteraad_datum", "") or ""
-    agendapunt = getattr(motie, "agendapunt", "") or ""
+    return db.session.query(Motie).options(
+        selectinload(Motie.indiener).selectinload(User.partij),
+        selectinload(Motie.mede_indieners).selectinload(User.partij),
+    )
 
-    constaterende_dat = build_bullet_list(doc, _ensure_iter(getattr(motie, "constaterende_dat", [])))
-    overwegende_dat   = build_bullet_list(doc, _ensure_iter(getattr(motie, "overwegende_dat", [])))
-    draagt_college_op = build_bullet_list(doc, _ensure_iter(getattr(motie, "draagt_college_op", [])))
 
-    # --- Ondertekenaars (hoofd + mede) ---
+def motie_export_data(motie) -> Dict[str, Any]:
+    """Alle velden die in het Word-document komen, als platte (picklebare) data.
+
+    Zo kan het renderen buiten de request en zonder database gebeuren (bijv. in een
+    apart proces).
+    """
     ondertekenaars = []
     hoofd = getattr(motie, "indiener", None)
     if hoofd:
@@ -171,23 +317,99 @@ def render_motie_to_docx_bytes(motie, *, vergadering: Optional[str] = None,
         if getattr(u, "partij", None):
             unieke_partijen[u.partij.id] = u.partij
 
+    from app.exporters.party_logos import party_logo_store
+
+    logos = party_logo_store()
+    static_folder = current_app.static_folder
+
+    return {
+        "titel": _plain_text(getattr(motie, "titel", "")),
+        "opdracht_formulering": _plain_text(getattr(motie, "opdracht_formulering", "")),
+        "gemeenteraad_datum": _plain_text(getattr(motie, "gemeenteraad_datum", "")),
+        "agendapunt": _plain_text(getattr(motie, "agendapunt", "")),
+        "constaterende_dat": _ensure_iter(getattr(motie, "constaterende_dat", [])),
+        "overwegende_dat": _ensure_iter(getattr(motie, "overwegende_dat", [])),
+        "draagt_college_op": _ensure_iter(getattr(motie, "draagt_college_op", [])),
+        "ondertekenaars": ondertekenaars,
+        "partijen": [
+            {
+                "id": p.id,
+                "naam": p.naam,
+                "afkorting": p.afkorting,
+                "logo_path": logos.resolve(
+                    p.id, getattr(p, "logo_filename", None), getattr(p, "logo_url", None), static_folder
+                ),
+            }
+            for p in unieke_partijen.values()
+        ],
+    }
+
+
+def export_filename(data: Dict[str, Any]) -> str:
+    """Downloadnaam voor ``motie_export_data``-uitvoer."""
+    return _filename_for_motie(data["titel"])
+
+
+def template_path() -> Path:
+    """Pad van het Word-sjabloon voor de huidige tenant (vereist app-context)."""
+    tpl_path = _template_path()
+    if not tpl_path.exists():
+        raise FileNotFoundError(
+            f"Word-sjabloon niet gevonden op {tpl_path}. "
+            f"Zet je vaste format in app/templates_word/motie_template.docx of update _template_path()."
+        )
+    return tpl_path
+
+
+RENDERERS = ("docxtpl", "native")
+
+
+def render_export_data_to_docx_bytes(data: Dict[str, Any], tpl_path: Path | str,
+                                     renderer: str = "docxtpl") -> tuple[bytes, str]:
+    """Render ``motie_export_data``-uitvoer; heeft geen Flask-context nodig.
+
+    ``renderer="native"`` vult een voorgecompileerd skelet van het sjabloon direct met
+    lxml (zie ``app.exporters.motie_native``) en valt terug op docxtpl als het sjabloon
+    of de data daar niet in past.
+    """
+    tpl_path = Path(tpl_path)
+    parsed = _parsed_template(tpl_path)
+    if renderer == "native":
+        from app.exporters.motie_native import render_native
+
+        content = render_native(data, parsed)
+        if content is not None:
+            return content, export_filename(data)
+    elif renderer != "docxtpl":
+        raise ValueError(f"Onbekende renderer: {renderer}")
+    doc = DocxTemplate(str(tpl_path))
+    doc.docx = copy.deepcopy(parsed.docx)
+    bullet_style = parsed.bullet_style
+
+    titel = data["titel"]
+    constaterende_dat = build_bullet_list(doc, data["constaterende_dat"], bullet_style)
+    overwegende_dat   = build_bullet_list(doc, data["overwegende_dat"], bullet_style)
+    draagt_college_op = build_bullet_list(doc, data["draagt_college_op"], bullet_style)
+
+    ondertekenaars = data["ondertekenaars"]
+
     # Maak InlineImages
     partij_logo_items = []
-    for p in unieke_partijen.values():
+    for p in data["partijen"]:
         partij_logo_items.append({
-            "logo": _party_logo_inline(doc, p, width_cm=2.5),
-            "naam": p.naam,
-            "afkorting": p.afkorting,
+            "logo": _party_logo_inline(doc, p, width_cm=2.5) or "",
+            "naam": p["naam"],
+            "afkorting": p["afkorting"],
         })
 
-    # Optioneel: 6 per rij voor in een DOCX-tabel
-    partij_logo_rows = _chunk(partij_logo_items, 6)
+    # Eén tabelrij per groep; de groepsgrootte volgt het aantal kolommen in het sjabloon
+    partij_logo_rows = _chunk(partij_logo_items, parsed.row_sizes.get("partij_logo_rows", 6))
 
     context: Dict[str, Any] = {
         "titel": titel,
-        "gemeenteraad_datum": gemeenteraad_datum,
-        "agendapunt": agendapunt,
-        "opdracht_formulering": opdracht_formulering,
+        "gemeenteraad_datum": data["gemeenteraad_datum"],
+        "agendapunt": data["agendapunt"],
+        "opdracht_formulering": data["opdracht_formulering"],
         "constaterende_dat": constaterende_dat,
         "overwegende_dat": overwegende_dat,
         "draagt_college_op": draagt_college_op,
@@ -197,15 +419,21 @@ def render_motie_to_docx_bytes(motie, *, vergadering: Optional[str] = None,
         "partij_logo_rows": partij_logo_rows,         # lijst van rijen; elke rij is lijst van dicts met 'logo'
     }
 
-    ondertekenaar_rows = _chunk(ondertekenaars, 6)
+    ondertekenaar_rows = _chunk(ondertekenaars, parsed.row_sizes.get("ondertekenaar_rows", 6))
 
     context.update({
         "ondertekenaar_rows": ondertekenaar_rows,
     })
 
 
-    doc.render(context)
+    doc.render(context, jinja_env=parsed.jinja_env, autoescape=True)
+    _drop_empty_tables(doc.docx.element.body)
     bio = BytesIO()
     doc.save(bio)
     bio.seek(0)
-    return bio.read(), _filename_for_motie(titel)
+    return bio.read(), export_filename(data)
+
+
+def render_motie_to_docx_bytes(motie, *, vergadering: Optional[str] = None,
+                               datum: Optional[str] = None) -> tuple[bytes, str]:
+    return render_export_data_to_docx_bytes(motie_export_data(motie), template_path())
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import io
+import re
+import threading
+import zipfile
+from pathlib import Path
+from typing import Any, Dict
+
+from docx.opc.part import XmlPart
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.oxml.shape import CT_Inline
+from docx.shared import Cm
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+from lxml import etree
+from markupsafe import Markup
+
+from app.exporters.motie_docx import LIST_FIELDS, _ParsedTemplate, _chunk, build_bullet_list
+
+# Snelle renderer voor het motiesjabloon.
+#
+# Het sjabloon wordt per worker één keer door docxtpl gerenderd met markeringen in plaats
+# van waarden (een "skelet"). Per motie volstaat dan een kopie van dat skelet waarin de
+# markeringen met lxml worden vervangen: geen Jinja over de hele XML, geen subdocumenten.
+# Alleen de tags uit het standaardsjabloon worden ondersteund; voor elk ander sjabloon (of
+# tekst die docxtpl bijzonder behandelt) valt de aanroeper terug op docxtpl.
+
+SCALAR_FIELDS = ("titel", "gemeenteraad_datum", "agendapunt", "opdracht_formulering")
+ROW_FIELDS = ("partij_logo_rows", "ondertekenaar_rows")
+LOGO_WIDTH = Cm(2.5)
+
+_OPEN, _CLOSE = "\ue000", "\ue001"  # tekens uit het privégebied als markering
+_MARK = re.compile(f"{_OPEN}([^{_CLOSE}]*){_CLOSE}")
+_UNSUPPORTED_CHARS = re.compile(f"[\a\f{_OPEN}{_CLOSE}]")
+_TAG = re.compile(r"\{\{.*?\}\}|\{%.*?%\}", re.DOTALL)
+_SUPPORTED_TAGS = [
+    re.compile(p)
+    for p in (
+        r"\{\{ ?(?:%s) ?\}\}" % "|".join(SCALAR_FIELDS + LIST_FIELDS),
+        r"\{% ?(?:if agendapunt|else|endif|endfor) ?%\}",
+        r"\{%% ?for r in (?:%s) ?%%\}" % "|".join(ROW_FIELDS),
+        r"\{% ?if r\|length ?> ?\d+ ?%\}",
+        r"\{\{ ?r\[\d+\]\.(?:naam|logo) ?\}\}",
+        r"\{\{ ?r\[(\d+)\]\.afkorting or r\[\1\]\.partij or '—' ?\}\}",
+    )
+]
+_compile_lock = threading.Lock()
+
+
+def _mark(*parts) -> str:
+    return _OPEN + "|".join(str(p) for p in parts) + _CLOSE
+
+
+class _CellSlot:
+    """Plaatshouder voor ``r[i]`` in een rijlus; elk veld wordt een markering."""
+
+    def __init__(self, table: str, index: int):
+        self.naam = _mark("cell", table, index, "naam")
+        # ``afkorting or partij or '—'``: de markering staat voor de hele uitdrukking
+        self.afkorting = self.partij = _mark("cell", table, index, "partij")
+        # Zelfde run-opbouw als een InlineImage van docxtpl
+        self.logo = Markup(
+            '</w:t></w:r><w:r><w:t>%s</w:t></w:r><w:r><w:t xml:space="preserve">'
+            % _mark("logo", table, index)
+        )
+
+
+class _Skeleton:
+    __slots__ = ("docx", "bullet")
+
+    def __init__(self, docx, bullet):
+        self.docx = docx
+        self.bullet = bullet  # voorbeeldalinea voor één opsommingsregel
+
+
+def _supported(parsed: _ParsedTemplate) -> bool:
+    tpl = DocxTemplate(str(parsed.path))
+    tpl.docx = parsed.docx
+    for tag in _TAG.findall(tpl.patch_xml(tpl.get_xml())):
+        tag = re.sub(r"\s+", " ", tag)
+        if not any(p.fullmatch(tag) for p in _SUPPORTED_TAGS):
+            return False
+        name = tag.strip("{} ")
+        if name in LIST_FIELDS and name not in parsed.list_fields:
+            return False  # opsomming die niet als eigen alinea in het sjabloon staat
+        if name.startswith("for r in ") and name[len("for r in "):] not in parsed.row_sizes:
+            return False
+    # Kop- en voetteksten, voetnoten en eigenschappen moeten vrij zijn van tags
+    for part in parsed.docx.part.package.iter_parts():
+        if isinstance(part, XmlPart) and part is not parsed.docx.part:
+            xml = part.blob.decode("utf-8", "ignore")
+            if "{{" in xml or "{%" in xml:
+                return False
+    return True
+
+
+def _compile(parsed: _ParsedTemplate, with_agendapunt: bool) -> _Skeleton | None:
+    if not _supported(parsed):
+        return None
+    tpl = DocxTemplate(str(parsed.path))
+    tpl.docx = copy.deepcopy(parsed.docx)
+    context: Dict[str, Any] = {name: _mark("text", name) for name in SCALAR_FIELDS}
+    if not with_agendapunt:
+        context["agendapunt"] = ""
+    for name in LIST_FIELDS:
+        context[name] = Markup("<w:p><w:r><w:t>%s</w:t></w:r></w:p>" % _mark("list", name))
+    for name in ROW_FIELDS:
+        size = parsed.row_sizes.get(name, 0)
+        context[name] = [[_CellSlot(name, i) for i in range(size)]]
+    tpl.render(context, jinja_env=Environment(autoescape=True), autoescape=True)
+
+    stub = DocxTemplate(str(parsed.path))
+    stub.docx = parsed.docx
+    sd = build_bullet_list(stub, [_mark("item")], parsed.bullet_style)
+    bullet = copy.deepcopy(sd.subdocx.element.body.find(qn("w:p")))
+    return _Skeleton(tpl.docx, bullet)
+
+
+def _skeleton(parsed: _ParsedTemplate, with_agendapunt: bool) -> _Skeleton | None:
+    if with_agendapunt not in parsed.native:
+        with _compile_lock:
+            if with_agendapunt not in parsed.native:
+                parsed.native[with_agendapunt] = _compile(parsed, with_agendapunt)
+    return parsed.native[with_agendapunt]
+
+
+# ---- invullen ----------------------------------------------------------------
+
+def _set_text(t, text: str) -> None:
+    """Zet tekst in ``<w:t>`` zoals docxtpl dat doet: \\t wordt een tab-run, \\n een regeleinde."""
+    run = t.getparent()
+    rpr = run.find(qn("w:rPr"))
+    pieces = text.split("\t")
+    targets = [t]
+    anchor = run
+    for piece in pieces[1:]:
+        tab_run = OxmlElement("w:r")
+        if rpr is not None:
+            tab_run.append(copy.deepcopy(rpr))
+        tab_run.append(OxmlElement("w:tab"))
+        text_run = OxmlElement("w:r")
+        if rpr is not None:
+            text_run.append(copy.deepcopy(rpr))
+        new_t = OxmlElement("w:t")
+        new_t.set(qn("xml:space"), "preserve")
+        text_run.append(new_t)
+        anchor.addnext(tab_run)
+        tab_run.addnext(text_run)
+        anchor = text_run
+        targets.append(new_t)
+    if len(pieces) > 1:
+        # Wat in de oorspronkelijke run na de <w:t> stond, schuift mee naar de laatste run
+        for sibling in list(t.itersiblings()):
+            anchor.append(sibling)
+
+    for target, piece in zip(targets, pieces):
+        lines = piece.split("\n")
+        target.text = lines[0]
+        prev = target
+        for line in lines[1:]:
+            br = OxmlElement("w:br")
+            nt = OxmlElement("w:t")
+            nt.set(qn("xml:space"), "preserve")
+            nt.text = line
+            prev.addnext(br)
+            br.addnext(nt)
+            prev = nt
+
+
+def _cell_value(rows, table: str, row_no: int, index: int, field: str) -> str:
+    row = rows[table][row_no]
+    if index >= len(row):
+        return ""
+    item = row[index]
+    if field == "naam":
+        return str(item.get("naam") or "")
+    return str(item.get("afkorting") or item.get("partij") or "—")
+
+
+def _row_no(t, row_index) -> int:
+    tr = next(t.iterancestors(qn("w:tr")), None)
+    return row_index.get(tr, 0)
+
+
+def _fill(t, values: Dict[str, str], rows, row_index) -> None:
+    row_no = _row_no(t, row_index)
+
+    def _value(m):
+        kind, *rest = m.group(1).split("|")
+        if kind == "text":
+            return values[rest[0]]
+        return _cell_value(rows, rest[0], row_no, int(rest[1]), rest[2])
+
+    _set_text(t, _MARK.sub(_value, t.text))
+
+
+def render_native(data: Dict[str, Any], parsed: _ParsedTemplate) -> bytes | None:
+    """Render via het skelet; None als deze motie of dit sjabloon niet native kan."""
+    values = {name: str(data.get(name) or "") for name in SCALAR_FIELDS}
+    texts = list(values.values())
+    texts += [str(s.get(k) or "") for s in data["ondertekenaars"] for k in ("naam", "afkorting", "partij")]
+    texts += [str(v) for name in LIST_FIELDS for v in data[name]]
+    if any(_UNSUPPORTED_CHARS.search(text) for text in texts):
+        return None
+
+    skeleton = _skeleton(parsed, bool(values["agendapunt"]))
+    if skeleton is None:
+        return None
+
+    doc = copy.deepcopy(skeleton.docx)
+    body = doc.element.body
+    rows = {
+        "partij_logo_rows": _chunk(list(data["partijen"]), parsed.row_sizes.get("partij_logo_rows", 6)),
+        "ondertekenaar_rows": _chunk(list(data["ondertekenaars"]), parsed.row_sizes.get("ondertekenaar_rows", 6)),
+    }
+
+    try:
+        # 1. Rijlussen: de skeletrij per groep kopiëren (of weghalen als er niets is)
+        row_index = {}  # skeletrij (of kopie) -> groepsnummer
+        for table in ROW_FIELDS:
+            marks = body.xpath(f'.//w:t[contains(., "{_OPEN}cell|{table}|") or contains(., "{_OPEN}logo|{table}|")]')
+            if not marks:
+                continue
+            tr = next(marks[0].iterancestors(qn("w:tr")))
+            copies = [tr]
+            for _ in rows[table][1:]:
+                clone = copy.deepcopy(tr)
+                copies[-1].addnext(clone)
+                copies.append(clone)
+            if not rows[table]:
+                tbl = tr.getparent()
+                tbl.remove(tr)
+                if tbl.find(qn("w:tr")) is None:
+                    tbl.getparent().remove(tbl)
+                continue
+            for row_no, row_el in enumerate(copies):
+                row_index[row_el] = row_no
+
+        # 2. Opsommingen: de markeringsalinea vervangen door één alinea per regel
+        for t in body.xpath(f'.//w:t[starts-with(., "{_OPEN}list|")]'):
+            name = _MARK.fullmatch(t.text).group(1).split("|")[1]
+            p = next(t.iterancestors(qn("w:p")))
+            for item in data[name]:
+                item = str(item).strip()
+                if not item:
+                    continue
+                new_p = copy.deepcopy(skeleton.bullet)
+                new_p.findall(qn("w:r"))[-1].text = item
+                p.addprevious(new_p)
+            p.getparent().remove(p)
+
+        # 3. Logo's, in documentvolgorde zodat relatie-id's gelijk zijn aan die van docxtpl.
+        # docxtpl maakt alle afbeeldingen vóór het vervangen van de body, dus met één shape-id.
+        shape_id = doc.part.next_id
+        for t in body.xpath(f'.//w:t[starts-with(., "{_OPEN}logo|")]'):
+            _kind, table, index = _MARK.fullmatch(t.text).group(1).split("|")
+            row = rows[table][_row_no(t, row_index)]
+            run = t.getparent()
+            party = row[int(index)] if int(index) < len(row) else None
+            if party and party.get("logo_path") and Path(party["logo_path"]).exists():
+                drawing_run = OxmlElement("w:r")
+                drawing = OxmlElement("w:drawing")
+                rid, image = doc.part.get_or_add_image(party["logo_path"])
+                cx, cy = image.scaled_dimensions(LOGO_WIDTH, None)
+                drawing.append(CT_Inline.new_pic_inline(shape_id, rid, image.filename, cx, cy))
+                drawing_run.append(drawing)
+                run.addprevious(drawing_run)
+            run.getparent().remove(run)
+
+        # 4. Tekst
+        for t in body.xpath(f'.//w:t[contains(., "{_OPEN}")]'):
+            _fill(t, values, rows, row_index)
+
+        # Zelfde nummering van tekenobjecten als docxtpl (fix_docpr_ids)
+        for i, docpr in enumerate(body.xpath(".//wp:docPr"), start=1001):
+            docpr.set("id", str(i))
+    except ValueError:
+        # bijv. tekens die niet in XML mogen; docxtpl laat die via recover-parsing vallen
+        return None
+
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+# ---- vergelijken ----------------------------------------------------------------
+
+def _structure(content: bytes) -> etree._Element:
+    """document.xml in vergelijkbare vorm: lege runs weg, afbeeldingen op inhoud."""
+    zf = zipfile.ZipFile(io.BytesIO(content))
+    root = etree.fromstring(zf.read("word/document.xml"))
+    rels = etree.fromstring(zf.read("word/_rels/document.xml.rels"))
+    targets = {r.get("Id"): r.get("Target") for r in rels}
+    body = root.find(qn("w:body"))
+    for r in list(body.iter(qn("w:r"))):
+        children = [c for c in r if c.tag != qn("w:rPr")]
+        if all(c.tag == qn("w:t") and not c.text for c in children):
+            r.getparent().remove(r)
+    for blip in body.iter(qn("a:blip")):
+        media = zf.read("word/" + targets[blip.get(qn("r:embed"))])
+        blip.set(qn("r:embed"), hashlib.sha1(media).hexdigest())
+    for docpr in body.iter(qn("wp:docPr")):
+        docpr.attrib.pop("id", None)
+    for el in body.iter():
+        # docxtpl voegt afbeeldingen ingesprongen in; die witruimte telt niet
+        if el.tag != qn("w:t") and el.text is not None and not el.text.strip():
+            el.text = None
+        if el.tail is not None and not el.tail.strip():
+            el.tail = None
+    return body
+
+
+def compare_renderers(data: Dict[str, Any], tpl_path: Path | str) -> str | None:
+    """Render met beide renderers; None als de documenten structureel gelijk zijn, anders het eerste verschil."""
+    from app.exporters.motie_docx import render_export_data_to_docx_bytes
+
+    reference, _ = render_export_data_to_docx_bytes(data, tpl_path, renderer="docxtpl")
+    native, _ = render_export_data_to_docx_bytes(data, tpl_path, renderer="native")
+    if reference == native:
+        return None
+    a, b = _structure(reference), _structure(native)
+    for x, y in zip(a.iter(), b.iter()):
+        if x.tag != y.tag or dict(x.attrib) != dict(y.attrib) or (x.text or "") != (y.text or ""):
+            path = etree.ElementTree(a).getpath(x)
+            return f"{path}: {etree.tostring(x)[:200]!r} != {etree.tostring(y)[:200]!r}"
+    if sum(1 for _ in a.iter()) != sum(1 for _ in b.iter()):
+        return "aantal elementen verschilt"
+    return None
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+
+from flask import current_app
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024
+USER_AGENT = "Motio/1.0 (partijlogo)"
+
+
+def normalize_logo(raw: bytes, max_px: int) -> bytes | None:
+    """Schaal een logo terug tot maximaal ``max_px`` pixels en sla het op als PNG.
+
+    Geeft None als Pillow het bestand niet kan lezen (bijv. SVG).
+    """
+    try:
+        img = Image.open(BytesIO(raw))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        img.thumbnail((max_px, max_px), Image.LANCZOS)
+        out = BytesIO()
+        img.save(out, "PNG", optimize=True)
+        return out.getvalue()
+    except Exception:
+        return None
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+class PartyLogoStore:
+    """Genormaliseerde partijlogo's op schijf, per partij en bron.
+
+    Lokale uploads worden één keer verkleind. Logo's van een URL worden bij de eerste
+    export opgehaald en daarna alleen nog op de achtergrond gerevalideerd (ETag /
+    Last-Modified) als de laatste controle ouder is dan ``revalidate_seconds``. Mislukt de
+    eerste download, dan legt de meta dat vast en volgt een nieuwe poging ook alleen op de
+    achtergrond, zodat een dode URL exports niet steeds ophoudt.
+    """
+
+    _inflight: set[str] = set()
+    _inflight_lock = threading.Lock()
+
+    def __init__(self, directory: str | Path, max_px: int = 300,
+                 revalidate_seconds: int = 86400, timeout: float = 6.0):
+        self.directory = Path(directory)
+        self.max_px = max_px
+        self.revalidate_seconds = revalidate_seconds
+        self.timeout = timeout
+
+    # ---- paden -------------------------------------------------------------
+    def _base(self, party_id, source: str) -> Path:
+        digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"{party_id}-{digest}"
+
+    def _read_meta(self, base: Path) -> dict:
+        try:
+            return json.loads(base.with_suffix(".json").read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, base: Path, meta: dict) -> None:
+        _write_atomic(base.with_suffix(".json"), json.dumps(meta).encode("utf-8"))
+
+    def _record_failure(self, base: Path, meta: dict, url: str) -> bool:
+        meta.update({"url": url, "failed": True, "checked_at": time.time()})
+        self._write_meta(base, meta)
+        return False
+
+    # ---- publiek -------------------------------------------------------------
+    def resolve(self, party_id, logo_filename: str | None, logo_url: str | None,
+                static_folder: str) -> str | None:
+        """Pad naar het genormaliseerde logo, of None als er (nog) geen bruikbaar logo is."""
+        try:
+            if logo_filename:
+                return self._resolve_local(party_id, os.path.join(static_folder, "img", "partijen", logo_filename))
+            if logo_url:
+                return self._resolve_remote(party_id, logo_url)
+        except OSError:
+            logger.warning("Partijlogo %s kon niet worden opgeslagen", party_id, exc_info=True)
+        return None
+
+    def refresh(self, party_id, url: str) -> bool:
+        """Haal een URL-logo (opnieuw) op; stuurt de bekende ETag/Last-Modified mee."""
+        base = self._base(party_id, url)
+        meta = self._read_meta(base)
+        png = base.with_suffix(".png")
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        if png.exists():
+            if meta.get("etag"):
+                request.add_header("If-None-Match", meta["etag"])
+            if meta.get("last_modified"):
+                request.add_header("If-Modified-Since", meta["last_modified"])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                raw = resp.read(MAX_DOWNLOAD_BYTES + 1)
+                headers = resp.headers
+        except urllib.error.HTTPError as exc:
+            if exc.code == 304:
+                meta.pop("failed", None)
+                meta["checked_at"] = time.time()
+                self._write_meta(base, meta)
+                return True
+            logger.info("Partijlogo %s ophalen mislukt: HTTP %s", url, exc.code)
+            return self._record_failure(base, meta, url)
+        except (urllib.error.URLError, OSError, ValueError):
+            logger.info("Partijlogo %s ophalen mislukt", url, exc_info=True)
+            return self._record_failure(base, meta, url)
+
+        if len(raw) > MAX_DOWNLOAD_BYTES:
+            logger.info("Partijlogo %s is groter dan %s bytes; overgeslagen", url, MAX_DOWNLOAD_BYTES)
+            return self._record_failure(base, meta, url)
+        normalized = normalize_logo(raw, self.max_px)
+        if normalized is None:
+            return self._record_failure(base, meta, url)
+        _write_atomic(png, normalized)
+        self._write_meta(base, {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "checked_at": time.time(),
+        })
+        return True
+
+    def refresh_async(self, party_id, url: str) -> None:
+        """Revalideer op de achtergrond; dubbele verzoeken voor hetzelfde logo vallen weg."""
+        key = str(self._base(party_id, url))
+        with self._inflight_lock:
+            if key in self._inflight:
+                return
+            self._inflight.add(key)
+
+        def _run():
+            try:
+                self.refresh(party_id, url)
+            except Exception:
+                logger.warning("Partijlogo %s revalideren mislukt", url, exc_info=True)
+            finally:
+                with self._inflight_lock:
+                    self._inflight.discard(key)
+
+        threading.Thread(target=_run, name="party-logo-refresh", daemon=True).start()
+
+    # ---- intern --------------------------------------------------------------
+    def _resolve_local(self, party_id, source_path: str) -> str | None:
+        try:
+            st = os.stat(source_path)
+        except OSError:
+            return None
+        png = self._base(party_id, f"{source_path}:{st.st_mtime_ns}:{st.st_size}").with_suffix(".png")
+        if not png.exists():
+            with open(source_path, "rb") as fh:
+                normalized = normalize_logo(fh.read(), self.max_px)
+            if normalized is None:
+                return None
+            _write_atomic(png, normalized)
+        return str(png)
+
+    def _resolve_remote(self, party_id, url: str) -> str | None:
+        base = self._base(party_id, url)
+        png = base.with_suffix(".png")
+        meta = self._read_meta(base)
+        if not png.exists():
+            if not meta.get("failed"):
+                # Eerste keer: eenmalig synchroon ophalen
+                if not self.refresh(party_id, url):
+                    return None
+                return str(png) if png.exists() else None
+            # Eerdere poging mislukt: export zonder logo, opnieuw proberen alleen op de achtergrond
+            if time.time() - (meta.get("checked_at") or 0) > self.revalidate_seconds:
+                self.refresh_async(party_id, url)
+            return None
+        if time.time() - (meta.get("checked_at") or 0) > self.revalidate_seconds:
+            self.refresh_async(party_id, url)
+        return str(png)
+
+
+def party_logo_store() -> PartyLogoStore:
+    """Logo-opslag volgens de app-config."""
+    directory = current_app.config.get("PARTY_LOGO_CACHE_DIR") or os.path.join(current_app.instance_path, "party_logos")
+    return PartyLogoStore(
+        directory,
+        max_px=int(current_app.config.get("PARTY_LOGO_MAX_PX") or 300),
+        revalidate_seconds=int(current_app.config.get("PARTY_LOGO_REVALIDATE_SECONDS") or 86400),
+    )
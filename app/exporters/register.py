@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+from datetime import datetime
+from typing import IO, Any, Iterator, List
+
+from sqlalchemy import select
+
+from app import db
+
+REGISTER_BATCH = 500
+
+REGISTER_COLUMNS = [
+    ("ID", 8),
+    ("Titel", 60),
+    ("Status", 22),
+    ("Raadsvergadering", 18),
+    ("Agendapunt", 12),
+    ("Aangemaakt", 18),
+    ("Laatst gewijzigd", 18),
+    ("Indiener", 28),
+    ("Partij indiener", 16),
+    ("Mede-indieners", 50),
+    ("Partijen", 24),
+]
+
+
+# Tekens waarmee Excel/LibreOffice een cel als formule lezen (CSV/formula injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _is_formula_like(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(_FORMULA_PREFIXES)
+
+
+def escape_csv_value(value: Any) -> Any:
+    """Tekst die als formule gelezen zou worden krijgt een apostrof ervoor."""
+    return "'" + value if _is_formula_like(value) else value
+
+
+def _stamp(value: datetime | None) -> str:
+    return value.strftime("%d-%m-%Y %H:%M") if value else ""
+
+
+def register_rows(jaar: int | None = None, batch_size: int = REGISTER_BATCH) -> Iterator[List[Any]]:
+    """Eén rij per motie voor het motieregister, op volgorde van aanmaken.
+
+    De moties komen in batches van ``batch_size`` uit een server-side cursor (``yield_per``);
+    de mede-indieners worden per batch in één query opgehaald. Gebruikers en partijen van de
+    tenant staan in één kleine opzoektabel, zodat het geheugengebruik niet meegroeit met het
+    aantal moties.
+    """
+    from app.models import Motie, Party, User, motie_medeindieners
+
+    users = {
+        uid: (naam, afkorting)
+        for uid, naam, afkorting in db.session.execute(
+            select(User.id, User.naam, Party.afkorting).outerjoin(Party, User.partij_id == Party.id)
+        )
+    }
+
+    stmt = select(
+        Motie.id,
+        Motie.titel,
+        Motie.status,
+        Motie.gemeenteraad_datum,
+        Motie.agendapunt,
+        Motie.created_at,
+        Motie.updated_at,
+        Motie.indiener_id,
+    ).order_by(Motie.created_at.asc(), Motie.id.asc())
+    if jaar:
+        stmt = stmt.where(Motie.created_at >= datetime(jaar, 1, 1), Motie.created_at < datetime(jaar + 1, 1, 1))
+
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for batch in result.partitions():
+        mede: dict[int, list[int]] = {}
+        for motie_id, user_id in db.session.execute(
+            select(motie_medeindieners.c.motie_id, motie_medeindieners.c.user_id)
+            .where(motie_medeindieners.c.motie_id.in_([row.id for row in batch]))
+        ):
+            mede.setdefault(motie_id, []).append(user_id)
+
+        for row in batch:
+            naam, afkorting = users.get(row.indiener_id, (None, None))
+            mede_users = sorted(
+                (users[uid] for uid in mede.get(row.id, []) if uid in users),
+                key=lambda u: (u[0] or "").lower(),
+            )
+            partijen: list[str] = []
+            for _naam, partij in [(naam, afkorting), *mede_users]:
+                if partij and partij not in partijen:
+                    partijen.append(partij)
+            yield [
+                row.id,
+                row.titel or "",
+                row.status or "",
+                row.gemeenteraad_datum or "",
+                row.agendapunt or "",
+                _stamp(row.created_at),
+                _stamp(row.updated_at),
+                naam or "",
+                afkorting or "",
+                ", ".join(u[0] for u in mede_users if u[0]),
+                ", ".join(partijen),
+            ]
+
+
+def iter_register_csv(rows: Iterator[List[Any]], flush_every: int = REGISTER_BATCH) -> Iterator[bytes]:
+    """CSV-bytes in stukken; puntkomma en BOM zodat Excel (NL) het direct goed opent."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow([name for name, _width in REGISTER_COLUMNS])
+    yield codecs.BOM_UTF8 + buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([escape_csv_value(value) for value in row])
+        if count % flush_every == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def write_register_xlsx(rows: Iterator[List[Any]], fh: IO[bytes]) -> None:
+    """Schrijf het register als XLSX naar ``fh`` met openpyxl in write-only-modus.
+
+    Write-only houdt geen cellen in het geheugen vast: elke rij gaat direct naar een tijdelijk
+    werkbladbestand en ``save`` pakt dat daarna in. Tekst die met ``=`` e.d. begint wordt als
+    tekst opgeslagen, niet als formule.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Motieregister")
+    for idx, (_name, width) in enumerate(REGISTER_COLUMNS, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+    ws.freeze_panes = "A2"
+
+    bold = Font(bold=True)
+    header = []
+    for name, _width in REGISTER_COLUMNS:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = bold
+        header.append(cell)
+    ws.append(header)
+    for row in rows:
+        ws.append([_text_cell(ws, value) if _is_formula_like(value) else value for value in row])
+    wb.save(fh)
+
+
+def _text_cell(ws, value: str):
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(ws, value=value)
+    cell.data_type = "s"
+    return cell
@@ -1,4 +1,4 @@
-from flask import render_template, current_app, request, flash, redirect, url_for, abort
+from flask import render_template, current_app, request, flash, redirect, url_for, abort, jsonify, make_response
 from app.models import User, Party, Notification
 from app.gebruikers import bp
 from flask_login import login_required, current_user
@@ -7,10 +7,18 @@ from app.gebruikers.forms import ProfileUpdateForm
 from app.auth.routes import _allowed_profile, _save_profile_file
 from app import db, send_email
 from app.email_utils import render_email
+from app.notifications import (
+    DIGEST_PREF_KEY,
+    DIGEST_FREQUENCIES,
+    digest_frequency_for,
+    notification_counts,
+)
 import secrets
 from werkzeug.security import generate_password_hash
 from app.auth.utils import user_has_role, roles_required, login_and_active_required
-from sqlalchemy import func
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import undefer
+from datetime import datetime
 
 
 @bp.before_request
@@ -24,6 +32,9 @@ def _gebruikers_role_guard():
             "gebruikers.settings",
             "gebruikers.email_settings",
             "gebruikers.mark_all_read",
+            "gebruikers.notifications",
+            "gebruikers.notification_status",
+            "gebruikers.notification_bell",
         }
         if request.endpoint not in allowed:
             abort(403)
@@ -210,6 +221,100 @@ def mark_all_read():
     return redirect(request.referrer or "/")
 
 
+INBOX_PAGE_SIZE = 25
+
+
+def _parse_inbox_cursor(raw: str | None):
+    """Cursor '<created_at iso>_<id>' -> (datetime, id); None bij ontbreken of ongeldige waarde."""
+    if not raw or "_" not in raw:
+        return None
+    stamp, _, nid = raw.rpartition("_")
+    try:
+        return datetime.fromisoformat(stamp), int(nid)
+    except ValueError:
+        return None
+
+
+@bp.route('/notificaties')
+@login_and_active_required
+def notifications():
+    only_unread = request.args.get('ongelezen') == '1'
+    cursor = _parse_inbox_cursor(request.args.get('na'))
+
+    q = (
+        Notification.query
+        .options(undefer(Notification.payload))
+        .filter(Notification.user_id == current_user.id)
+    )
+    if only_unread:
+        q = q.filter(Notification.read_at.is_(None))
+    if cursor:
+        created_at, nid = cursor
+        q = q.filter(
+            or_(
+                Notification.created_at < created_at,
+                and_(Notification.created_at == created_at, Notification.id < nid),
+            )
+        )
+    rows = (
+        q.order_by(Notification.created_at.desc(), Notification.id.desc())
+        .limit(INBOX_PAGE_SIZE + 1)
+        .all()
+    )
+    has_more = len(rows) > INBOX_PAGE_SIZE
+    rows = rows[:INBOX_PAGE_SIZE]
+    next_cursor = f"{rows[-1].created_at.isoformat()}_{rows[-1].id}" if has_more else None
+
+    return render_template(
+        'gebruikers/notificaties.html',
+        items=rows,
+        only_unread=only_unread,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
+        title='Notificaties',
+    )
+
+
+BELL_SIZE = 10
+
+
+@bp.get('/notificaties/status')
+@login_and_active_required
+def notification_status():
+    """Badge-tellingen en het id van de nieuwste melding; de browser vraagt dit periodiek op.
+
+    Twee goedkope queries per keer. De lijst in de bel haalt de browser pas op
+    (``notification_bell``) als ``latest_id`` veranderd is.
+    """
+    latest_id = (
+        db.session.query(func.max(Notification.id))
+        .filter(Notification.user_id == current_user.id)
+        .scalar()
+    ) or 0
+    data = notification_counts(current_user)
+    data["latest_id"] = latest_id
+    resp = jsonify(data)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+@bp.get('/notificaties/bel')
+@login_and_active_required
+def notification_bell():
+    """HTML van de laatste meldingen voor de bel."""
+    items = (
+        Notification.query
+        .options(undefer(Notification.payload))
+        .filter(Notification.user_id == current_user.id)
+        .order_by(Notification.created_at.desc())
+        .limit(BELL_SIZE)
+        .all()
+    )
+    resp = make_response(render_template("gebruikers/_notificatie_items.html", bell_items=items))
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
 @bp.get('/<int:notification_id>/open')
 @login_and_active_required
 def open(notification_id: int):
@@ -323,9 +428,10 @@ def email_settings():
     try:
         stored = getattr(user, 'email_prefs', None) or {}
         if isinstance(stored, dict):
-            prefs.update({k: bool(v) for k, v in stored.items()})
+            prefs.update({k: bool(v) for k, v in stored.items() if k in defaults})
     except Exception:
         pass
+    digest_frequency = digest_frequency_for(user)
 
     if request.method == 'POST':
         form_vals = request.form
@@ -334,6 +440,8 @@ def email_settings():
             # Checkboxes only present when checked
             form_key = f"pref__{key}"
             updated[key] = True if form_vals.get(form_key) == 'on' else False
+        frequency = form_vals.get('digest_frequency')
+        updated[DIGEST_PREF_KEY] = frequency if frequency in DIGEST_FREQUENCIES else 'instant'
         user.email_prefs = updated
         db.session.commit()
         flash('E-mailmeldingen opgeslagen.', 'success')
@@ -346,6 +454,7 @@ def email_settings():
     return render_template(
         'gebruikers/instellingen_email.html',
         prefs=prefs,
+        digest_frequency=digest_frequency,
         show_griffie=show_griffie,
         title='E-mailmeldingen'
     )
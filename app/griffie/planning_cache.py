@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import date
+from typing import Any, Dict, List
+
+import pandas as pd
+from flask import current_app, g
+
+from app.exporters.docx_cache import ContentCache
+
+# Verhogen als de verwerking of de opmaak van de uitvoer verandert: oude resultaten vervallen dan
+CACHE_FORMAT = "jaarplanning-1"
+
+
+class PlanningCache(ContentCache):
+    """Resultaten van eerdere jaarplanning-uploads.
+
+    Drie soorten items, allemaal op inhoud geadresseerd:
+      - de complete uitvoer (xlsx), op bestandshash + peildatum + vergelijkingsbasis;
+      - per upload een 'run': per rij de inhoudshash, de waarden en de genormaliseerde datum;
+      - per tenant welke uploads de laatste en de voorlaatste waren.
+    """
+
+    suffix = ".bin"
+    label = "Jaarplanning-cache"
+
+    def get_json(self, key: str) -> Any:
+        content = self.get(key)
+        if content is None:
+            return None
+        try:
+            return json.loads(gzip.decompress(content))
+        except (OSError, ValueError):
+            return None
+
+    def put_json(self, key: str, value: Any) -> None:
+        self.put(key, gzip.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), compresslevel=5))
+
+
+def planning_cache() -> PlanningCache | None:
+    """Cache volgens de app-config; None als JAARPLANNING_CACHE_MAX_BYTES 0 is."""
+    max_bytes = int(current_app.config.get("JAARPLANNING_CACHE_MAX_BYTES") or 0)
+    if max_bytes <= 0:
+        return None
+    directory = (
+        current_app.config.get("JAARPLANNING_CACHE_DIR")
+        or os.path.join(current_app.instance_path, "jaarplanning_cache")
+    )
+    return PlanningCache(directory, max_bytes)
+
+
+def _key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps([CACHE_FORMAT, *parts], default=str).encode("utf-8")).hexdigest()
+
+
+def upload_digest(stream) -> str:
+    """sha256 van een upload; de stream staat daarna weer aan het begin."""
+    h = hashlib.sha256()
+    for block in iter(lambda: stream.read(1 << 16), b""):
+        h.update(block)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def output_key(file_hash: str, reference: date, base_hash: str | None) -> str:
+    return _key("output", file_hash, reference.isoformat(), base_hash)
+
+
+def run_key(file_hash: str) -> str:
+    return _key("run", file_hash)
+
+
+def _state_key() -> str:
+    tenant = getattr(g, "tenant", None)
+    return _key("state", getattr(tenant, "id", None))
+
+
+def comparison_base(cache: PlanningCache, file_hash: str) -> str | None:
+    """De upload waartegen vergeleken wordt: de laatste die níet hetzelfde bestand was.
+
+    Een identieke herupload vergelijkt dus opnieuw met dezelfde basis en levert dezelfde uitvoer.
+    """
+    state = cache.get_json(_state_key()) or {}
+    if state.get("current") == file_hash:
+        return state.get("previous")
+    return state.get("current")
+
+
+def remember_upload(cache: PlanningCache, file_hash: str) -> None:
+    state = cache.get_json(_state_key()) or {}
+    if state.get("current") != file_hash:
+        cache.put_json(_state_key(), {"current": file_hash, "previous": state.get("current")})
+
+
+def row_hashes(df: pd.DataFrame) -> pd.Series:
+    """Inhoudshash per rij (over alle kolommen), als hex-tekst."""
+    hashed = pd.util.hash_pandas_object(df.astype("string").fillna(""), index=False)
+    return hashed.map("{:016x}".format)
+
+
+def row_keys(df: pd.DataFrame) -> List[str]:
+    """Identiteit van een rij over uploads heen: zaaknummer als dat er is, anders het onderwerp."""
+    lower = {c.lower(): c for c in df.columns}
+    source = df[lower["zaaknummer"]].fillna(df[lower["onderwerp"]]) if "zaaknummer" in lower else df[lower["onderwerp"]]
+    keys: List[str] = []
+    seen: Dict[str, int] = {}
+    for value in source.fillna("").astype(str):
+        count = seen[value] = seen.get(value, 0) + 1
+        keys.append(value if count == 1 else f"{value} #{count}")
+    return keys
+
+
+def build_run(df: pd.DataFrame, hashes: pd.Series, normalized: pd.Series) -> Dict[str, Any]:
+    """Wat van een upload bewaard wordt om de volgende mee te vergelijken."""
+    values = df.astype(object).where(df.notna(), None).values.tolist()
+    dates = [None if pd.isna(v) else v.date().isoformat() for v in normalized]
+    return {
+        "columns": [c.lower() for c in df.columns],
+        "names": [str(c) for c in df.columns],
+        "rows": {
+            key: [row_hash, row, day]
+            for key, row_hash, row, day in zip(row_keys(df), hashes, values, dates)
+        },
+    }
+
+
+def cached_dates(run: Dict[str, Any] | None) -> Dict[str, str | None]:
+    """Rijhash -> genormaliseerde datum (ISO) uit een eerdere run."""
+    if not run:
+        return {}
+    return {row_hash: day for row_hash, _row, day in run.get("rows", {}).values()}
+
+
+def planning_changes(previous: Dict[str, Any] | None, current: Dict[str, Any]) -> pd.DataFrame:
+    """Verschillen tussen twee runs: nieuwe, gewijzigde en vervallen rijen."""
+    columns = ["Wijziging", "Onderwerp", "Zaaknummer", "Gewijzigde kolommen",
+               "Huidige planning (vorige)", "Huidige planning (nu)"]
+    def _get(run, row, name):
+        try:
+            return row[run["columns"].index(name)]
+        except ValueError:
+            return None
+
+    changes = []
+    old_rows = previous.get("rows", {}) if previous else {}
+    if not previous:
+        changes.append(["Eerste upload", "Er is nog geen eerdere upload om mee te vergelijken.", None, None, None, None])
+    for key, (row_hash, row, _day) in (current["rows"].items() if previous else ()):
+        old = old_rows.get(key)
+        if old is None:
+            changes.append(["Nieuw", _get(current, row, "onderwerp"), _get(current, row, "zaaknummer"), None,
+                            None, _get(current, row, "huidige planning")])
+        elif old[0] != row_hash:
+            changed = [
+                label for name, label in zip(current["columns"], current["names"])
+                if _get(current, row, name) != _get(previous, old[1], name)
+            ]
+            changes.append(["Gewijzigd", _get(current, row, "onderwerp"), _get(current, row, "zaaknummer"),
+                            ", ".join(changed), _get(previous, old[1], "huidige planning"),
+                            _get(current, row, "huidige planning")])
+    for key, (_hash, row, _day) in old_rows.items():
+        if key not in current["rows"]:
+            changes.append(["Vervallen", _get(previous, row, "onderwerp"), _get(previous, row, "zaaknummer"), None,
+                            _get(previous, row, "huidige planning"), None])
+    if not changes:
+        changes.append(["Geen wijzigingen", None, None, None, None, None])
+    result = pd.DataFrame(changes, columns=columns)
+    if "zaaknummer" not in current["columns"]:
+        result = result.drop(columns=["Zaaknummer"])
+    return result
@@ -1,8 +1,12 @@
 ﻿# jaarplanning.py
+import csv
 import io
 import json
 import re
+from copy import copy
 from datetime import datetime, date
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from decimal import Decimal, ROUND_HALF_UP
 from zoneinfo import ZoneInfo
 from app.griffie import bp
@@ -14,14 +18,31 @@ import datetime as dt
 from sqlalchemy import nullslast
 from sqlalchemy.orm import selectinload
 from flask import abort
+import numpy as np
 import pandas as pd
-from flask import Blueprint, render_template, request, send_file, flash, redirect, url_for, current_app, g
+from flask import Blueprint, render_template, request, send_file, flash, redirect, url_for, current_app, g, Response, stream_with_context, jsonify
 from werkzeug.utils import secure_filename
 from dateutil.parser import parse as dt_parse
 from dateutil.relativedelta import relativedelta
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
+from app.dashboard.widgets import cached_widget, widget_response
 from app.griffie.forms import SpeakingTimeForm
+from app.meeting_dates import parse_meeting_date
+from app.parallel_queries import run_queries
+from app.griffie.planning_cache import (
+    build_run,
+    cached_dates,
+    comparison_base,
+    output_key,
+    planning_cache,
+    planning_changes,
+    remember_upload,
+    row_hashes,
+    run_key,
+    upload_digest,
+)
+from app.griffie.speaking_cache import composition_digest, party_composition, speaking_pdf_cache
 
 REQUIRED_COLS = [
     "onderwerp",
@@ -298,10 +319,34 @@ def calculate_speaking_distribution(
     }
 
 
-def generate_speaking_pdf(result, *, committee_label: str, meeting_date: date):
-    formatted_date = format_full_date_nl(meeting_date)
-    title_text = f"Spreektijden {committee_label} van {formatted_date}"
+@lru_cache(maxsize=512)
+def _cached_distribution(composition, params):
+    return calculate_speaking_distribution(composition, **dict(params))
+
+
+def speaking_distribution(composition, **params):
+    """``calculate_speaking_distribution`` met een cache per proces.
+
+    ``composition`` komt uit ``party_composition``; de zetelverdeling zit dus in de sleutel en
+    een wijziging daarvan maakt vanzelf een nieuwe berekening. Het resultaat wordt gedeeld
+    tussen requests en mag niet aangepast worden.
+    """
+    return _cached_distribution(composition, tuple(sorted(params.items())))
+
 
+def preset_params(preset, speakers_count: int) -> dict:
+    return {
+        "total_minutes": preset["total_minutes"],
+        "chair_minutes": preset["chair_minutes"],
+        "pause_minutes": preset["pause_minutes"],
+        "college_minutes": preset["college_minutes"],
+        "speaker_slot_minutes": preset.get("speaker_slot_minutes", 5),
+        "speakers_count": speakers_count,
+    }
+
+
+def render_speaking_pdf(pages) -> bytes:
+    """PDF met één pagina per (titel, resultaat)."""
     buffer = io.BytesIO()
 
     from reportlab.lib import colors
@@ -310,6 +355,7 @@ def generate_speaking_pdf(result, *, committee_label: str, meeting_date: date):
     from reportlab.lib.units import mm
     from reportlab.platypus import (
         SimpleDocTemplate,
+        PageBreak,
         Paragraph,
         Spacer,
         Table,
@@ -323,60 +369,99 @@ def generate_speaking_pdf(result, *, committee_label: str, meeting_date: date):
         rightMargin=20 * mm,
         topMargin=20 * mm,
         bottomMargin=20 * mm,
+        title=pages[0][0] if len(pages) == 1 else "Spreektijden",
     )
     styles = getSampleStyleSheet()
-    elements = [
-        Paragraph(title_text, styles["Title"]),
-        Spacer(1, 12),
-    ]
-
-    table_data = [
-        ["Fractie", "Spreektijd (u:mm:ss)"],
-    ]
-    for row in result["distribution"]:
-        label = row["name"]
-        if row.get("abbreviation"):
-            label = f"{label} ({row['abbreviation']})"
-        table_data.append(
-            [
-                label,
-                row["total_time"],
-            ]
-        )
-    table_data.append(
+    table_style = TableStyle(
         [
-            "College",
-            result["college"]["time"],
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f2937")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
+            ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
         ]
     )
 
-    table = Table(table_data, hAlign="LEFT")
-    table.setStyle(
-        TableStyle(
+    elements = []
+    for index, (title_text, result) in enumerate(pages):
+        if index:
+            elements.append(PageBreak())
+        elements += [
+            Paragraph(escape(title_text), styles["Title"]),
+            Spacer(1, 12),
+        ]
+
+        table_data = [
+            ["Fractie", "Spreektijd (u:mm:ss)"],
+        ]
+        for row in result["distribution"]:
+            label = row["name"]
+            if row.get("abbreviation"):
+                label = f"{label} ({row['abbreviation']})"
+            table_data.append(
+                [
+                    label,
+                    row["total_time"],
+                ]
+            )
+        table_data.append(
             [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f2937")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
-                ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
+                "College",
+                result["college"]["time"],
             ]
         )
-    )
-    elements.append(table)
+
+        table = Table(table_data, hAlign="LEFT")
+        table.setStyle(table_style)
+        elements.append(table)
 
     doc.build(elements)
-    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def cached_speaking_pdf(composition, pages) -> bytes:
+    """``render_speaking_pdf`` via de schijfcache; ``pages`` is een lijst (titel, params)."""
+    cache = speaking_pdf_cache()
+    key = cache.key(composition, pages) if cache is not None else None
+    content = cache.get(key) if cache is not None else None
+    if content is None:
+        content = render_speaking_pdf(
+            [(title_text, speaking_distribution(composition, **params)) for title_text, params in pages]
+        )
+        if cache is not None:
+            cache.put(key, content)
+    return content
 
+
+def _pdf_response(content: bytes, title_text: str):
     filename = secure_filename(title_text.lower().replace(" ", "-")) or "spreektijden"
     return send_file(
-        buffer,
+        io.BytesIO(content),
         mimetype="application/pdf",
         as_attachment=True,
         download_name=f"{filename}.pdf",
     )
 
+
+def generate_speaking_pdf(composition, params, *, committee_label: str, meeting_date: date):
+    formatted_date = format_full_date_nl(meeting_date)
+    title_text = f"Spreektijden {committee_label} van {formatted_date}"
+    return _pdf_response(cached_speaking_pdf(composition, [(title_text, params)]), title_text)
+
+
+def _active_parties():
+    return (
+        Party.query.filter(Party.actief.is_(True))
+        .order_by(
+            nullslast(Party.lijstnummer_volgende.asc()),
+            Party.naam.asc(),
+        )
+        .all()
+    )
+
+
 # ——— Helpers: triaalbepaling ———
 # ===== Spreektijden-tool =====
 @bp.route("/spreektijden", methods=["GET", "POST"])
@@ -392,14 +477,8 @@ def spreektijden():
     custom_choice = ("custom", "Speciaal evenement")
     form.committee.choices = preset_choices + [custom_choice]
 
-    parties = (
-        Party.query.filter(Party.actief.is_(True))
-        .order_by(
-            nullslast(Party.lijstnummer_volgende.asc()),
-            Party.naam.asc(),
-        )
-        .all()
-    )
+    parties = _active_parties()
+    composition = party_composition(parties)
 
     default_key = preset_choices[0][0] if preset_choices else custom_choice[0]
     incoming_choice = request.values.get("committee") or form.committee.data or default_key
@@ -441,15 +520,15 @@ def spreektijden():
         speakers_count = form.speakers_count.data or 0
         speaker_slot_minutes = form.speaker_slot_minutes.data or 0
 
-        result = calculate_speaking_distribution(
-            parties,
-            total_minutes=total_minutes,
-            chair_minutes=chair_minutes,
-            pause_minutes=pause_minutes,
-            speakers_count=speakers_count,
-            speaker_slot_minutes=speaker_slot_minutes,
-            college_minutes=college_minutes,
-        )
+        params = {
+            "total_minutes": total_minutes,
+            "chair_minutes": chair_minutes,
+            "pause_minutes": pause_minutes,
+            "speakers_count": speakers_count,
+            "speaker_slot_minutes": speaker_slot_minutes,
+            "college_minutes": college_minutes,
+        }
+        result = speaking_distribution(composition, **params)
 
         if form.export_pdf.data:
             if result["remaining_minutes"] < 0:
@@ -462,7 +541,8 @@ def spreektijden():
             else:
                 meeting_date = form.meeting_date.data or date.today()
                 return generate_speaking_pdf(
-                    result,
+                    composition,
+                    params,
                     committee_label=committee_label,
                     meeting_date=meeting_date,
                 )
@@ -483,12 +563,150 @@ def spreektijden():
         title="Spreektijdenberekening",
     )
 
+
+def _speakers_arg(name: str, default: int) -> int:
+    raw = (request.args.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        abort(400)
+    if not 0 <= value <= 50:
+        abort(400)
+    return value
+
+
+@bp.route("/spreektijden/scenarios")
+@login_and_active_required
+@roles_required("griffie")
+def spreektijden_scenarios():
+    """Verdelingen voor meerdere scenario's in één antwoord: presets × aantallen insprekers.
+
+    ``?presets=commissie_beheer,commissie_bestuur`` (standaard alle) en ``?insprekers=0,2,4``
+    (standaard 0). Het antwoord krijgt een ETag, zodat een ongewijzigde verdeling als 304 terugkomt.
+    """
+    keys = [k.strip() for k in (request.args.get("presets") or "").split(",") if k.strip()] or list(SPEAKING_PRESETS)
+    unknown = [k for k in keys if k not in SPEAKING_PRESETS]
+    if unknown:
+        return jsonify({"error": f"Onbekende preset(s): {', '.join(unknown)}"}), 400
+    try:
+        counts = sorted({int(v) for v in (request.args.get("insprekers") or "0").split(",") if v.strip()})
+    except ValueError:
+        return jsonify({"error": "insprekers moet een kommagescheiden lijst met getallen zijn"}), 400
+    if not counts or counts[0] < 0 or counts[-1] > 50:
+        return jsonify({"error": "insprekers moet tussen 0 en 50 liggen"}), 400
+
+    composition = party_composition(_active_parties())
+    scenarios = []
+    for key in keys:
+        preset = SPEAKING_PRESETS[key]
+        for count in counts:
+            result = speaking_distribution(composition, **preset_params(preset, count))
+            scenarios.append({
+                "preset": key,
+                "label": preset["label"],
+                "speakers_count": count,
+                "valid": result["remaining_minutes"] >= 0 and bool(result["distribution"]),
+                "result": result,
+            })
+
+    response = jsonify({
+        "composition": composition_digest(composition),
+        "scenarios": scenarios,
+    })
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@bp.route("/spreektijden/week.pdf")
+@login_and_active_required
+@roles_required("griffie")
+def spreektijden_week_pdf():
+    """Eén PDF met een pagina per commissiepreset voor een vergaderweek.
+
+    ``?week=<datum>`` (elke dag in de week, standaard vandaag), ``?insprekers=n`` voor alle
+    commissies of ``?insprekers_<preset>=n`` per commissie, en optioneel ``?datum_<preset>=<datum>``
+    voor de precieze vergaderdag. Gelijke invoer en zetelverdeling komt uit de cache.
+    """
+    try:
+        day = date.fromisoformat(request.args["week"]) if request.args.get("week") else date.today()
+    except ValueError:
+        abort(400)
+    monday = day - dt.timedelta(days=day.weekday())
+    friday = monday + dt.timedelta(days=4)
+    iso_year, iso_week, _ = monday.isocalendar()
+    week_label = f"week {iso_week} ({format_full_date_nl(monday)} t/m {format_full_date_nl(friday)})"
+    speakers_default = _speakers_arg("insprekers", 0)
+
+    composition = party_composition(_active_parties())
+    pages = []
+    for key, preset in sorted(SPEAKING_PRESETS.items(), key=lambda item: item[1]["label"]):
+        params = preset_params(preset, _speakers_arg(f"insprekers_{key}", speakers_default))
+        result = speaking_distribution(composition, **params)
+        if not result["distribution"]:
+            flash("Er zijn geen fracties met zetels gevonden om te verdelen.", "error")
+            return redirect(url_for("griffie.spreektijden"))
+        if result["remaining_minutes"] < 0:
+            flash(
+                f"{preset['label']}: de opgegeven tijden leveren een negatieve fractietijd op.",
+                "error",
+            )
+            return redirect(url_for("griffie.spreektijden", committee=key))
+        try:
+            meeting_date = date.fromisoformat(request.args[f"datum_{key}"]) if request.args.get(f"datum_{key}") else None
+        except ValueError:
+            abort(400)
+        if meeting_date:
+            title_text = f"Spreektijden {preset['label']} van {format_full_date_nl(meeting_date)}"
+        else:
+            title_text = f"Spreektijden {preset['label']}, {week_label}"
+        pages.append((title_text, params))
+
+    return _pdf_response(
+        cached_speaking_pdf(composition, pages),
+        f"Spreektijden week {iso_week} {iso_year}",
+    )
+
+PLANNING_NL_MONTHS = {
+    "jan": 1, "januari": 1,
+    "feb": 2, "februari": 2,
+    "mrt": 3, "maart": 3,
+    "apr": 4, "april": 4,
+    "mei": 5,
+    "jun": 6, "juni": 6,
+    "jul": 7, "juli": 7,
+    "aug": 8, "augustus": 8,
+    "sep": 9, "sept": 9, "september": 9,
+    "okt": 10, "oktober": 10,
+    "nov": 11, "november": 11,
+    "dec": 12, "december": 12,
+}
+TRIAL_START_MONTHS = {1: 1, 2: 5, 3: 9}
+
+_NL_MONTH_ALT = "|".join(sorted(PLANNING_NL_MONTHS, key=len, reverse=True))
+_TRIAL_RE = r"^[Tt]\s?([123])\s+(\d{4})$"
+_NL_MONTH_RE = rf"^(?:(\d{{1,2}})\s+)?({_NL_MONTH_ALT})\s+(\d{{4}})$"
+_DMY_RE = r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})$"
+_ISO_RE = r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T]00:00:00)?$"
+_YM_RE = r"^(\d{4})[-/](\d{1,2})$"
+_MY_RE = r"^(\d{1,2})[-/](\d{4})$"
+
+
+def _safe_date(year: int, month: int, day: int = 1) -> date | None:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
 def normalize_planning_date(val) -> date | None:
     """
     Zet waarden uit 'Huidige planning' om naar een datum (date).
     Ondersteunt diverse representaties:
       - echte datumwaarden
-      - NL maandnamen (bijv. 'maart 2026')
+      - NL maandnamen (bijv. 'maart 2026', '15 mei 2026')
       - triaalachtige notaties (T1/T2/T3)
       - 'YYYY-MM', 'MM-YYYY'
     Retourneert None als het niet lukt.
@@ -504,6 +722,30 @@ def normalize_planning_date(val) -> date | None:
     s = str(val).strip()
     if not s:
         return None
+    return _normalize_planning_text(s)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_planning_text(s: str) -> date | None:
+    # Triaalnotatie -> eerste maand van de triaal. Vóór dateutil, dat 'T3 2027' anders als maart leest.
+    m = re.match(_TRIAL_RE, s)
+    if m:
+        return date(int(m.group(2)), TRIAL_START_MONTHS[int(m.group(1))], 1)
+
+    # NL maandnaam met optionele dag ('15 mei 2026'); dateutil kent alleen Engelse namen
+    m = re.match(_NL_MONTH_RE, s, re.IGNORECASE)
+    if m:
+        parsed = _safe_date(int(m.group(3)), PLANNING_NL_MONTHS[m.group(2).lower()], int(m.group(1) or 1))
+        if parsed:
+            return parsed
+
+    # ISO-datum, zoals pandas echte Excel-datums als tekst teruggeeft ('2026-03-15 00:00:00').
+    # Niet via dateutil: met dayfirst leest dat '2026-03-05' als 3 mei.
+    m = re.match(_ISO_RE, s)
+    if m:
+        parsed = _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        if parsed and parsed.year != 1900:
+            return parsed
 
     # Probeer directe datumparse (inclusief dag)
     try:
@@ -513,78 +755,351 @@ def normalize_planning_date(val) -> date | None:
     except Exception:
         pass
 
-    # Triaalnotatie -> eerste maand van kwartaal
-    m = re.match(r"^[Tt]\s?([123])\s+(\d{4})$", s)
-    if m:
-        quarter = int(m.group(1))
-        year = int(m.group(2))
-        month = {1: 1, 2: 5, 3: 9}[quarter]
-        return date(year, month, 1)
-
-    # NL maandnamen
-    nl_months = {
-        "jan": 1, "januari": 1,
-        "feb": 2, "februari": 2,
-        "mrt": 3, "maart": 3,
-        "apr": 4, "april": 4,
-        "mei": 5,
-        "jun": 6, "juni": 6,
-        "jul": 7, "juli": 7,
-        "aug": 8, "augustus": 8,
-        "sep": 9, "sept": 9, "september": 9,
-        "okt": 10, "oktober": 10,
-        "nov": 11, "november": 11,
-        "dec": 12, "december": 12,
-    }
+    # NL maandnamen ergens in de tekst ('eind maart 2026')
     parts = re.findall(r"[A-Za-z]+|\d{4}", s.lower())
     year = None
     month = None
     for p in parts:
         if p.isdigit() and len(p) == 4:
             year = int(p)
-        elif p in nl_months:
-            month = nl_months[p]
+        elif p in PLANNING_NL_MONTHS:
+            month = PLANNING_NL_MONTHS[p]
     if year and month:
         return date(year, month, 1)
 
     # 'YYYY-MM' / 'MM-YYYY'
-    m2 = re.match(r"^(\d{4})[-/](\d{1,2})$", s)
+    m2 = re.match(_YM_RE, s)
     if m2:
-        return date(int(m2.group(1)), int(m2.group(2)), 1)
-    m3 = re.match(r"^(\d{1,2})[-/](\d{4})$", s)
+        return _safe_date(int(m2.group(1)), int(m2.group(2)))
+    m3 = re.match(_MY_RE, s)
     if m3:
-        return date(int(m3.group(2)), int(m3.group(1)), 1)
+        return _safe_date(int(m3.group(2)), int(m3.group(1)))
 
     return None
 
-def categorize_planning(target: date | None, reference: date):
+
+# Patronen die zonder dateutil te herkennen zijn: (regex, (jaar, maand, dag) uit de groepen,
+# zelfde uitkomst als dateutil (dan telt jaar 1900 als 'geen jaar')).
+_PLANNING_PATTERNS = [
+    (_TRIAL_RE, lambda g: (g[1], g[0].astype(int).map(TRIAL_START_MONTHS), 1), False),
+    (_NL_MONTH_RE, lambda g: (g[2], g[1].str.lower().map(PLANNING_NL_MONTHS), g[0].fillna("1")), False),
+    (_DMY_RE, lambda g: (g[2], g[1], g[0]), True),
+    (_ISO_RE, lambda g: (g[0], g[1], g[2]), True),
+]
+
+
+def normalize_planning_dates(values: pd.Series) -> pd.Series:
+    """Gevectoriseerde ``normalize_planning_date`` voor een hele kolom.
+
+    Geeft een datetime-Series (NaT waar het niet lukt). Elke unieke tekst wordt één keer
+    bekeken; de gangbare vormen (dd-mm-jjjj, Excel-datums, T1-T3, NL maandnamen) gaan met
+    ``str.extract`` en ``pd.to_datetime`` in één keer, de rest via de losse functie.
+    """
+    text = values.astype("string").str.strip()
+    codes, uniques = pd.factorize(text)
+    uniques = pd.Series(uniques, dtype="string")
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+
+    for pattern, parts, like_dateutil in _PLANNING_PATTERNS:
+        todo = parsed.isna()
+        groups = uniques[todo].str.extract(pattern, flags=re.IGNORECASE if pattern == _NL_MONTH_RE else 0)
+        groups = groups[groups[groups.columns[-1]].notna()]
+        if groups.empty:
+            continue
+        year, month, day = parts(groups)
+        stamps = pd.to_datetime(
+            pd.DataFrame({"year": year, "month": month, "day": day}, index=groups.index).astype(int),
+            errors="coerce",
+        )
+        if like_dateutil:
+            stamps = stamps.where(stamps.dt.year != 1900)
+        parsed.loc[groups.index] = stamps
+
+    rest = parsed.isna() & uniques.fillna("").ne("")
+    if rest.any():
+        parsed.loc[rest] = pd.to_datetime(
+            uniques[rest].map(_normalize_planning_text, na_action="ignore"), errors="coerce",
+        )
+
+    values_out = parsed.to_numpy()[codes]
+    values_out[codes < 0] = np.datetime64("NaT")
+    return pd.Series(values_out, index=values.index, dtype="datetime64[ns]")
+
+
+def categorize_planning_dates(dates: pd.Series, reference: date) -> pd.DataFrame:
     """
-    Bepaalt weergave, sorteer-datum en categorie (exact/month/quarter) voor de nieuwe kolom.
-    Retourneert (display_value, sort_date, category)
+    Bepaalt weergave en categorie (exact/month/quarter) voor de nieuwe kolom, voor alle rijen tegelijk.
+    Retourneert een DataFrame met de kolommen 'display' en 'category' (None zonder datum).
     """
-    if target is None:
-        return "", datetime(9999, 12, 31), None
-
-    two_month_cutoff = reference + relativedelta(months=2)
-    five_month_cutoff = reference + relativedelta(months=5)
-
-    if target <= two_month_cutoff:
-        month_name = MONTH_NAMES_NL[target.month - 1]
-        display = f"{target.day} {month_name} {target.year}"
-        sort_date = datetime.combine(target, datetime.min.time())
-        return display, sort_date, "exact"
-
-    if target <= five_month_cutoff:
-        month_name = MONTH_NAMES_NL[target.month - 1]
-        display = f"{month_name} {target.year}"
-        sort_date = datetime.combine(target, datetime.min.time())
-        return display, sort_date, "month"
-
-    quarter = ((target.month - 1) // 3) + 1
-    quarter_start_month = (quarter - 1) * 3 + 1
-    display = f"Q{quarter} {target.year}"
-    sort_date = datetime.combine(target, datetime.min.time())
-    return display, sort_date, "quarter"
+    two_month_cutoff = pd.Timestamp(reference + relativedelta(months=2))
+    five_month_cutoff = pd.Timestamp(reference + relativedelta(months=5))
+
+    # Per unieke datum rekenen; een planning heeft veel rijen maar weinig verschillende datums
+    codes, uniques = pd.factorize(dates)
+    uniques = pd.Series(uniques, dtype="datetime64[ns]")
+    category = np.select(
+        [(uniques <= two_month_cutoff).to_numpy(), (uniques <= five_month_cutoff).to_numpy()],
+        ["exact", "month"],
+        default="quarter",
+    ).astype(object)
+
+    year = uniques.dt.year.astype(str)
+    month_name = pd.Series(np.array(MONTH_NAMES_NL, dtype=object)[uniques.dt.month.to_numpy() - 1])
+    quarter = ((uniques.dt.month - 1) // 3 + 1).astype(str)
+    display = np.select(
+        [category == "exact", category == "month"],
+        [
+            (uniques.dt.day.astype(str) + " " + month_name + " " + year).to_numpy(dtype=object),
+            (month_name + " " + year).to_numpy(dtype=object),
+        ],
+        default=("Q" + quarter + " " + year).to_numpy(dtype=object),
+    )
+
+    # Code -1 = geen datum; alleen bekende codes indexeren (zonder enige datum is ``uniques`` leeg)
+    known = codes >= 0
+    display_col = np.full(len(codes), "", dtype=object)
+    category_col = np.full(len(codes), None, dtype=object)
+    display_col[known] = display[codes[known]]
+    category_col[known] = category[codes[known]]
+    return pd.DataFrame(
+        {
+            "display": pd.Series(display_col, index=dates.index, dtype=object),
+            "category": pd.Series(category_col, index=dates.index, dtype=object),
+        }
+    )
+
+class PlanningUploadError(ValueError):
+    """Upload die niet als jaarplanning te lezen is; de tekst is bedoeld voor de gebruiker."""
+
+
+def _planning_columns(header) -> list[tuple[int, str]]:
+    """(positie, kolomnaam) van de kolommen die we gebruiken, in de volgorde van de uitvoer."""
+    positions: dict[str, tuple[int, str]] = {}
+    for idx, value in enumerate(header):
+        name = str(value).strip() if value is not None else ""
+        if name and name.lower() not in positions:
+            positions[name.lower()] = (idx, name)
+
+    missing = [c for c in REQUIRED_COLS if c.lower() not in positions]
+    if missing:
+        raise PlanningUploadError(f"Ontbrekende kolommen: {', '.join(missing)}")
+
+    # Stel volgorde samen met optionele kolommen
+    ordered = ["onderwerp", "omschrijving"]
+    if "soort behandeling" in positions:
+        ordered.append("soort behandeling")
+    ordered.extend(["pfh code", "ontstaans datum", "oorspronkelijke planning", "huidige planning"])
+    if "zaaknummer" in positions:
+        ordered.append("zaaknummer")
+    return [positions[key] for key in ordered]
+
+
+def _planning_cell(value) -> str | None:
+    """Celwaarde als tekst, zoals ``pd.read_excel(dtype=str)`` die gaf (lege cel -> None)."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value)
+    return text if text != "" else None
+
+
+def _iter_xlsx_rows(stream):
+    from zipfile import BadZipFile
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+    except (BadZipFile, InvalidFileException, KeyError):
+        raise PlanningUploadError("Het bestand is geen geldig Excel-bestand (.xlsx).")
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _iter_csv_rows(stream):
+    """CSV-regels; UTF-8 (met of zonder BOM) of Windows-1252, zoals Excel 'CSV' opslaat."""
+    def lines():
+        for raw in stream:
+            try:
+                line = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                line = raw.decode("cp1252", errors="replace")
+            yield line.lstrip("\ufeff")
+
+    lines_iter = lines()
+    first = next(lines_iter, "")
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    yield from csv.reader([first], delimiter=delimiter)
+    yield from csv.reader(lines_iter, delimiter=delimiter)
+
+
+def read_planning_upload(file) -> pd.DataFrame:
+    """Lees een geüploade jaarplanning (.xlsx of .csv) rij voor rij in.
+
+    De kopregel wordt eerst gecontroleerd, zodat een verkeerd bestand meteen een melding geeft.
+    Daarna worden alleen de gebruikte kolommen bewaard; de werkmap wordt met openpyxl in
+    read-only-modus doorlopen in plaats van in zijn geheel in pandas geladen.
+    """
+    name = (file.filename or "").lower()
+    if name.endswith(".csv"):
+        rows = _iter_csv_rows(file.stream)
+    elif name.endswith((".xlsx", ".xlsm")):
+        rows = _iter_xlsx_rows(file.stream)
+    else:
+        raise PlanningUploadError("Kies een Excel-bestand (.xlsx) of een CSV-bestand.")
+
+    try:
+        header = next(rows, None)
+        if header is None:
+            raise PlanningUploadError("Het bestand is leeg.")
+        columns = _planning_columns(header)
+        data: dict[str, list] = {col_name: [] for _idx, col_name in columns}
+        targets = [(idx, data[col_name]) for idx, col_name in columns]
+        for row in rows:
+            values = [_planning_cell(row[idx]) if idx < len(row) else None for idx, _target in targets]
+            if all(v is None for v in values):
+                continue
+            for (_idx, target), value in zip(targets, values):
+                target.append(value)
+    finally:
+        rows.close()
+    return pd.DataFrame(data, dtype=object)
+
+
+_PLANNING_CATEGORY_COLORS = {
+    "exact": (ROW_COLOR_EXACT, COLUMN_COLOR_EXACT),
+    "month": (ROW_COLOR_MONTH, COLUMN_COLOR_MONTH),
+    "quarter": (ROW_COLOR_QUARTER, COLUMN_COLOR_QUARTER),
+}
+
+
+def _solid_fill(color: str) -> PatternFill:
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def write_jaarplanning_xlsx(df: pd.DataFrame, output, *, planning_column: str, current_column: str,
+                            row_styles: list[str | None], excel_dates: list[datetime | None],
+                            changes: pd.DataFrame | None = None) -> None:
+    """Schrijf de jaarplanning met kleuren, legenda en verborgen zaaknummer naar ``output``.
+
+    Met ``changes`` komt er een tabblad bij met de verschillen ten opzichte van de vorige upload.
+
+    Elke combinatie van kolomsoort en categorie is één benoemde stijl in de werkmap; cellen
+    verwijzen alleen naar die stijl. De werkmap wordt write-only opgebouwd, rij voor rij.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import NamedStyle
+    from openpyxl.styles.fonts import DEFAULT_FONT
+    from openpyxl.worksheet.filters import AutoFilter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Jaarplanning")
+    ws.freeze_panes = "A2"
+
+    columns = [str(c) for c in df.columns]
+    lowered = [c.strip().lower() for c in columns]
+    planning_idx = lowered.index(planning_column.lower()) if planning_column.lower() in lowered else None
+    current_idx = lowered.index(current_column.lower()) if current_column.lower() in lowered else None
+    zaaknummer_idx = lowered.index("zaaknummer") if "zaaknummer" in lowered else None
+
+    for idx in range(len(columns)):
+        dim = ws.column_dimensions[get_column_letter(idx + 1)]
+        dim.width = 60 if idx in (0, 1) else 25
+        if idx == zaaknummer_idx:
+            dim.hidden = True
+    ws.row_dimensions[1].height = 28
+
+    thin_side = Side(style="thin", color="FFE2E8F0")
+    data_border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
+    styles: dict[tuple, str] = {}
+
+    def _style(kind: str, category: str | None) -> str:
+        key = (kind, category)
+        name = styles.get(key)
+        if name is None:
+            name = styles[key] = f"Jaarplanning {kind} {category or 'geen'}"
+            style = NamedStyle(name=name, font=copy(DEFAULT_FONT), border=data_border)
+            if kind == "header":
+                style.font = Font(bold=True, color="FFFFFFFF")
+                style.fill = _solid_fill("FF1F2937")
+                style.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+                style.border = Border(bottom=Side(style="medium", color="FFCBD5F5"))
+            else:
+                row_color, col_color = _PLANNING_CATEGORY_COLORS.get(category, (None, None))
+                color = col_color if kind == "planning" else row_color
+                if color:
+                    style.fill = _solid_fill(color)
+                if kind == "wrap":
+                    style.alignment = Alignment(wrap_text=True)
+                elif kind == "planning":
+                    style.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+                elif kind == "date":
+                    style.number_format = "dd-mm-yyyy"
+            wb.add_named_style(style)
+        return name
+
+    def _cell(value, style_name: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style_name
+        return cell
+
+    ws.append([_cell(name, _style("header", None)) for name in columns])
+
+    base_kinds = ["wrap" if idx in (0, 1) else "planning" if idx == planning_idx else "plain"
+                  for idx in range(len(columns))]
+    values = df.astype(object).where(df.notna(), None)
+    for row, category, excel_dt in zip(values.itertuples(index=False, name=None), row_styles, excel_dates):
+        kinds = base_kinds
+        if excel_dt is not None and current_idx is not None:
+            row = list(row)
+            row[current_idx] = excel_dt
+            kinds = base_kinds.copy()
+            kinds[current_idx] = "date"
+        ws.append([_cell(value, _style(kind, category)) for value, kind in zip(row, kinds)])
+
+    ws.auto_filter = AutoFilter(ref=f"A1:{get_column_letter(len(columns))}{len(df) + 1}")
+
+    if changes is not None:
+        sheet = wb.create_sheet("Wijzigingen sinds vorige upload")
+        sheet.freeze_panes = "A2"
+        for idx, name in enumerate(changes.columns, start=1):
+            sheet.column_dimensions[get_column_letter(idx)].width = 60 if name == "Onderwerp" else 25
+        sheet.append([_cell(name, _style("header", None)) for name in changes.columns])
+        for row in changes.astype(object).where(changes.notna(), None).itertuples(index=False, name=None):
+            sheet.append(list(row))
+        sheet.auto_filter = AutoFilter(ref=f"A1:{get_column_letter(len(changes.columns))}{len(changes) + 1}")
+
+    # Legenda voor de kleurcodering
+    legend = wb.create_sheet("Legenda")
+    legend.freeze_panes = "A2"
+    for letter, width in (("A", 44), ("B", 24), ("C", 24)):
+        legend.column_dimensions[letter].width = width
+    bold = Font(bold=True)
+    header = []
+    for label in ("Categorie", "Kolom", "Rij"):
+        cell = WriteOnlyCell(legend, value=label)
+        cell.font = bold
+        header.append(cell)
+    legend.append(header)
+    legend_categories = [
+        ("Binnen 2 maanden (exacte datum)", "exact"),
+        ("Maand 3 t/m 5 (maandnaam)", "month"),
+        ("Vanaf maand 6 (kwartaal)", "quarter"),
+    ]
+    for label, category in legend_categories:
+        row_color, col_color = _PLANNING_CATEGORY_COLORS[category]
+        col_cell = WriteOnlyCell(legend)
+        col_cell.fill = _solid_fill(col_color)
+        row_cell = WriteOnlyCell(legend)
+        row_cell.fill = _solid_fill(row_color)
+        legend.append([label, col_cell, row_cell])
+
+    wb.save(output)
+
 
 # ——— Route: upload & resultaat ———
 @bp.route("/jaarplanning", methods=["GET", "POST"])
@@ -594,206 +1109,90 @@ def jaarplanning():
 
     file = request.files.get("file")
     if not file or file.filename == "":
-        flash("Kies een Excel-bestand (.xlsx).", "error")
+        flash("Kies een Excel-bestand (.xlsx) of een CSV-bestand.", "error")
         return redirect(url_for("griffie.jaarplanning"))
 
     filename = secure_filename(file.filename)
+    # Net bestandsnaam met suffix
+    download_name = f"{filename.rsplit('.', 1)[0]}_jaarplanning.xlsx"
+    today_ams = datetime.now(ZoneInfo("Europe/Amsterdam")).date()
     try:
-        # Lees Excel
-        df_raw = pd.read_excel(file, dtype=str)  # lees alles als string; we normaliseren zelf
-        # Normaliseer kolomnamen
-        col_map = {c: c.strip() for c in df_raw.columns}
-        df_raw.rename(columns=col_map, inplace=True)
-
-        # Controleer verplichte kolommen (case-insensitive)
-        lower_map = {c.lower(): c for c in df_raw.columns}
-        missing = [c for c in REQUIRED_COLS if c.lower() not in lower_map]
-        if missing:
-            flash(f"Ontbrekende kolommen: {', '.join(missing)}", "error")
-            return redirect(url_for("griffie.jaarplanning"))
+        # Zelfde bestand, zelfde dag en zelfde vergelijkingsbasis: resultaat uit de cache
+        cache = planning_cache()
+        file_hash = base_hash = out_key = None
+        if cache is not None:
+            file_hash = upload_digest(file.stream)
+            base_hash = comparison_base(cache, file_hash)
+            out_key = output_key(file_hash, today_ams, base_hash)
+            cached = cache.get(out_key)
+            if cached is not None:
+                remember_upload(cache, file_hash)
+                return send_file(
+                    io.BytesIO(cached),
+                    mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    as_attachment=True,
+                    download_name=download_name,
+                )
 
-        # Stel volgorde samen met optionele kolommen
-        ordered = [
-            "onderwerp",
-            "omschrijving",
-        ]
-        if "soort behandeling" in lower_map:
-            ordered.append("soort behandeling")
-        ordered.extend([
-            "pfh code",
-            "ontstaans datum",
-            "oorspronkelijke planning",
-            "huidige planning",
-        ])
-        if "zaaknummer" in lower_map:
-            ordered.append("zaaknummer")
-
-        use_cols = [lower_map[key] for key in ordered]
-        df = df_raw[use_cols].copy()
+        # Lees alleen de benodigde kolommen; een ontbrekende kolom geeft direct een melding
+        try:
+            df = read_planning_upload(file)
+        except PlanningUploadError as e:
+            flash(str(e), "error")
+            return redirect(url_for("griffie.jaarplanning"))
+        lower_map = {c.lower(): c for c in df.columns}
 
         # Nieuwe planningskolom op basis van afstand tot vandaag
         huidige_kolomnaam = lower_map["huidige planning"]
         planning_kolomnaam = "Planning overzicht"
-        today_ams = datetime.now(ZoneInfo("Europe/Amsterdam")).date()
-
-        display_values: list[str] = []
-        sort_keys: list[datetime] = []
-        style_categories: list[str | None] = []
-        normalized_dates: list[date | None] = []
-        excel_dates: list[datetime | None] = []
-
-        for val in df[huidige_kolomnaam].tolist():
-            normalized = normalize_planning_date(val)
-            display, sort_dt, category = categorize_planning(normalized, today_ams)
-            display_values.append(display)
-            sort_keys.append(sort_dt)
-            style_categories.append(category)
-            normalized_dates.append(normalized)
-            if normalized and normalized.day != 1:
-                excel_dates.append(datetime.combine(normalized, datetime.min.time()))
-            else:
-                excel_dates.append(None)
+
+        # Rijen die ongewijzigd in de vorige upload stonden hoeven niet opnieuw genormaliseerd
+        previous_run = cache.get_json(run_key(base_hash)) if cache is not None and base_hash else None
+        hashes = row_hashes(df) if cache is not None else None
+        known = cached_dates(previous_run)
+        if known:
+            hit = hashes.isin(known.keys())
+            normalized = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+            normalized[hit] = pd.to_datetime(hashes[hit].map(known), errors="coerce")
+            if (~hit).any():
+                normalized[~hit] = normalize_planning_dates(df.loc[~hit, huidige_kolomnaam])
+        else:
+            normalized = normalize_planning_dates(df[huidige_kolomnaam])
+        categories = categorize_planning_dates(normalized, today_ams)
+
+        changes = None
+        if cache is not None:
+            run = build_run(df, hashes, normalized)
+            changes = planning_changes(previous_run, run)
+            cache.put_json(run_key(file_hash), run)
 
         insert_position = df.columns.get_loc(huidige_kolomnaam) + 1
-        df.insert(insert_position, planning_kolomnaam, display_values)
-        df["_style"] = style_categories
-        df["_normalized"] = normalized_dates
-        df["_excel_date"] = excel_dates
-        sort_series = pd.Series(sort_keys, index=df.index)
-        df.sort_values(
-            by=huidige_kolomnaam,
-            key=lambda col: sort_series.loc[col.index],
-            inplace=True,
-        )
+        df.insert(insert_position, planning_kolomnaam, categories["display"])
+        df["_style"] = categories["category"]
+        df["_sort"] = normalized
+        # Dag 1 betekent meestal 'alleen maand bekend': dan geen echte Excel-datum schrijven
+        df["_excel_date"] = normalized.where(normalized.dt.day != 1)
+        df.sort_values(by="_sort", na_position="last", kind="stable", inplace=True)
         row_styles = df["_style"].tolist()
-        excel_dates_sorted = df["_excel_date"].tolist()
-        df.drop(columns=["_style", "_normalized", "_excel_date"], inplace=True)
+        excel_dates_sorted = [None if pd.isna(v) else v.to_pydatetime() for v in df["_excel_date"]]
+        df.drop(columns=["_style", "_sort", "_excel_date"], inplace=True)
 
         # Schrijf naar Excel met kleuren en verborgen kolommen
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Jaarplanning")
-            ws = writer.book["Jaarplanning"]
-            ws.freeze_panes = "A2"
-
-            header_font = Font(bold=True, color="FFFFFFFF")
-            header_fill = PatternFill(start_color="FF1F2937", end_color="FF1F2937", fill_type="solid")
-            header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            header_border = Border(bottom=Side(style="medium", color="FFCBD5F5"))
-            ws.row_dimensions[1].height = 28
-            for cell in ws[1]:
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = header_border
-
-            # Stel kolombreedtes en tekstterugloop in
-            for idx in range(1, ws.max_column + 1):
-                col_letter = get_column_letter(idx)
-                is_primary_col = idx in (1, 2)
-                ws.column_dimensions[col_letter].width = 60 if is_primary_col else 25
-
-                if is_primary_col:
-                    for cell in ws[col_letter]:
-                        existing = cell.alignment or Alignment()
-                        cell.alignment = Alignment(
-                            horizontal=existing.horizontal,
-                            vertical=existing.vertical,
-                            text_rotation=existing.text_rotation,
-                            wrap_text=True,
-                            shrink_to_fit=existing.shrink_to_fit,
-                            indent=existing.indent,
-                        )
-
-            # Zoek kolomindexen voor planningsoverzicht en zaaknummer
-            header_row = 1
-            planning_col_idx = None
-            current_col_idx = None
-            zaaknummer_col_idx = None
-            for idx, cell in enumerate(ws[header_row], start=1):
-                cell_value = str(cell.value).strip().lower()
-                if cell_value == planning_kolomnaam.lower():
-                    planning_col_idx = idx
-                elif cell_value == huidige_kolomnaam.lower():
-                    current_col_idx = idx
-                elif cell_value == "zaaknummer":
-                    zaaknummer_col_idx = idx
-
-            style_map = {
-                "exact": (ROW_COLOR_EXACT, COLUMN_COLOR_EXACT),
-                "month": (ROW_COLOR_MONTH, COLUMN_COLOR_MONTH),
-                "quarter": (ROW_COLOR_QUARTER, COLUMN_COLOR_QUARTER),
-            }
-
-            for row_idx, style in enumerate(row_styles, start=2):
-                if not style:
-                    continue
-                row_color, col_color = style_map.get(style, (None, None))
-                if not row_color or not col_color:
-                    continue
-                row_fill = PatternFill(start_color=row_color, end_color=row_color, fill_type="solid")
-                for col_idx in range(1, ws.max_column + 1):
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    cell.fill = row_fill
-                if planning_col_idx:
-                    col_fill = PatternFill(start_color=col_color, end_color=col_color, fill_type="solid")
-                    ws.cell(row=row_idx, column=planning_col_idx).fill = col_fill
-
-            if zaaknummer_col_idx:
-                ws.column_dimensions[get_column_letter(zaaknummer_col_idx)].hidden = True
-
-            if current_col_idx:
-                for row_idx, excel_dt in enumerate(excel_dates_sorted, start=2):
-                    if not excel_dt:
-                        continue
-                    cell = ws.cell(row=row_idx, column=current_col_idx)
-                    cell.value = excel_dt
-                    cell.number_format = "dd-mm-yyyy"
-
-            # Centreer planningsoverzicht en voeg borders toe voor leesbaarheid
-            if planning_col_idx:
-                planning_letter = get_column_letter(planning_col_idx)
-                for cell in ws[planning_letter]:
-                    if cell.row == 1:
-                        continue
-                    cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-            thin_side = Side(style="thin", color="FFE2E8F0")
-            data_border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
-            for row_idx in range(2, ws.max_row + 1):
-                for col_idx in range(1, ws.max_column + 1):
-                    ws.cell(row=row_idx, column=col_idx).border = data_border
-
-            # Voeg legenda toe voor kleurcodering
-            legend = writer.book.create_sheet("Legenda")
-            legend["A1"] = "Categorie"
-            legend["B1"] = "Kolom"
-            legend["C1"] = "Rij"
-            legend_categories = [
-                ("Binnen 2 maanden (exacte datum)", COLUMN_COLOR_EXACT, ROW_COLOR_EXACT),
-                ("Maand 3 t/m 5 (maandnaam)", COLUMN_COLOR_MONTH, ROW_COLOR_MONTH),
-                ("Vanaf maand 6 (kwartaal)", COLUMN_COLOR_QUARTER, ROW_COLOR_QUARTER),
-            ]
-            for idx, (label, col_color, row_color) in enumerate(legend_categories, start=2):
-                legend[f"A{idx}"] = label
-                legend[f"B{idx}"].fill = PatternFill(start_color=col_color, end_color=col_color, fill_type="solid")
-                legend[f"C{idx}"].fill = PatternFill(start_color=row_color, end_color=row_color, fill_type="solid")
-            legend["A1"].font = Font(bold=True)
-            legend["B1"].font = Font(bold=True)
-            legend["C1"].font = Font(bold=True)
-            legend.column_dimensions["A"].width = 44
-            legend.column_dimensions["B"].width = 24
-            legend.column_dimensions["C"].width = 24
-            legend.freeze_panes = "A2"
-
-            data_range = f"A1:{get_column_letter(ws.max_column)}{ws.max_row}"
-            ws.auto_filter.ref = data_range
+        write_jaarplanning_xlsx(
+            df,
+            output,
+            planning_column=planning_kolomnaam,
+            current_column=huidige_kolomnaam,
+            row_styles=row_styles,
+            excel_dates=excel_dates_sorted,
+            changes=changes,
+        )
+        if cache is not None:
+            cache.put(out_key, output.getvalue())
+            remember_upload(cache, file_hash)
 
         output.seek(0)
-        # Net bestandsnaam met suffix
-        base = filename.rsplit(".", 1)[0]
-        download_name = f"{base}_jaarplanning.xlsx"
-
         return send_file(
             output,
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -964,30 +1363,128 @@ def indienen_index():
         .order_by(Motie.updated_at.desc())
         .all()
     )
-    return render_template('griffie/indienen.html', moties=moties)
+    # (waarde, label) per vergadering: op datum, en losse tekst die geen datum is erachter
+    dagen = sorted({m.vergaderdatum for m in moties if m.vergaderdatum})
+    vrije_tekst = sorted({m.gemeenteraad_datum for m in moties if m.gemeenteraad_datum and not m.vergaderdatum})
+    vergaderingen = [(d.isoformat(), d.strftime('%d-%m-%Y')) for d in dagen] + [(t, t) for t in vrije_tekst]
+    return render_template('griffie/indienen.html', moties=moties, vergaderingen=vergaderingen)
 
 
-# ===== Griffie dashboard (drag & drop) =====
-@bp.route('/dashboard', methods=['GET'])
+@bp.route('/indienen/bundel')
 @login_and_active_required
 @roles_required('griffie')
-def dashboard_builder():
+def indienen_bundel():
+    """Alle moties voor één raadsvergadering als één document (DOCX of PDF)."""
+    from app.exporters.bundle import bundle_query, bundle_title, render_bundle_docx, render_bundle_pdf
+    from app.exporters.docx_cache import docx_cache
+    from app.exporters.motie_docx import motie_export_data, template_path
+
+    datum = (request.args.get('datum') or '').strip()
+    agendapunt = (request.args.get('agendapunt') or '').strip() or None
+    formaat = request.args.get('formaat', 'docx')
+    if not datum:
+        abort(400, "Kies een raadsvergadering")
+    if formaat not in ('docx', 'pdf'):
+        abort(400, "Onbekend formaat")
+
+    dag = parse_meeting_date(datum)
+    moties = bundle_query(dag or datum, agendapunt).all()
+    if not moties:
+        flash('Geen moties klaar om in te dienen voor deze vergadering.', 'warning')
+        return redirect(url_for('griffie.indienen_index'))
+
+    items = [motie_export_data(m) for m in moties]
+    titel = bundle_title(dag.strftime('%d-%m-%Y') if dag else datum, agendapunt)
+    if formaat == 'pdf':
+        content = render_bundle_pdf(items, titel=titel)
+        mimetype = 'application/pdf'
+    else:
+        content = render_bundle_docx(
+            items,
+            template_path(),
+            titel=titel,
+            processes=int(current_app.config.get("EXPORT_RENDER_PROCESSES") or 0),
+            cache=docx_cache(),
+            renderer=current_app.config.get("EXPORT_BULK_RENDERER") or "docxtpl",
+        )
+        mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    filename = secure_filename(titel.replace(' ', '_')) or 'moties'
+    return send_file(
+        io.BytesIO(content),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=f"{filename}.{formaat}",
+    )
+
+
+@bp.route('/register')
+@login_and_active_required
+@roles_required('griffie')
+def motie_register():
+    """Register van alle moties van de tenant als CSV of XLSX, zonder alles in het geheugen te laden."""
+    import tempfile
+    from app.exporters.register import iter_register_csv, register_rows, write_register_xlsx
+
+    formaat = request.args.get('formaat', 'xlsx')
+    if formaat not in ('csv', 'xlsx'):
+        abort(400, "Onbekend formaat")
+    jaar = request.args.get('jaar', type=int)
+    naam = f"Motieregister_{jaar}" if jaar else f"Motieregister_{dt.datetime.now().strftime('%Y%m%d')}"
+
+    if formaat == 'csv':
+        resp = Response(
+            stream_with_context(iter_register_csv(register_rows(jaar))),
+            mimetype='text/csv',
+        )
+        resp.headers.set('Content-Disposition', f'attachment; filename="{naam}.csv"')
+        resp.headers.set('Cache-Control', 'no-store')
+        return resp
+
+    # Een XLSX is een zip en moet compleet zijn voor het verstuurd kan worden: via een tijdelijk
+    # bestand op schijf, dat na het versturen verdwijnt.
+    fh = tempfile.TemporaryFile()
+    try:
+        write_register_xlsx(register_rows(jaar), fh)
+        fh.seek(0)
+    except Exception:
+        fh.close()
+        raise
+    resp = send_file(
+        fh,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=f"{naam}.xlsx",
+    )
+    resp.headers.set('Cache-Control', 'no-store')
+    return resp
+
+
+# ===== Griffie dashboard (drag & drop) =====
+# Standaard widgets lay-out
+DEFAULT_GRIFFIE_LAYOUT = {
+    "widgets": [
+        {"id": "to_advise", "title": "Te adviseren", "x": 0, "y": 0, "w": 6, "h": 4},
+        {"id": "ready_submit", "title": "Klaar om in te dienen", "x": 6, "y": 0, "w": 6, "h": 4},
+        {"id": "my_claims", "title": "Mijn claims", "x": 0, "y": 4, "w": 6, "h": 3},
+        {"id": "stats", "title": "Statistiek", "x": 6, "y": 4, "w": 6, "h": 3},
+    ]
+}
+
+
+def _griffie_layout():
     cfg = (
         DashboardLayout.query
         .filter(DashboardLayout.user_id == current_user.id, DashboardLayout.context == 'griffie')
         .first()
     )
-    # Standaard widgets lay-out
-    default_layout = {
-        "widgets": [
-            {"id": "to_advise", "title": "Te adviseren", "x": 0, "y": 0, "w": 6, "h": 4},
-            {"id": "ready_submit", "title": "Klaar om in te dienen", "x": 6, "y": 0, "w": 6, "h": 4},
-            {"id": "my_claims", "title": "Mijn claims", "x": 0, "y": 4, "w": 6, "h": 3},
-            {"id": "stats", "title": "Statistiek", "x": 6, "y": 4, "w": 6, "h": 3},
-        ]
-    }
-    layout = cfg.layout if cfg and cfg.layout else default_layout
-    return render_template('griffie/dashboard_builder.html', layout=layout)
+    return cfg.layout if cfg and cfg.layout else DEFAULT_GRIFFIE_LAYOUT
+
+
+@bp.route('/dashboard', methods=['GET'])
+@login_and_active_required
+@roles_required('griffie')
+def dashboard_builder():
+    return render_template('griffie/dashboard_builder.html', layout=_griffie_layout())
 
 
 @bp.route('/dashboard/save', methods=['POST'])
@@ -1014,23 +1511,12 @@ def dashboard_save():
 @login_and_active_required
 @roles_required('griffie')
 def dashboard_view():
-    cfg = (
-        DashboardLayout.query
-        .filter(DashboardLayout.user_id == current_user.id, DashboardLayout.context == 'griffie')
-        .first()
-    )
-    default_layout = {
-        "widgets": [
-            {"id": "to_advise", "title": "Te adviseren", "x": 0, "y": 0, "w": 6, "h": 4},
-            {"id": "ready_submit", "title": "Klaar om in te dienen", "x": 6, "y": 0, "w": 6, "h": 4},
-            {"id": "my_claims", "title": "Mijn claims", "x": 0, "y": 4, "w": 6, "h": 3},
-            {"id": "stats", "title": "Statistiek", "x": 6, "y": 4, "w": 6, "h": 3},
-        ]
-    }
-    layout = cfg.layout if cfg and cfg.layout else default_layout
+    # Alleen de indeling; de widgets haalt de browser los op via dashboard_widget
+    return render_template('griffie/dashboard.html', layout=_griffie_layout(), widget_ids=set(GRIFFIE_WIDGETS))
 
-    # Data per widget
-    to_advise = (
+
+def _widget_to_advise():
+    return (
         Motie.query
         .options(selectinload(Motie.indiener))
         .filter(Motie.status.ilike('Advies griffie'))
@@ -1038,7 +1524,10 @@ def dashboard_view():
         .limit(10)
         .all()
     )
-    ready_submit = (
+
+
+def _widget_ready_submit():
+    return (
         Motie.query
         .options(selectinload(Motie.indiener))
         .filter(Motie.status.ilike('Klaar om in te dienen'))
@@ -1046,29 +1535,56 @@ def dashboard_view():
         .limit(10)
         .all()
     )
-    my_claims = (
+
+
+def _my_claims_query(reviewer_id):
+    return (
         db.session.query(AdviceSession, Motie)
         .join(Motie, Motie.id == AdviceSession.motie_id)
+        .filter(AdviceSession.reviewer_id == reviewer_id)
+    )
+
+
+def _widget_my_claims():
+    return (
+        _my_claims_query(current_user.id)
         .options(selectinload(Motie.indiener))
-        .filter(AdviceSession.reviewer_id == current_user.id)
         .order_by(AdviceSession.updated_at.desc())
         .limit(10)
         .all()
     )
-    counts = {
-        'to_advise': len(to_advise),
-        'ready_submit': len(ready_submit),
-        'my_claims': len(my_claims),
-    }
 
-    widget_data = {
-        'to_advise': to_advise,
-        'ready_submit': ready_submit,
-        'my_claims': my_claims,
-        'stats': counts,
-    }
 
-    return render_template('griffie/dashboard.html', layout=layout, widget_data=widget_data)
+def _widget_stats():
+    # Zelfstandig te laden, dus eigen tellingen in plaats van de lengte van de andere lijsten
+    reviewer_id = current_user.id
+    return run_queries(
+        to_advise=lambda: Motie.query.filter(Motie.status.ilike('Advies griffie')).count(),
+        ready_submit=lambda: Motie.query.filter(Motie.status.ilike('Klaar om in te dienen')).count(),
+        my_claims=lambda: _my_claims_query(reviewer_id).count(),
+    )
+
+
+GRIFFIE_WIDGETS = {
+    'to_advise': _widget_to_advise,
+    'ready_submit': _widget_ready_submit,
+    'my_claims': _widget_my_claims,
+    'stats': _widget_stats,
+}
+
+
+@bp.route('/dashboard/widget/<widget_id>', methods=['GET'])
+@login_and_active_required
+@roles_required('griffie')
+def dashboard_widget(widget_id):
+    build = GRIFFIE_WIDGETS.get(widget_id)
+    if build is None:
+        abort(404)
+    html = cached_widget(
+        f'griffie.{widget_id}',
+        lambda: render_template('griffie/_dashboard_widget.html', widget_id=widget_id, data=build()),
+    )
+    return widget_response(html)
 
 
 
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Iterable, NamedTuple, Tuple
+
+from flask import current_app
+
+from app.exporters.docx_cache import ContentCache
+
+# Verhogen als de berekening of de PDF-opmaak verandert: oude PDF's vervallen dan
+CACHE_FORMAT = "spreektijden-1"
+
+
+class PartySeats(NamedTuple):
+    """De velden van een fractie waar de spreektijdverdeling van afhangt.
+
+    Heeft dezelfde attribuutnamen als ``Party``, zodat ``calculate_speaking_distribution``
+    er direct mee overweg kan; als tuple is hij hashbaar en bruikbaar als cachesleutel.
+    """
+
+    id: int
+    naam: str
+    afkorting: str | None
+    lijstnummer_volgende: int | None
+    zetelaantal: int | None
+
+
+Composition = Tuple[PartySeats, ...]
+
+
+def party_composition(parties: Iterable[Any]) -> Composition:
+    """Zetelverdeling van de actieve fracties, in de volgorde waarin ze getoond worden."""
+    return tuple(
+        PartySeats(p.id, p.naam, p.afkorting, p.lijstnummer_volgende, p.zetelaantal)
+        for p in parties
+    )
+
+
+def composition_digest(composition: Composition) -> str:
+    """Korte hash van de zetelverdeling.
+
+    Alle sleutels zijn hiervan afgeleid: een gewijzigd ``zetelaantal`` of een fractie die
+    (in)actief wordt levert vanzelf nieuwe sleutels op, ook in andere workers.
+    """
+    material = json.dumps([CACHE_FORMAT, [list(p) for p in composition]], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+class SpeakingPdfCache(ContentCache):
+    """Gerenderde spreektijden-PDF's, op zetelverdeling + parameters + titel."""
+
+    suffix = ".pdf"
+    label = "Spreektijden-cache"
+
+    def key(self, composition: Composition, pages: Any) -> str:
+        material = json.dumps(
+            [CACHE_FORMAT, composition_digest(composition), pages],
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def speaking_pdf_cache() -> SpeakingPdfCache | None:
+    """Cache volgens de app-config; None als SPREEKTIJDEN_CACHE_MAX_BYTES 0 is."""
+    max_bytes = int(current_app.config.get("SPREEKTIJDEN_CACHE_MAX_BYTES") or 0)
+    if max_bytes <= 0:
+        return None
+    directory = (
+        current_app.config.get("SPREEKTIJDEN_CACHE_DIR")
+        or os.path.join(current_app.instance_path, "spreektijden_cache")
+    )
+    return SpeakingPdfCache(directory, max_bytes)
@@ -0,0 +1,82 @@
+"""Vergaderdatum van een motie uit de vrije tekst van ``gemeenteraad_datum``.
+
+Het tekstveld blijft zoals de gebruiker het invulde (voor weergave); ``Motie.vergaderdatum``
+is de getypeerde versie waarop gesorteerd en gefilterd wordt. Alleen een volledige datum
+(dag, maand en jaar) telt: 'maart 2026' of 'na het zomerreces' levert None op.
+"""
+from __future__ import annotations
+
+import re
+from datetime import date, datetime
+
+from dateutil.parser import parse as dt_parse
+
+NL_MONTHS = {
+    "jan": 1, "januari": 1,
+    "feb": 2, "februari": 2,
+    "mrt": 3, "maart": 3,
+    "apr": 4, "april": 4,
+    "mei": 5,
+    "jun": 6, "juni": 6,
+    "jul": 7, "juli": 7,
+    "aug": 8, "augustus": 8,
+    "sep": 9, "sept": 9, "september": 9,
+    "okt": 10, "oktober": 10,
+    "nov": 11, "november": 11,
+    "dec": 12, "december": 12,
+}
+
+_MONTH_ALT = "|".join(sorted(NL_MONTHS, key=len, reverse=True))
+_ISO_RE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T].*)?$")
+_DMY_RE = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{2}|\d{4})$")
+# Optionele weekdag ervoor ('dinsdag 12 maart 2026'), punt na afkorting mag ('12 okt. 2026')
+_NL_TEXT_RE = re.compile(rf"(\d{{1,2}})\s+({_MONTH_ALT})\.?\s+(\d{{4}})", re.IGNORECASE)
+_SENTINEL = datetime(1900, 1, 1)
+
+
+def _safe_date(year: int, month: int, day: int) -> date | None:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_meeting_date(value) -> date | None:
+    """Datum uit een datumwaarde of tekst als '2026-03-12', '12-03-2026', '12/3/26' of '12 maart 2026'."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+
+    # ISO eerst en niet via dateutil: met dayfirst leest dat '2026-03-05' als 3 mei
+    m = _ISO_RE.match(text)
+    if m:
+        return _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+
+    m = _DMY_RE.match(text)
+    if m:
+        year = int(m.group(3))
+        if year < 100:
+            year += 2000
+        return _safe_date(year, int(m.group(2)), int(m.group(1)))
+
+    # NL maandnamen; dateutil kent alleen Engelse
+    m = _NL_TEXT_RE.search(text)
+    if m:
+        return _safe_date(int(m.group(3)), NL_MONTHS[m.group(2).lower()], int(m.group(1)))
+
+    # Overige notaties. Twee keer parsen met verschillende standaardwaarden: verschilt de
+    # uitkomst, dan ontbrak dag, maand of jaar en is het geen vergaderdatum
+    try:
+        first = dt_parse(text, dayfirst=True, default=_SENTINEL)
+        second = dt_parse(text, dayfirst=True, default=datetime(1904, 2, 2))
+    except (ValueError, OverflowError):
+        return None
+    if first.date() != second.date():
+        return None
+    return first.date()
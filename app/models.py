@@ -4,10 +4,12 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import json
 from flask import url_for
+from sqlalchemy.orm import validates
 from sqlalchemy.types import TypeDecorator, Text
 from flask import current_app
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from sqlalchemy.dialects.postgresql import JSONB  # of JSON als je SQLite gebruikt
+from app.meeting_dates import parse_meeting_date
 
 class JSONEncodedList(TypeDecorator):
     impl = Text
@@ -29,6 +31,14 @@ class JSONEncodedDict(TypeDecorator):
     def process_result_value(self, value, dialect):
         return json.loads(value) if value else {}
 
+# Dialecten met partiële (WHERE ...) indexen; de rest (MySQL) houdt een gewone constraint
+PARTIAL_INDEX_DIALECTS = ("postgresql", "sqlite")
+
+
+def _without_partial_indexes(ddl, target, bind, **kw):
+    """``ddl_if``-voorwaarde voor de vervangende constraint op dialecten zonder partiële indexen."""
+    return kw["dialect"].name not in PARTIAL_INDEX_DIALECTS
+
 # ===============
 # Multi‑tenant basis
 # ===============
@@ -184,10 +194,15 @@ class Motie(db.Model):
     opdracht_formulering = db.Column(db.Text, nullable=False)
     draagt_college_op = db.Column(JSONEncodedList)
     status = db.Column(db.String(64), default='concept')
-    gemeenteraad_datum = db.Column(db.String(40))
+    gemeenteraad_datum = db.Column(db.String(40))  # zoals ingevuld, voor weergave
+    vergaderdatum = db.Column(db.Date, nullable=True)  # afgeleid van gemeenteraad_datum, zie _sync_vergaderdatum
     agendapunt = db.Column(db.String(40))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_motie_tenant_vergaderdatum', 'tenant_id', 'vergaderdatum'),
+    )
     
     # ✅ Primaire indiener (1:N)
     indiener_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -207,6 +222,11 @@ class Motie(db.Model):
 
     tenant = db.relationship('Tenant')
 
+    @validates('gemeenteraad_datum')
+    def _sync_vergaderdatum(self, key, value):
+        self.vergaderdatum = parse_meeting_date(value)
+        return value
+
     def add_mede_indiener(self, user):
         if not self.mede_indieners.filter_by(id=user.id).first():
             self.mede_indieners.append(user)
@@ -278,6 +298,108 @@ class DashboardLayout(db.Model):
     def __repr__(self):
         return f"<DashboardLayout user={self.user_id} ctx={self.context}>"
 
+# === Dashboard-rollup: voorberekende statistieken per tenant en per gebruiker ===
+class DashboardRollup(db.Model):
+    """Eén rij per tenant (``user_id`` leeg) en één per gebruiker.
+
+    Bijgewerkt door de schrijfpaden van moties, mede-indieners en shares (zie
+    ``app.dashboard.rollup``); ``flask rebuild-dashboard-rollup`` rekent alles opnieuw uit.
+    """
+    __tablename__ = 'dashboard_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id', ondelete='CASCADE'), nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=True, index=True)
+    status_counts = db.Column(JSONEncodedDict, nullable=False, default=dict)  # {status: aantal}
+    motie_count = db.Column(db.Integer, nullable=False, default=0)
+    indieners_totaal = db.Column(db.Integer, nullable=False, default=0)  # indiener + mede-indieners, opgeteld
+    gedeeld_count = db.Column(db.Integer, nullable=False, default=0)  # alleen per gebruiker
+    gedeeld_verloopt_op = db.Column(db.DateTime, nullable=True)  # eerstvolgende verloopdatum in gedeeld_count
+    laatste_activiteit = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Eén tenantrij per tenant (ook zonder tenant: vandaar COALESCE, NULL's botsen anders
+    # nooit) en één rij per gebruiker; ``store_stats`` schrijft met ON CONFLICT op deze indexen.
+    # Zonder partiële indexen (MySQL) blijft de oude constraint, zoals migratie d1e2f3a4b5c6
+    __table_args__ = (
+        db.Index(
+            'uq_dashboard_rollup_tenant',
+            db.func.coalesce(tenant_id, 0),
+            unique=True,
+            postgresql_where=db.text('user_id IS NULL'),
+            sqlite_where=db.text('user_id IS NULL'),
+        ).ddl_if(dialect=PARTIAL_INDEX_DIALECTS),
+        db.Index(
+            'uq_dashboard_rollup_user',
+            user_id,
+            unique=True,
+            postgresql_where=db.text('user_id IS NOT NULL'),
+            sqlite_where=db.text('user_id IS NOT NULL'),
+        ).ddl_if(dialect=PARTIAL_INDEX_DIALECTS),
+        db.UniqueConstraint(
+            'tenant_id', 'user_id', name='uq_dashboard_rollup_tenant_user'
+        ).ddl_if(callable_=_without_partial_indexes),
+    )
+
+    @property
+    def avg_indieners(self):
+        return self.indieners_totaal / self.motie_count if self.motie_count else None
+
+    def __repr__(self):
+        return f"<DashboardRollup tenant={self.tenant_id} user={self.user_id} moties={self.motie_count}>"
+
+# === Externe vergaderagenda's (ICS-feeds per tenant) ===
+class CalendarFeed(db.Model):
+    """Eén ICS-feed van een tenant, met de validators voor conditioneel ophalen."""
+    __tablename__ = 'calendar_feed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id', ondelete='CASCADE'), nullable=True, index=True)
+    naam = db.Column(db.String(120), nullable=False)
+    url = db.Column(db.String(1000), nullable=False)
+    actief = db.Column(db.Boolean, default=True, nullable=False)
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(64), nullable=True)
+    checked_at = db.Column(db.DateTime, nullable=True)  # laatste poging (ook bij een fout)
+    fetched_at = db.Column(db.DateTime, nullable=True)  # laatste geslaagde controle (200 of 304)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'url', name='uq_calendar_feed_tenant_url'),
+    )
+
+    events = db.relationship('CalendarEvent', back_populates='feed', cascade='all, delete-orphan', passive_deletes=True)
+    tenant = db.relationship('Tenant')
+
+    def __repr__(self):
+        return f"<CalendarFeed {self.naam} tenant={self.tenant_id}>"
+
+
+class CalendarEvent(db.Model):
+    """Een (uitgeklapte) afspraak uit een feed; tijden in de lokale tijdzone (CALENDAR_TIMEZONE)."""
+    __tablename__ = 'calendar_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id', ondelete='CASCADE'), nullable=True)
+    feed_id = db.Column(db.Integer, db.ForeignKey('calendar_feed.id', ondelete='CASCADE'), nullable=False, index=True)
+    uid = db.Column(db.String(255), nullable=True)
+    start = db.Column(db.DateTime, nullable=False)
+    end = db.Column(db.DateTime, nullable=True)
+    all_day = db.Column(db.Boolean, default=False, nullable=False)
+    summary = db.Column(db.String(500), nullable=True)
+    location = db.Column(db.String(500), nullable=True)
+    url = db.Column(db.String(1000), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_calendar_event_tenant_start', 'tenant_id', 'start'),
+    )
+
+    feed = db.relationship('CalendarFeed', back_populates='events')
+
+    def __repr__(self):
+        return f"<CalendarEvent {self.start:%Y-%m-%d %H:%M} {self.summary!r}>"
+
 # === Delen van moties met partijen of personen (geen mede-indieners) ===
 class MotieShare(db.Model):
     __tablename__ = "motie_share"
@@ -299,7 +421,7 @@ class MotieShare(db.Model):
     expires_at = db.Column(db.DateTime, nullable=True)
 
     # Lifecycle
-    actief = db.Column(db.Boolean, default=True, nullable=False)  # gebruik i.p.v. partial unique index
+    actief = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     revoked_at = db.Column(db.DateTime, nullable=True)
 
@@ -313,8 +435,42 @@ class MotieShare(db.Model):
             "permission IN ('view','comment','suggest', 'edit')",
             name="ck_motieshare_permission"
         ),
-        db.UniqueConstraint("motie_id", "target_user_id", "actief", name="uq_share_user_active"),
-        db.UniqueConstraint("motie_id", "target_party_id", "actief", name="uq_share_party_active"),
+        # Eén actieve share per motie en doel; ingetrokken shares blijven als geschiedenis staan
+        db.Index(
+            "uq_share_user_active",
+            "motie_id", "target_user_id",
+            unique=True,
+            postgresql_where=db.text("actief IS true"),
+            sqlite_where=db.text("actief IS 1"),
+        ).ddl_if(dialect=PARTIAL_INDEX_DIALECTS),
+        db.Index(
+            "uq_share_party_active",
+            "motie_id", "target_party_id",
+            unique=True,
+            postgresql_where=db.text("actief IS true"),
+            sqlite_where=db.text("actief IS 1"),
+        ).ddl_if(dialect=PARTIAL_INDEX_DIALECTS),
+        # Zonder partiële indexen: de oude constraint (één actieve en één ingetrokken per doel)
+        db.UniqueConstraint(
+            "motie_id", "target_user_id", "actief", name="uq_share_user_active"
+        ).ddl_if(callable_=_without_partial_indexes),
+        db.UniqueConstraint(
+            "motie_id", "target_party_id", "actief", name="uq_share_party_active"
+        ).ddl_if(callable_=_without_partial_indexes),
+        # Partiële indexen voor "actieve shares van deze gebruiker/partij"; expires_at zit
+        # erin zodat de verloopcheck uit de index beantwoord wordt
+        db.Index(
+            "ix_share_active_user",
+            "target_user_id", "motie_id", "expires_at",
+            postgresql_where=db.text("actief IS true"),
+            sqlite_where=db.text("actief IS 1"),
+        ),
+        db.Index(
+            "ix_share_active_party",
+            "target_party_id", "motie_id", "expires_at",
+            postgresql_where=db.text("actief IS true"),
+            sqlite_where=db.text("actief IS 1"),
+        ),
     )
 
     # Relaties
@@ -351,10 +507,20 @@ class Notification(db.Model):
     share_id = db.Column(db.Integer, db.ForeignKey("motie_share.id", ondelete="CASCADE"), nullable=True, index=True)
 
     type = db.Column(db.String(50), nullable=False)        # bv. 'share_received'
-    payload = db.Column(JSONEncodedDict, nullable=False)   # {titel, permission, message, afzender_naam, ...}
+    # {titel, permission, message, afzender_naam, ...}; deferred: alleen decoderen voor rijen die getoond worden
+    payload = db.deferred(db.Column(JSONEncodedDict, nullable=False))
 
     read_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Wacht op de volgende digest-mail (gebruiker ontvangt geen losse mails)
+    digest_pending = db.Column(db.Boolean, default=False, nullable=False, index=True)
+
+    __table_args__ = (
+        # Dekt badge-tellingen (user_id, read_at IS NULL) en de inbox met alleen ongelezen
+        db.Index("ix_notification_user_read_created", "user_id", "read_at", "created_at"),
+        # Volledige inbox en bel: nieuwste eerst op (created_at, id), zonder sorteerstap
+        db.Index("ix_notification_user_created_id", "user_id", "created_at", "id"),
+    )
 
     user = db.relationship("User", backref=db.backref("notifications", cascade="all, delete-orphan"))
     motie = db.relationship("Motie")
@@ -368,6 +534,53 @@ class Notification(db.Model):
     def __repr__(self):
         return f"<Notification user={self.user_id} type={self.type} motie={self.motie_id}>"
 
+class NotificationArchive(db.Model):
+    """Compacte kopie van gelezen notificaties die uit de retentieperiode zijn gevallen."""
+    __tablename__ = "notification_archive"
+
+    id = db.Column(db.Integer, primary_key=True)  # zelfde id als de oorspronkelijke notificatie
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id', ondelete='RESTRICT'), nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    motie_id = db.Column(db.Integer, nullable=True)
+    type = db.Column(db.String(50), nullable=False)
+    payload = db.deferred(db.Column(JSONEncodedDict, nullable=False))
+    created_at = db.Column(db.DateTime, nullable=False)
+    read_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<NotificationArchive user={self.user_id} type={self.type} motie={self.motie_id}>"
+
+# === Exportjobs (grote exports op de achtergrond) ===
+class ExportJob(db.Model):
+    __tablename__ = "export_job"
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id', ondelete='RESTRICT'), nullable=True, index=True)
+    created_by_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = db.Column(db.String(30), nullable=False, default="moties_zip")
+    params = db.Column(JSONEncodedDict, nullable=False, default=dict)  # bv. {"motie_ids": [...], "template": "..."}
+    status = db.Column(db.String(20), nullable=False, default=STATUS_QUEUED, index=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    done = db.Column(db.Integer, nullable=False, default=0)
+    result_path = db.Column(db.String(500), nullable=True)
+    filename = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    created_by = db.relationship("User")
+    tenant = db.relationship('Tenant')
+
+    def __repr__(self):
+        return f"<ExportJob {self.id} {self.kind} {self.status}>"
+
 class AdviceSession(db.Model):
     __tablename__ = 'advice_session'
     id = db.Column(db.Integer, primary_key=True)
@@ -1,16 +1,21 @@
-from flask import Flask, render_template, flash, redirect, url_for, send_file, request, abort, make_response, jsonify, session
+from flask import Flask, render_template, flash, redirect, url_for, send_file, request, abort, make_response, jsonify, session, g, current_app, Response
 from app.moties.forms import MotieForm
-from sqlalchemy import or_, asc, desc, and_, case, literal, func, union_all, select
+from sqlalchemy import or_, asc, desc, and_, case, literal, func, union_all, select, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.sql import label
-from app.models import Motie, User, motie_medeindieners, MotieShare, Party, Notification, MotieVersion, AdviceSession
+from app.models import Motie, User, motie_medeindieners, MotieShare, Party, Notification, MotieVersion, AdviceSession, ExportJob
 from app import db, send_email
 from app.email_utils import render_email
+from app.notifications import digest_frequency_for
 import json
+import os
 from app.moties import bp
-from app.exporters.motie_docx import render_motie_to_docx_bytes
-from io import BytesIO
-from zipfile import ZipFile, ZIP_DEFLATED
+from app.exporters.motie_docx import motie_export_data, motie_export_query, template_path
+from app.exporters.docx_cache import docx_cache, render_export_data_cached
+from app.exporters.bulk import iter_rendered_docx, stream_zip, unique_name
+from app.exporters.jobs import start_export_job
+from app.dashboard.rollup import touch_rollup
 import datetime as dt
 from flask_login import current_user, login_required  
 from app.auth.utils import login_and_active_required, roles_required 
@@ -44,19 +49,6 @@ def as_list(value):
         except Exception:
             return []
 
-def _unique_name(name: str, existing: set[str]) -> str:
-    """Zorgt dat bestandsnamen uniek zijn binnen de zip."""
-    if name not in existing:
-        existing.add(name)
-        return name
-    base, ext = (name.rsplit(".", 1) + [""])[:2]
-    ext = f".{ext}" if ext else ""
-    i = 2
-    while f"{base} ({i}){ext}" in existing:
-        i += 1
-    unique = f"{base} ({i}){ext}"
-    existing.add(unique)
-    return unique
 
 def _shared_motions_for_user(user):
     """Geef dict: { motie_id: {'permission': 'view|comment|edit|suggest', 'share_ids': [..]} } met hoogste permissie."""
@@ -191,17 +183,75 @@ def _safe_back_url(default_endpoint="moties.index"):
     return url_for(default_endpoint)
 
 ## Notificatie helpers
+def _current_tenant_id() -> int | None:
+    """Tenant-id voor Core-inserts (zelfde regel als de before_flush-listener)."""
+    tenant = getattr(g, 'tenant', None)
+    if not tenant or not hasattr(tenant, "_sa_instance_state"):
+        return None
+    return tenant.id
+
 def _notify(user_id: int, motie: Motie, ntype: str, payload: dict, share: MotieShare | None = None):
     """Maak 1 Notification-record aan (nog niet committen)."""
-    n = Notification(
-        user_id=user_id,
-        motie_id=motie.id if motie else None,
-        share_id=share.id if share else None,
-        type=ntype,
-        payload=payload or {}
-    )
-    db.session.add(n)
-    _send_notification_email(user_id, motie, ntype, payload or {})
+    _notify_bulk([user_id], motie, ntype, payload, share)
+
+def _notify_bulk(
+    user_ids,
+    motie: Motie | None,
+    ntype: str,
+    payload: dict,
+    share: MotieShare | None = None,
+    *,
+    return_ids: bool = False,
+) -> list[int]:
+    """Schrijf alle Notification-records van één gebeurtenis in één INSERT (nog niet committen).
+
+    Geeft de nieuwe ids terug als ``return_ids`` gezet is (anders een lege lijst).
+    """
+    recipients = list(dict.fromkeys(uid for uid in user_ids if uid))
+    if not recipients:
+        return []
+    payload = payload or {}
+    now = dt.datetime.utcnow()
+    # Buiten een request (CLI-jobs) is er geen g.tenant: volg dan de tenant van de motie
+    tenant_id = _current_tenant_id() or (motie.tenant_id if motie else None)
+    users_by_id = {u.id: u for u in User.query.filter(User.id.in_(recipients)).all()}
+    # Gebruikers met uur-/dagoverzicht krijgen geen losse mail; de digest-job pakt ze op
+    digest_ids = {
+        uid for uid, u in users_by_id.items()
+        if _is_email_pref_enabled(u, ntype) and digest_frequency_for(u) != "instant"
+    }
+    rows = [
+        {
+            "tenant_id": tenant_id,
+            "user_id": uid,
+            "motie_id": motie.id if motie else None,
+            "share_id": share.id if share else None,
+            "type": ntype,
+            "payload": payload,
+            "created_at": now,
+            "digest_pending": uid in digest_ids,
+        }
+        for uid in recipients
+    ]
+
+    new_ids: list[int] = []
+    stmt = insert(Notification).values(rows)
+    if return_ids and db.session.get_bind().dialect.insert_returning:
+        new_ids = list(db.session.execute(stmt.returning(Notification.id)).scalars())
+    elif return_ids:
+        # Dialect zonder RETURNING: val terug op ORM-objecten zodat de ids bekend zijn
+        objs = [Notification(**row) for row in rows]
+        db.session.add_all(objs)
+        db.session.flush()
+        new_ids = [n.id for n in objs]
+    else:
+        db.session.execute(stmt)
+
+    for uid in recipients:
+        if uid in digest_ids:
+            continue
+        _deliver_notification_email(users_by_id.get(uid), motie, ntype, payload)
+    return new_ids
 
 def _pref_key_for_notification(user: User, ntype: str) -> str:
     """Map notificatietype -> voorkeurssleutel. Gegroepeerd per doelgroep.
@@ -236,7 +286,10 @@ def _is_email_pref_enabled(user: User, ntype: str) -> bool:
 
 
 def _send_notification_email(user_id: int, motie: Motie | None, ntype: str, payload: dict) -> None:
-    user = User.query.get(user_id)
+    _deliver_notification_email(User.query.get(user_id), motie, ntype, payload)
+
+
+def _deliver_notification_email(user: User | None, motie: Motie | None, ntype: str, payload: dict) -> None:
     if not user or not getattr(user, "email", None):
         return
     # Respecteer per-gebruiker e-mailvoorkeuren (functionele mails elders blijven altijd aan)
@@ -424,8 +477,7 @@ def _notify_advice_requested(motie: Motie, requested_by: User | None):
         "requested_by_id": requested_by.id if requested_by else None,
         "requested_by_naam": requested_by.naam if requested_by else None,
     }
-    for u in recipients:
-        _notify(u.id, motie, "advice_requested", payload, None)
+    _notify_bulk([u.id for u in recipients], motie, "advice_requested", payload, None)
 
 def _notify_advice_returned(motie: Motie, reviewer: User | None):
     indiener_id = motie.indiener_id
@@ -452,9 +504,8 @@ def _notify_advice_accepted(motie: Motie, accepted_by: User | None, session: Adv
         _notify(reviewer_id, motie, "advice_accepted", payload, None)
     else:
         q = User.query.filter(User.actief.is_(True))
-        for u in q.all():
-            if u.has_role('griffie', 'superadmin'):
-                _notify(u.id, motie, "advice_accepted", payload, None)
+        recipients = [u.id for u in q.all() if u.has_role('griffie', 'superadmin')]
+        _notify_bulk(recipients, motie, "advice_accepted", payload, None)
 
 def _notify_share_created(share: MotieShare):
     """Notificaties naar target user of alle actieve leden van de target party."""
@@ -469,14 +520,13 @@ def _notify_share_created(share: MotieShare):
         "afzender_naam": afzender.naam if afzender else None,
     }
 
-    notified: set[int] = set()
+    recipients: list[int] = []
 
     # Geval 1: specifiek naar gebruiker
     if share.target_user_id:
         uid = share.target_user_id
         if uid != (afzender.id if afzender else None):
-            _notify(uid, motie, "share_received", payload_base, share)
-            notified.add(uid)
+            recipients.append(uid)
 
     # Geval 2: naar partij -> alle actieve leden
     if share.target_party_id:
@@ -487,23 +537,120 @@ def _notify_share_created(share: MotieShare):
                     continue
                 if afzender and lid.id == afzender.id:
                     continue  # geen notificatie naar jezelf
-                if lid.id in notified:
+                if lid.id in recipients:
                     continue  # voorkom dubbel (bv. user én party in één actie)
-                _notify(lid.id, motie, "share_received", payload_base, share)
-                notified.add(lid.id)         
+                recipients.append(lid.id)
+
+    _notify_bulk(recipients, motie, "share_received", payload_base, share)
+
+def _create_shares(
+    motie: Motie,
+    *,
+    user_ids,
+    party_ids,
+    permission: str,
+    message: str | None,
+    expires_at: dt.datetime | None,
+) -> tuple[list[MotieShare], int]:
+    """Maak alle shares van één deelactie in één INSERT en sla bestaande actieve shares over.
+
+    Postgres en SQLite gebruiken ON CONFLICT DO NOTHING ... RETURNING; overige dialecten
+    (MySQL) filteren eerst de al actieve doelen weg. Notificaties gaan alleen naar de
+    shares die echt zijn aangemaakt. Geeft (nieuwe shares, aantal overgeslagen) terug.
+    """
+    targets = [("target_user_id", uid) for uid in dict.fromkeys(user_ids)]
+    targets += [("target_party_id", pid) for pid in dict.fromkeys(party_ids)]
+    if not targets:
+        return [], 0
+
+    now = dt.datetime.utcnow()
+    base = {
+        "tenant_id": _current_tenant_id(),
+        "motie_id": motie.id,
+        "created_by_id": current_user.id,
+        "permission": permission,
+        "message": message,
+        "expires_at": expires_at,
+        "actief": True,
+        "created_at": now,
+    }
+    rows = [
+        {**base, "target_user_id": None, "target_party_id": None, column: value}
+        for column, value in targets
+    ]
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(MotieShare).values(rows).on_conflict_do_nothing().returning(MotieShare.id)
+        new_ids = list(db.session.execute(stmt).scalars())
+    else:
+        existing = set(
+            db.session.execute(
+                select(MotieShare.target_user_id, MotieShare.target_party_id).where(
+                    MotieShare.motie_id == motie.id,
+                    MotieShare.actief.is_(True),
+                )
+            ).all()
+        )
+        rows = [r for r in rows if (r["target_user_id"], r["target_party_id"]) not in existing]
+        new_ids = []
+        if rows:
+            db.session.execute(insert(MotieShare), rows)
+            new_ids = list(
+                db.session.execute(
+                    select(MotieShare.id).where(
+                        MotieShare.motie_id == motie.id,
+                        MotieShare.actief.is_(True),
+                        or_(
+                            MotieShare.target_user_id.in_([r["target_user_id"] for r in rows if r["target_user_id"]]),
+                            MotieShare.target_party_id.in_([r["target_party_id"] for r in rows if r["target_party_id"]]),
+                        ),
+                    )
+                ).scalars()
+            )
+
+    shares = []
+    if new_ids:
+        shares = (
+            MotieShare.query
+            .options(
+                selectinload(MotieShare.created_by),
+                selectinload(MotieShare.target_party).selectinload(Party.leden),
+            )
+            .filter(MotieShare.id.in_(new_ids))
+            .order_by(MotieShare.id.asc())
+            .all()
+        )
+        for share in shares:
+            _notify_share_created(share)
+        # De INSERT gaat buiten de ORM om; de dashboard-rollup hoort het hier
+        touch_rollup(
+            user_ids=[share.target_user_id for share in shares],
+            party_ids=[share.target_party_id for share in shares],
+        )
+    return shares, len(targets) - len(shares)
 
-def _notify_share_revoked(share: MotieShare):
-    """Notificaties naar dezelfde doelgroep als bij aanmaken, maar met type 'share_revoked'."""
+def _notify_share_revoked(share: MotieShare, *, expired: bool = False):
+    """Notificaties naar dezelfde doelgroep als bij aanmaken, maar met type 'share_revoked'.
+
+    Met ``expired`` is de share door de verloopjob ingetrokken en niet door een persoon.
+    """
     motie = share.motie
     afzender = share.created_by
     payload_base = {
         "motie_id": motie.id,
         "motie_titel": motie.titel,
         "permission": share.permission,
-        "revoked_by_id": afzender.id if afzender else None,
-        "revoked_by_naam": afzender.naam if afzender else None,
+        "revoked_by_id": None if expired or not afzender else afzender.id,
+        "revoked_by_naam": None if expired or not afzender else afzender.naam,
         "revoked_at": dt.datetime.utcnow().isoformat(),
     }
+    if expired:
+        payload_base["reden"] = "verlopen"
 
     recipients: list[int] = []
     if share.target_user_id:
@@ -513,10 +660,56 @@ def _notify_share_revoked(share: MotieShare):
         if party:
             recipients.extend([u.id for u in party.leden if getattr(u, "actief", True)])
 
-    for uid in set(recipients):
-        if afzender and uid == afzender.id:
+    _notify_bulk(
+        [uid for uid in recipients if not (afzender and uid == afzender.id)],
+        motie, "share_revoked", payload_base, share,
+    )
+
+def revoke_expired_shares(now: dt.datetime | None = None) -> tuple[int, int]:
+    """Trek verlopen, nog actieve shares in en stuur 'share_revoked'-notificaties.
+
+    Bedoeld voor een geplande job. Geeft (ingetrokken, overgeslagen) terug; overgeslagen
+    kan alleen op een database zonder partiële unieke indexen (MySQL), waar de oude
+    constraint maar één ingetrokken share per motie en doel toestaat. Links in de mails
+    wijzen naar de host van de tenant.
+    """
+    from app.notifications import tenant_base_urls
+
+    now = now or dt.datetime.utcnow()
+    expired = (
+        MotieShare.query
+        .options(
+            selectinload(MotieShare.motie),
+            selectinload(MotieShare.created_by),
+            selectinload(MotieShare.target_party).selectinload(Party.leden),
+        )
+        .filter(
+            MotieShare.actief.is_(True),
+            MotieShare.expires_at.isnot(None),
+            MotieShare.expires_at <= now,
+        )
+        .order_by(MotieShare.id.asc())
+        .all()
+    )
+
+    def _tenant_of(share):
+        return share.tenant_id if share.tenant_id is not None else getattr(share.motie, "tenant_id", None)
+
+    base_urls = tenant_base_urls(_tenant_of(share) for share in expired)
+    revoked, skipped = 0, 0
+    for share in expired:
+        try:
+            with db.session.begin_nested():
+                share.revoke()
+        except IntegrityError:
+            current_app.logger.warning("Verlopen share %s kon niet worden ingetrokken", share.id, exc_info=True)
+            skipped += 1
             continue
-        _notify(uid, motie, "share_revoked", payload_base, share)
+        with current_app.test_request_context(base_url=base_urls.get(_tenant_of(share), base_urls[None])):
+            _notify_share_revoked(share, expired=True)
+        revoked += 1
+    db.session.commit()
+    return revoked, skipped
 
 def _notify_coauthors_added(motie: Motie, user_ids: list[int]):
     """Notificaties naar nieuw toegevoegde mede-indieners."""
@@ -529,10 +722,10 @@ def _notify_coauthors_added(motie: Motie, user_ids: list[int]):
         "toegevoegd_door_id": afzender.id if afzender else None,
         "toegevoegd_door_naam": afzender.naam if afzender else None,
     }
-    for uid in set(user_ids):
-        if afzender and uid == afzender.id:
-            continue
-        _notify(uid, motie, "coauthor_added", payload, None)
+    _notify_bulk(
+        [uid for uid in user_ids if not (afzender and uid == afzender.id)],
+        motie, "coauthor_added", payload, None,
+    )
 
 # Index-views (griffie, raadsleden, superadmin)
 @bp.route('/alle', methods=['GET', 'POST'])
@@ -1466,45 +1659,15 @@ def share_create(motie_id):
             flash("Kies ten minste één gebruiker of één partij om mee te delen.", "warning")
             return redirect(url_for('moties.bewerken', motie_id=motie.id))
 
-        created, skipped = 0, 0
-        for uid in user_ids:
-            share = MotieShare(
-                motie_id=motie.id,
-                created_by_id=current_user.id,
-                permission=permission,
-                message=message,
-                expires_at=expires_at,
-                actief=True,
-                target_user_id=uid
-            )
-            try:
-                db.session.add(share)
-                db.session.flush()
-                _notify_share_created(share)
-                created += 1
-            except Exception:
-                db.session.rollback()
-                skipped += 1  # vaak duplicate actieve share
-
-        for pid in party_ids:
-            share = MotieShare(
-                motie_id=motie.id,
-                created_by_id=current_user.id,
-                permission=permission,
-                message=message,
-                expires_at=expires_at,
-                actief=True,
-                target_party_id=pid
-            )
-            try:
-                db.session.add(share)
-                db.session.flush()
-                _notify_share_created(share) 
-                created += 1
-            except Exception:
-                db.session.rollback()
-                skipped += 1
-
+        shares, skipped = _create_shares(
+            motie,
+            user_ids=user_ids,
+            party_ids=party_ids,
+            permission=permission,
+            message=message,
+            expires_at=expires_at,
+        )
+        created = len(shares)
         db.session.commit()
         
         if created and skipped:
@@ -1555,12 +1718,11 @@ def share_revoke(motie_id, share_id):
 @bp.route("/<int:motie_id>/export/docx")
 @login_and_active_required
 def export_motie_docx(motie_id: int):
-    motie = db.session.get(Motie, motie_id)
+    motie = motie_export_query().filter(Motie.id == motie_id).first()
     if not motie:
         abort(404, "Motie niet gevonden")
 
-    # Optioneel kun je datum/vergadering meegeven vanuit querystring of motie
-    file_bytes, filename = render_motie_to_docx_bytes(motie)
+    file_bytes, filename = render_export_data_cached(motie_export_data(motie), template_path(), docx_cache())
 
     resp = make_response(file_bytes)
     resp.headers.set(
@@ -1571,17 +1733,8 @@ def export_motie_docx(motie_id: int):
     resp.headers.set("Content-Disposition", f'attachment; filename="{filename}"')
     return resp
 
-@bp.route("/export/bulk", methods=["POST"])
-@roles_required('griffie')
-@login_and_active_required
-def export_bulk_zip():
-    """
-    Accepteert:
-      - POST form: motie_ids=<id>&motie_ids=<id>...
-      - of JSON: {"ids": [1,2,3]}
-    Geeft een ZIP met 'Motie <titel>.docx' per motie terug.
-    """
-    ids = []
+def _requested_motie_ids() -> list[int]:
+    """Motie-ids uit een form (motie_ids=...) of JSON-body ({"ids": [...]})."""
     if request.is_json:
         payload = request.get_json(silent=True) or {}
         ids = payload.get("ids", [])
@@ -1597,13 +1750,27 @@ def export_bulk_zip():
 
     if not ids:
         abort(400, "Geen moties geselecteerd")
+    return ids
+
+@bp.route("/export/bulk", methods=["POST"])
+@roles_required('griffie')
+@login_and_active_required
+def export_bulk_zip():
+    """
+    Accepteert:
+      - POST form: motie_ids=<id>&motie_ids=<id>...
+      - of JSON: {"ids": [1,2,3]}
+    Geeft een ZIP met 'Motie <titel>.docx' per motie terug.
+    """
+    ids = _requested_motie_ids()
 
-    # (optioneel) limiet om geheugen te sparen
-    if len(ids) > 200:
-        abort(400, "Selecteer maximaal 200 moties per export")
+    # Het renderen streamt; de limiet bewaakt alleen de duur van één request
+    max_items = int(current_app.config.get("EXPORT_BULK_MAX") or 0)
+    if max_items and len(ids) > max_items:
+        abort(400, f"Selecteer maximaal {max_items} moties per export")
 
     moties = (
-        db.session.query(Motie)
+        motie_export_query()
         .filter(Motie.id.in_(ids))
         .order_by(Motie.id.asc())
         .all()
@@ -1611,23 +1778,109 @@ def export_bulk_zip():
     if not moties:
         abort(404, "Geen moties gevonden")
 
-    zip_buf = BytesIO()
-    name_set: set[str] = set()
+    # Alles wat de renderer nodig heeft vooraf ophalen: de stream zelf raakt de database niet
+    items = [motie_export_data(m) for m in moties]
+    tpl_path = template_path()
+    processes = int(current_app.config.get("EXPORT_RENDER_PROCESSES") or 0)
+    cache = docx_cache()
+    renderer = current_app.config.get("EXPORT_BULK_RENDERER") or "docxtpl"
 
-    with ZipFile(zip_buf, "w", ZIP_DEFLATED) as zf:
-        for m in moties:
-            doc_bytes, filename = render_motie_to_docx_bytes(m)
-            filename = _unique_name(filename, name_set)
-            zf.writestr(filename, doc_bytes)
+    def entries():
+        name_set: set[str] = set()
+        for doc_bytes, filename in iter_rendered_docx(
+            items, tpl_path, processes=processes, cache=cache, renderer=renderer,
+        ):
+            yield unique_name(filename, name_set), doc_bytes
 
-    zip_buf.seek(0)
     stamp = dt.datetime.now().strftime("%Y%m%d_%H%M")
     zip_name = f"Moties_{stamp}.zip"
 
+    resp = Response(stream_zip(entries()), mimetype="application/zip")
+    resp.headers.set("Content-Disposition", f'attachment; filename="{zip_name}"')
+    resp.headers.set("Cache-Control", "no-store")
+    return resp
+
+
+# ---- exportjobs op de achtergrond -----------------------------------------------
+
+def _export_job_json(job: ExportJob) -> dict:
+    data = {
+        "id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "done": job.done,
+        "progress": round(job.done / job.total, 3) if job.total else (1.0 if job.status == ExportJob.STATUS_DONE else 0.0),
+        "error": job.error,
+        "status_url": url_for("moties.export_job_status", job_id=job.id),
+    }
+    if job.status == ExportJob.STATUS_DONE:
+        data["download_url"] = url_for("moties.export_job_download", job_id=job.id)
+    return data
+
+
+def _get_own_export_job(job_id: int) -> ExportJob:
+    job = ExportJob.query.filter(ExportJob.id == job_id).first()
+    if not job:
+        abort(404)
+    if job.created_by_id != current_user.id and not current_user.has_role("superadmin"):
+        abort(403)
+    return job
+
+
+@bp.route("/export/jobs", methods=["POST"])
+@roles_required('griffie')
+@login_and_active_required
+def export_job_create():
+    """Start een bulk-export op de achtergrond; zelfde invoer als ``export_bulk_zip``.
+
+    Geeft 202 met de job-status terug. De UI pollt ``status_url`` tot er een
+    ``download_url`` is.
+    """
+    ids = _requested_motie_ids()
+    # Alleen moties die de gebruiker in deze tenant mag zien komen in de job
+    ids = [
+        mid for (mid,) in db.session.execute(
+            select(Motie.id).where(Motie.id.in_(ids)).order_by(Motie.id.asc())
+        )
+    ]
+    if not ids:
+        abort(404, "Geen moties gevonden")
+
+    job = ExportJob(
+        created_by_id=current_user.id,
+        params={"motie_ids": ids, "template": str(template_path())},
+        total=len(ids),
+        filename=f"Moties_{dt.datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+    )
+    db.session.add(job)
+    db.session.commit()
+    start_export_job(job.id)
+    return jsonify(_export_job_json(job)), 202
+
+
+@bp.route("/export/jobs/<int:job_id>")
+@roles_required('griffie')
+@login_and_active_required
+def export_job_status(job_id):
+    job = _get_own_export_job(job_id)
+    resp = jsonify(_export_job_json(job))
+    resp.headers.set("Cache-Control", "no-store")
+    return resp
+
+
+@bp.route("/export/jobs/<int:job_id>/download")
+@roles_required('griffie')
+@login_and_active_required
+def export_job_download(job_id):
+    job = _get_own_export_job(job_id)
+    if job.status != ExportJob.STATUS_DONE or not job.result_path:
+        abort(409, "Export is nog niet klaar")
+    if not os.path.exists(job.result_path):
+        abort(410, "Exportbestand is niet meer beschikbaar")
     return send_file(
-        zip_buf,
+        job.result_path,
         mimetype="application/zip",
         as_attachment=True,
-        download_name=zip_name,
+        download_name=job.filename or f"Moties_{job.id}.zip",
         max_age=0,
     )
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable
+from urllib.parse import urlsplit
+
+from flask import current_app, url_for
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import undefer
+
+from app import db, send_email, _NOTIFICATION_LABELS
+from app.email_utils import render_email
+from app.models import Motie, Notification, NotificationArchive, TenantDomain, User
+
+DIGEST_PREF_KEY = "digest.frequency"
+DIGEST_FREQUENCIES = ("instant", "hourly", "daily")
+DIGEST_MAX_ITEMS = 50
+RETENTION_BATCH_SIZE = 1000
+
+_DIGEST_LABELS = {
+    "hourly": "uuroverzicht",
+    "daily": "dagoverzicht",
+}
+
+
+def tenant_base_urls(tenant_ids: Iterable[int | None]) -> dict[int | None, str]:
+    """Publieke basis-URL per tenant voor links in mails van geplande jobs.
+
+    De app herkent de tenant aan de hostnaam, dus een link moet naar de host van de tenant
+    van de ontvanger wijzen: de eerste hostnaam in ``tenant_domain``, met het schema van
+    ``APP_BASE_URL``. Tenants zonder domein (en ``None``) krijgen ``APP_BASE_URL`` zelf.
+    """
+    fallback = current_app.config.get("APP_BASE_URL") or "http://localhost"
+    scheme = urlsplit(fallback).scheme or "https"
+    ids = {tid for tid in tenant_ids if tid is not None}
+    urls: dict[int | None, str] = {tid: fallback for tid in ids}
+    urls[None] = fallback
+    if ids:
+        rows = db.session.execute(
+            select(TenantDomain.tenant_id, TenantDomain.hostname)
+            .where(TenantDomain.tenant_id.in_(ids))
+            .order_by(TenantDomain.id.desc())
+        )
+        for tenant_id, hostname in rows:
+            urls[tenant_id] = f"{scheme}://{hostname}"
+    return urls
+
+
+def digest_frequency_for(user) -> str:
+    """Gekozen mailfrequentie van een gebruiker; onbekend of ontbrekend = direct."""
+    prefs = getattr(user, "email_prefs", None) or {}
+    value = prefs.get(DIGEST_PREF_KEY) if isinstance(prefs, dict) else None
+    return value if value in DIGEST_FREQUENCIES else "instant"
+
+
+def _digest_line(n: Notification) -> tuple[str, str]:
+    payload = n.payload or {}
+    label = _NOTIFICATION_LABELS.get(n.type) or (n.type or "").replace("_", " ").capitalize()
+    titel = payload.get("motie_titel") or (f"Motie #{n.motie_id}" if n.motie_id else "Motio")
+    return label, f"{titel} ({n.created_at.strftime('%d-%m %H:%M')})"
+
+
+def _send_digest(user: User, items: list[Notification], frequency: str) -> bool:
+    shown = items[:DIGEST_MAX_ITEMS]
+    paragraphs = []
+    if len(items) > len(shown):
+        paragraphs.append(f"En nog {len(items) - len(shown)} andere melding(en).")
+    subject = f"Je Motio-{_DIGEST_LABELS.get(frequency, 'overzicht')}: {len(items)} nieuwe melding(en)"
+    text_body, html_body = render_email(
+        subject=subject,
+        greeting=f"Hallo {user.naam}," if getattr(user, "naam", None) else "Hallo,",
+        intro="Dit zijn je meldingen sinds het vorige overzicht.",
+        paragraphs=paragraphs,
+        details=[_digest_line(n) for n in shown],
+        cta_label="Open Motio",
+        cta_url=url_for("dashboard.home", _external=True),
+    )
+    return send_email(subject=subject, recipients=user.email, text_body=text_body, html_body=html_body)
+
+
+def send_notification_digests(frequency: str) -> tuple[int, int]:
+    """Bundel openstaande digest-notificaties per gebruiker in één mail.
+
+    Bedoeld voor een geplande job (cron): elk uur met ``hourly`` en één keer per dag
+    met ``daily``. Geeft (aantal verstuurde mails, aantal meegenomen notificaties) terug.
+    """
+    if frequency not in ("hourly", "daily"):
+        raise ValueError(f"Onbekende digest-frequentie: {frequency}")
+
+    pending = (
+        Notification.query
+        .options(undefer(Notification.payload))
+        .filter(Notification.digest_pending.is_(True))
+        .order_by(Notification.user_id.asc(), Notification.created_at.asc())
+        .all()
+    )
+    by_user: dict[int, list[Notification]] = defaultdict(list)
+    for n in pending:
+        by_user[n.user_id].append(n)
+    if not by_user:
+        return 0, 0
+
+    users = User.query.filter(User.id.in_(list(by_user))).all()
+    base_urls = tenant_base_urls(u.tenant_id for u in users)
+    sent, handled = 0, 0
+    done_ids: list[int] = []
+    for user in users:
+        user_frequency = digest_frequency_for(user)
+        if user_frequency not in ("hourly", "daily"):
+            # Gebruiker is teruggeschakeld naar direct: niets meer bundelen
+            done_ids.extend(n.id for n in by_user[user.id])
+            continue
+        if user_frequency != frequency:
+            continue
+        items = [n for n in by_user[user.id] if n.read_at is None]
+        if items and getattr(user, "email", None) and getattr(user, "actief", True):
+            # Links naar de host van de tenant van de ontvanger
+            with current_app.test_request_context(base_url=base_urls.get(user.tenant_id, base_urls[None])):
+                delivered = _send_digest(user, items, frequency)
+            if not delivered:
+                continue  # volgende run opnieuw proberen
+            sent += 1
+            handled += len(items)
+        done_ids.extend(n.id for n in by_user[user.id])
+
+    if done_ids:
+        (
+            Notification.query
+            .filter(Notification.id.in_(done_ids))
+            .update({Notification.digest_pending: False}, synchronize_session=False)
+        )
+    db.session.commit()
+    return sent, handled
+
+
+def archive_read_notifications(days: int | None = None, *, delete_only: bool = False) -> int:
+    """Verplaats gelezen notificaties ouder dan ``days`` dagen naar het archief (of verwijder ze).
+
+    Werkt in batches met INSERT ... SELECT, zodat payloads niet in Python gedecodeerd
+    worden. Geeft het aantal opgeruimde notificaties terug.
+    """
+    if days is None:
+        days = int(current_app.config.get("NOTIFICATION_RETENTION_DAYS") or 90)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archive_cols = ["id", "tenant_id", "user_id", "motie_id", "type", "payload", "created_at", "read_at", "archived_at"]
+
+    total = 0
+    while True:
+        batch_ids = list(
+            db.session.execute(
+                select(Notification.id)
+                .where(Notification.read_at.isnot(None), Notification.read_at < cutoff)
+                .order_by(Notification.id.asc())
+                .limit(RETENTION_BATCH_SIZE)
+            ).scalars()
+        )
+        if not batch_ids:
+            break
+        if not delete_only:
+            source = select(
+                Notification.id,
+                Notification.tenant_id,
+                Notification.user_id,
+                Notification.motie_id,
+                Notification.type,
+                Notification.__table__.c.payload,
+                Notification.created_at,
+                Notification.read_at,
+                literal(datetime.utcnow()),
+            ).where(Notification.id.in_(batch_ids))
+            db.session.execute(insert(NotificationArchive.__table__).from_select(archive_cols, source))
+        db.session.execute(delete(Notification.__table__).where(Notification.__table__.c.id.in_(batch_ids)))
+        db.session.commit()
+        total += len(batch_ids)
+    return total
+
+
+def notification_counts(user) -> dict[str, int]:
+    """Badge-tellingen voor de navigatie (bel en griffie-werkvoorraad)."""
+    counts = {
+        "notif_unread": Notification.query.filter(
+            Notification.user_id == user.id,
+            Notification.read_at.is_(None),
+        ).count(),
+    }
+    if user.has_role("griffie", "superadmin"):
+        counts["griffie_advice_count"] = Motie.query.filter(Motie.status.ilike("Advies griffie")).count()
+        counts["griffie_submit_count"] = Motie.query.filter(Motie.status.ilike("Klaar om in te dienen")).count()
+    return counts
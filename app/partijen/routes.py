@@ -9,6 +9,7 @@ from sqlalchemy import nullslast
 from sqlalchemy.exc import IntegrityError
 from app.models import User
 from app.auth.utils import login_and_active_required, user_has_role
+from app.exporters.party_logos import party_logo_store
 from flask_login import current_user
 
 
@@ -38,6 +39,14 @@ def _save_logo_file(file_storage, suggested_slug: str) -> str:
     file_storage.save(path)
     return filename
 
+def _prefetch_logo(party: Party) -> None:
+    """Zet het logo alvast klaar voor Word-exports (URL-logo's op de achtergrond)."""
+    store = party_logo_store()
+    if party.logo_url:
+        store.refresh_async(party.id, party.logo_url)
+    elif party.logo_filename:
+        store.resolve(party.id, party.logo_filename, None, current_app.static_folder)
+
 @bp.route('/')
 @login_and_active_required
 def index():
@@ -122,6 +131,7 @@ def toevoegen():
             flash("Naam of afkorting is al in gebruik.", "error")
             return abort(409)
 
+        _prefetch_logo(party)
         return redirect(url_for('partijen.bekijken', partij_id=party.id))
     
     return render_template('partijen/toevoegen.html', title="Partij Toevoegen")
@@ -220,6 +230,7 @@ def bewerken(partij_id):
             flash('Naam of afkorting is al in gebruik.', 'error')
             return render_template('partijen/bewerken.html', partij=partij, title=f'Bewerk {partij.naam}')
 
+        _prefetch_logo(partij)
         flash('Partij bijgewerkt.', 'success')
         return redirect(url_for('partijen.bekijken', partij_id=partij.id))
 
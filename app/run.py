@@ -1,3 +1,5 @@
+import click
+
 from app import db
 from app.models import User, Party, Motie
 
@@ -86,6 +88,86 @@ def register_cli(app):
         db.create_all()
         init_sample_data()
 
+    @app.cli.command()
+    @click.option("--frequency", type=click.Choice(["hourly", "daily"]), required=True)
+    def send_digests(frequency):
+        """Send bundled notification e-mails (schedule hourly and daily)."""
+        from app.notifications import send_notification_digests
+        sent, handled = send_notification_digests(frequency)
+        print(f"{sent} digest mail(s) sent covering {handled} notification(s)")
+
+    @app.cli.command()
+    @click.option("--days", type=int, default=None, help="Defaults to NOTIFICATION_RETENTION_DAYS.")
+    @click.option("--delete", "delete_only", is_flag=True, help="Delete instead of archiving.")
+    def archive_notifications(days, delete_only):
+        """Archive (or delete) read notifications older than the retention period."""
+        from app.notifications import archive_read_notifications
+        moved = archive_read_notifications(days, delete_only=delete_only)
+        print(f"{moved} notification(s) {'deleted' if delete_only else 'archived'}")
+
+    @app.cli.command()
+    def expire_shares():
+        """Revoke expired motion shares and notify the recipients (schedule e.g. hourly)."""
+        from app.moties.routes import revoke_expired_shares
+        revoked, skipped = revoke_expired_shares()
+        print(f"{revoked} share(s) revoked, {skipped} skipped")
+
+    @app.cli.command()
+    @click.option("--tenant", "tenant_id", type=int, default=None, help="Only this tenant (default: all).")
+    def rebuild_dashboard_rollup(tenant_id):
+        """Recompute the precomputed dashboard statistics from scratch."""
+        from app.dashboard.rollup import rebuild_rollup
+        tenants, users = rebuild_rollup(tenant_id, all_tenants=tenant_id is None)
+        print(f"{tenants} tenant(s) and {users} user(s) rebuilt")
+
+    @app.cli.command()
+    @click.option("--tenant", "tenant_id", type=int, default=None, help="Only this tenant (default: all).")
+    @click.option("--force", is_flag=True, help="Fetch even if the feeds were checked recently.")
+    def refresh_calendars(tenant_id, force):
+        """Fetch the registered external meeting calendars (ICS) into the events table (schedule e.g. every 15 min)."""
+        from app.calendar_feeds import refresh_all_calendars, refresh_tenant_calendars
+        if tenant_id is None:
+            results = refresh_all_calendars(force=force)
+        else:
+            results = refresh_tenant_calendars(tenant_id, force=force)
+        print(", ".join(f"{count} {outcome}" for outcome, count in sorted(results.items())) or "no feeds configured")
+
+    @app.cli.command()
+    def run_export_jobs():
+        """Run queued background export jobs, fail stuck ones and expire old results (schedule e.g. hourly)."""
+        from app.exporters.jobs import expire_export_jobs, fail_stale_export_jobs, run_queued_export_jobs
+        stale = fail_stale_export_jobs()
+        expired = expire_export_jobs()
+        ran = run_queued_export_jobs()
+        print(f"{ran} export job(s) finished, {stale} stuck job(s) marked failed, {expired} old job(s) removed")
+
+    @app.cli.command()
+    @click.option("--limit", type=int, default=50, help="Most recent motions to check per tenant.")
+    def check_docx_renderer(limit):
+        """Compare the native DOCX renderer with docxtpl on recent motions of every tenant."""
+        from flask import g
+        from app.models import Motie, Tenant
+        from app.exporters.motie_docx import motie_export_data, motie_export_query, template_path
+        from app.exporters.motie_native import compare_renderers
+
+        checked, different = 0, 0
+        for tenant in [None] + Tenant.query.all():
+            g.tenant = tenant
+            tenant_filter = Motie.tenant_id == tenant.id if tenant else Motie.tenant_id.is_(None)
+            moties = motie_export_query().filter(tenant_filter).order_by(Motie.id.desc()).limit(limit).all()
+            if not moties:
+                continue
+            tpl_path = template_path()
+            for motie in moties:
+                checked += 1
+                diff = compare_renderers(motie_export_data(motie), tpl_path)
+                if diff:
+                    different += 1
+                    print(f"motie {motie.id} ({tpl_path}): {diff}")
+        print(f"{checked} motion(s) checked, {different} different")
+        if different:
+            raise SystemExit(1)
+
 if __name__ == '__main__':
     # Lazy import to avoid creating a second app when used through Flask CLI
     from app import create_app
@@ -0,0 +1,45 @@
+"""dashboard rollup table for precomputed dashboard statistics
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2025-10-20 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8b9c0d1e2f3'
+down_revision = 'f7a8b9c0d1e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'dashboard_rollup',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('status_counts', sa.Text(), nullable=False),
+        sa.Column('motie_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('indieners_totaal', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('gedeeld_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('gedeeld_verloopt_op', sa.DateTime(), nullable=True),
+        sa.Column('laatste_activiteit', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('tenant_id', 'user_id', name='uq_dashboard_rollup_tenant_user'),
+    )
+    op.create_index('ix_dashboard_rollup_tenant_id', 'dashboard_rollup', ['tenant_id'])
+    op.create_index('ix_dashboard_rollup_user_id', 'dashboard_rollup', ['user_id'])
+    # Vullen gebeurt met 'flask rebuild-dashboard-rollup'; tot dan rekent het dashboard
+    # ontbrekende rijen bij het eerste bezoek uit.
+
+
+def downgrade():
+    op.drop_index('ix_dashboard_rollup_user_id', table_name='dashboard_rollup')
+    op.drop_index('ix_dashboard_rollup_tenant_id', table_name='dashboard_rollup')
+    op.drop_table('dashboard_rollup')
@@ -0,0 +1,63 @@
+"""calendar feeds and events for external meeting calendars
+
+Revision ID: b9c0d1e2f3a4
+Revises: a8b9c0d1e2f3
+Create Date: 2025-10-21 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9c0d1e2f3a4'
+down_revision = 'a8b9c0d1e2f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'calendar_feed',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=True),
+        sa.Column('naam', sa.String(length=120), nullable=False),
+        sa.Column('url', sa.String(length=1000), nullable=False),
+        sa.Column('actief', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('etag', sa.String(length=255), nullable=True),
+        sa.Column('last_modified', sa.String(length=64), nullable=True),
+        sa.Column('checked_at', sa.DateTime(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('tenant_id', 'url', name='uq_calendar_feed_tenant_url'),
+    )
+    op.create_index('ix_calendar_feed_tenant_id', 'calendar_feed', ['tenant_id'])
+
+    op.create_table(
+        'calendar_event',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=True),
+        sa.Column('feed_id', sa.Integer(), nullable=False),
+        sa.Column('uid', sa.String(length=255), nullable=True),
+        sa.Column('start', sa.DateTime(), nullable=False),
+        sa.Column('end', sa.DateTime(), nullable=True),
+        sa.Column('all_day', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('summary', sa.String(length=500), nullable=True),
+        sa.Column('location', sa.String(length=500), nullable=True),
+        sa.Column('url', sa.String(length=1000), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['feed_id'], ['calendar_feed.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_calendar_event_feed_id', 'calendar_event', ['feed_id'])
+    op.create_index('ix_calendar_event_tenant_start', 'calendar_event', ['tenant_id', 'start'])
+    # Vullen gebeurt met 'flask refresh-calendars' of bij het eerste dashboardbezoek.
+
+
+def downgrade():
+    op.drop_index('ix_calendar_event_tenant_start', table_name='calendar_event')
+    op.drop_index('ix_calendar_event_feed_id', table_name='calendar_event')
+    op.drop_table('calendar_event')
+    op.drop_index('ix_calendar_feed_tenant_id', table_name='calendar_feed')
+    op.drop_table('calendar_feed')
@@ -0,0 +1,131 @@
+"""typed meeting date on motie, backfilled from gemeenteraad_datum
+
+Revision ID: c0d1e2f3a4b5
+Revises: b9c0d1e2f3a4
+Create Date: 2025-10-22 10:00:00.000000
+"""
+
+import re
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+from dateutil.parser import parse as dt_parse
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0d1e2f3a4b5'
+down_revision = 'b9c0d1e2f3a4'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Kopie van app.meeting_dates zoals bij deze revisie, zodat latere wijzigingen daar de
+# backfill niet veranderen
+NL_MONTHS = {
+    "jan": 1, "januari": 1,
+    "feb": 2, "februari": 2,
+    "mrt": 3, "maart": 3,
+    "apr": 4, "april": 4,
+    "mei": 5,
+    "jun": 6, "juni": 6,
+    "jul": 7, "juli": 7,
+    "aug": 8, "augustus": 8,
+    "sep": 9, "sept": 9, "september": 9,
+    "okt": 10, "oktober": 10,
+    "nov": 11, "november": 11,
+    "dec": 12, "december": 12,
+}
+
+_MONTH_ALT = "|".join(sorted(NL_MONTHS, key=len, reverse=True))
+_ISO_RE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T].*)?$")
+_DMY_RE = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{2}|\d{4})$")
+_NL_TEXT_RE = re.compile(rf"(\d{{1,2}})\s+({_MONTH_ALT})\.?\s+(\d{{4}})", re.IGNORECASE)
+_SENTINEL = datetime(1900, 1, 1)
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_meeting_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+
+    m = _ISO_RE.match(text)
+    if m:
+        return _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+
+    m = _DMY_RE.match(text)
+    if m:
+        year = int(m.group(3))
+        if year < 100:
+            year += 2000
+        return _safe_date(year, int(m.group(2)), int(m.group(1)))
+
+    m = _NL_TEXT_RE.search(text)
+    if m:
+        return _safe_date(int(m.group(3)), NL_MONTHS[m.group(2).lower()], int(m.group(1)))
+
+    # Alleen als dag, maand en jaar er alle drie in staan (uitkomst onafhankelijk van de default)
+    try:
+        first = dt_parse(text, dayfirst=True, default=_SENTINEL)
+        second = dt_parse(text, dayfirst=True, default=datetime(1904, 2, 2))
+    except (ValueError, OverflowError):
+        return None
+    if first.date() != second.date():
+        return None
+    return first.date()
+
+
+def upgrade():
+    op.add_column('motie', sa.Column('vergaderdatum', sa.Date(), nullable=True))
+    op.create_index('ix_motie_tenant_vergaderdatum', 'motie', ['tenant_id', 'vergaderdatum'])
+
+    # Backfill met de parser hierboven; tekst die geen volledige datum is blijft leeg
+    bind = op.get_bind()
+    motie = sa.table(
+        'motie',
+        sa.column('id', sa.Integer),
+        sa.column('gemeenteraad_datum', sa.String),
+        sa.column('vergaderdatum', sa.Date),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(motie.c.id, motie.c.gemeenteraad_datum)
+            .where(motie.c.id > last_id, motie.c.gemeenteraad_datum.isnot(None))
+            .order_by(motie.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = [
+            {'motie_id': row.id, 'dag': dag}
+            for row in rows
+            if (dag := parse_meeting_date(row.gemeenteraad_datum)) is not None
+        ]
+        if updates:
+            bind.execute(
+                motie.update()
+                .where(motie.c.id == sa.bindparam('motie_id'))
+                .values(vergaderdatum=sa.bindparam('dag')),
+                updates,
+            )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('ix_motie_tenant_vergaderdatum', table_name='motie')
+    op.drop_column('motie', 'vergaderdatum')
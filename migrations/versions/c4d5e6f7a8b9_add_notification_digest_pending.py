@@ -0,0 +1,33 @@
+"""add digest_pending to notification
+
+Revision ID: c4d5e6f7a8b9
+Revises: b3c4d5e6f7a8
+Create Date: 2025-10-14 09:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d5e6f7a8b9'
+down_revision = 'b3c4d5e6f7a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'notification',
+        sa.Column('digest_pending', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.create_index('ix_notification_digest_pending', 'notification', ['digest_pending'])
+    try:
+        op.alter_column('notification', 'digest_pending', server_default=None)
+    except Exception:
+        pass
+
+
+def downgrade():
+    op.drop_index('ix_notification_digest_pending', table_name='notification')
+    op.drop_column('notification', 'digest_pending')
@@ -0,0 +1,72 @@
+"""partial unique indexes for dashboard rollup rows
+
+Revision ID: d1e2f3a4b5c6
+Revises: c0d1e2f3a4b5
+Create Date: 2025-10-23 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1e2f3a4b5c6'
+down_revision = 'c0d1e2f3a4b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name not in ('postgresql', 'sqlite'):
+        # Geen partiële indexen (MySQL): de bestaande constraint blijft, store_stats vangt
+        # een dubbele INSERT daar zelf af
+        return
+
+    # Dubbele rijen uit de tijd van de oude constraint opruimen (NULL's botsten daar niet);
+    # de rollup wordt bij het volgende bezoek of met 'flask rebuild-dashboard-rollup' herberekend
+    op.execute(
+        """
+        DELETE FROM dashboard_rollup
+        WHERE user_id IS NULL AND id NOT IN (
+            SELECT MAX(id) FROM dashboard_rollup WHERE user_id IS NULL GROUP BY COALESCE(tenant_id, 0)
+        )
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM dashboard_rollup
+        WHERE user_id IS NOT NULL AND id NOT IN (
+            SELECT MAX(id) FROM dashboard_rollup WHERE user_id IS NOT NULL GROUP BY user_id
+        )
+        """
+    )
+
+    with op.batch_alter_table('dashboard_rollup') as batch:
+        batch.drop_constraint('uq_dashboard_rollup_tenant_user', type_='unique')
+    op.create_index(
+        'uq_dashboard_rollup_tenant',
+        'dashboard_rollup',
+        [sa.text('COALESCE(tenant_id, 0)')],
+        unique=True,
+        postgresql_where=sa.text('user_id IS NULL'),
+        sqlite_where=sa.text('user_id IS NULL'),
+    )
+    op.create_index(
+        'uq_dashboard_rollup_user',
+        'dashboard_rollup',
+        ['user_id'],
+        unique=True,
+        postgresql_where=sa.text('user_id IS NOT NULL'),
+        sqlite_where=sa.text('user_id IS NOT NULL'),
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name not in ('postgresql', 'sqlite'):
+        return
+    op.drop_index('uq_dashboard_rollup_user', table_name='dashboard_rollup')
+    op.drop_index('uq_dashboard_rollup_tenant', table_name='dashboard_rollup')
+    with op.batch_alter_table('dashboard_rollup') as batch:
+        batch.create_unique_constraint('uq_dashboard_rollup_tenant_user', ['tenant_id', 'user_id'])
@@ -0,0 +1,47 @@
+"""notification inbox index and archive table
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2025-10-14 15:10:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e6f7a8b9c0'
+down_revision = 'c4d5e6f7a8b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_notification_user_read_created',
+        'notification',
+        ['user_id', 'read_at', 'created_at'],
+    )
+    op.create_table(
+        'notification_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('motie_id', sa.Integer(), nullable=True),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('read_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ondelete='RESTRICT'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_notification_archive_tenant_id', 'notification_archive', ['tenant_id'])
+    op.create_index('ix_notification_archive_user_id', 'notification_archive', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_archive_user_id', table_name='notification_archive')
+    op.drop_index('ix_notification_archive_tenant_id', table_name='notification_archive')
+    op.drop_table('notification_archive')
+    op.drop_index('ix_notification_user_read_created', table_name='notification')
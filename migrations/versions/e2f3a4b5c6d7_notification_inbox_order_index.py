@@ -0,0 +1,29 @@
+"""notification index for the newest-first inbox
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2025-10-24 10:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f3a4b5c6d7'
+down_revision = 'd1e2f3a4b5c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ix_notification_user_read_created heeft read_at tussen user_id en created_at; de
+    # ongefilterde inbox (user_id, ORDER BY created_at, id) moet daarmee alsnog sorteren
+    op.create_index(
+        'ix_notification_user_created_id',
+        'notification',
+        ['user_id', 'created_at', 'id'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_notification_user_created_id', table_name='notification')
@@ -0,0 +1,82 @@
+"""partial indexes for active motie shares
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2025-10-15 09:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f7a8b9c0d1'
+down_revision = 'd5e6f7a8b9c0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name in ('postgresql', 'sqlite'):
+        # uq_share_*_active (motie, doel, actief) stond maar één ingetrokken share per doel
+        # toe; als partiële index geldt de uniciteit alleen nog voor actieve shares
+        with op.batch_alter_table('motie_share') as batch:
+            batch.drop_constraint('uq_share_user_active', type_='unique')
+            batch.drop_constraint('uq_share_party_active', type_='unique')
+        op.create_index(
+            'uq_share_user_active',
+            'motie_share',
+            ['motie_id', 'target_user_id'],
+            unique=True,
+            postgresql_where=sa.text('actief IS true'),
+            sqlite_where=sa.text('actief IS 1'),
+        )
+        op.create_index(
+            'uq_share_party_active',
+            'motie_share',
+            ['motie_id', 'target_party_id'],
+            unique=True,
+            postgresql_where=sa.text('actief IS true'),
+            sqlite_where=sa.text('actief IS 1'),
+        )
+
+    op.create_index(
+        'ix_share_active_user',
+        'motie_share',
+        ['target_user_id', 'motie_id', 'expires_at'],
+        postgresql_where=sa.text('actief IS true'),
+        sqlite_where=sa.text('actief IS 1'),
+    )
+    op.create_index(
+        'ix_share_active_party',
+        'motie_share',
+        ['target_party_id', 'motie_id', 'expires_at'],
+        postgresql_where=sa.text('actief IS true'),
+        sqlite_where=sa.text('actief IS 1'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_share_active_party', table_name='motie_share')
+    op.drop_index('ix_share_active_user', table_name='motie_share')
+
+    bind = op.get_bind()
+    if bind.dialect.name in ('postgresql', 'sqlite'):
+        op.drop_index('uq_share_party_active', table_name='motie_share')
+        op.drop_index('uq_share_user_active', table_name='motie_share')
+        # De oude constraints verdragen maar één ingetrokken share per motie en doel
+        for column in ('target_user_id', 'target_party_id'):
+            op.execute(
+                f"""
+                DELETE FROM motie_share
+                WHERE actief = false AND {column} IS NOT NULL AND id NOT IN (
+                    SELECT MAX(id) FROM motie_share
+                    WHERE actief = false AND {column} IS NOT NULL
+                    GROUP BY motie_id, {column}
+                )
+                """
+            )
+        with op.batch_alter_table('motie_share') as batch:
+            batch.create_unique_constraint('uq_share_user_active', ['motie_id', 'target_user_id', 'actief'])
+            batch.create_unique_constraint('uq_share_party_active', ['motie_id', 'target_party_id', 'actief'])
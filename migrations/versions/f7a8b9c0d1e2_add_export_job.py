@@ -0,0 +1,48 @@
+"""export jobs for background exports
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2025-10-15 14:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a8b9c0d1e2'
+down_revision = 'e6f7a8b9c0d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'export_job',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('done', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('result_path', sa.String(length=500), nullable=True),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ondelete='RESTRICT'),
+        sa.ForeignKeyConstraint(['created_by_id'], ['user.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_export_job_tenant_id', 'export_job', ['tenant_id'])
+    op.create_index('ix_export_job_created_by_id', 'export_job', ['created_by_id'])
+    op.create_index('ix_export_job_status', 'export_job', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_export_job_status', table_name='export_job')
+    op.drop_index('ix_export_job_created_by_id', table_name='export_job')
+    op.drop_index('ix_export_job_tenant_id', table_name='export_job')
+    op.drop_table('export_job')
@@ -0,0 +1,128 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from docx.oxml.ns import qn
+from lxml import etree
+
+from app.exporters.motie_docx import _parsed_template, _plain_text, render_export_data_to_docx_bytes
+from app.exporters.motie_native import _structure, compare_renderers, render_native
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATE = ROOT / "app" / "templates_word" / "motie.docx"
+LOGO = str(ROOT / "app" / "static" / "img" / "logo_small.png")
+
+
+def _signer(i, afkorting="GL"):
+    return {"naam": f"Raadslid {i}", "partij": "GroenLinks", "afkorting": afkorting}
+
+
+def _party(i, logo=True):
+    return {"id": i, "naam": f"Partij {i}", "afkorting": f"P{i}", "logo_path": LOGO if logo else None}
+
+
+def _data(**override):
+    data = {
+        "titel": "Groen schoolplein",
+        "opdracht_formulering": "Verzoekt het college:",
+        "gemeenteraad_datum": "12 maart 2026",
+        "agendapunt": "Begroting 2026",
+        "constaterende_dat": ["er weinig groen is", "kinderen buiten spelen"],
+        "overwegende_dat": ["groen verkoelt"],
+        "draagt_college_op": ["een plan te maken"],
+        "ondertekenaars": [_signer(1), _signer(2)],
+        "partijen": [_party(1), _party(2)],
+    }
+    data.update(override)
+    return data
+
+
+CASES = {
+    "gewoon": _data(),
+    "zonder_agendapunt": _data(agendapunt=""),
+    "speciale_tekens": _data(
+        titel="Zon & wind <nu>",
+        constaterende_dat=["kosten < baten & meer"],
+        ondertekenaars=[_signer(1, afkorting="R&W")],
+    ),
+    "crlf": _data(
+        opdracht_formulering=_plain_text("Verzoekt\r\nhet college:"),
+        constaterende_dat=["eerste\r\nregel", "tweede"],
+        draagt_college_op=["doe\r\ndit"],
+    ),
+    "zes_ondertekenaars": _data(ondertekenaars=[_signer(i) for i in range(1, 7)]),
+    "partij_zonder_logo": _data(partijen=[_party(1), _party(2, logo=False)]),
+    "zonder_partijen": _data(partijen=[], ondertekenaars=[]),
+    "zeven_partijen": _data(partijen=[_party(i) for i in range(1, 8)]),
+}
+
+
+def _body(data, renderer="docxtpl"):
+    content, _ = render_export_data_to_docx_bytes(data, TEMPLATE, renderer)
+    root = etree.fromstring(zipfile.ZipFile(io.BytesIO(content)).read("word/document.xml"))
+    return root.find(qn("w:body"))
+
+
+def _text(body):
+    return "".join(t.text or "" for t in body.iter(qn("w:t")))
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_native_renders_without_fallback(name):
+    # Anders vergelijkt de pariteitstest docxtpl met zichzelf
+    assert render_native(CASES[name], _parsed_template(TEMPLATE)) is not None
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_native_matches_docxtpl(name):
+    assert compare_renderers(CASES[name], TEMPLATE) is None
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_native_document_xml_is_structurally_equal(name):
+    # Ook de vergelijkingsvorm zelf: zelfde elementen in dezelfde volgorde
+    docxtpl, _ = render_export_data_to_docx_bytes(CASES[name], TEMPLATE, "docxtpl")
+    native, _ = render_export_data_to_docx_bytes(CASES[name], TEMPLATE, "native")
+    assert etree.tostring(_structure(docxtpl)) == etree.tostring(_structure(native))
+
+
+# ---- vastgelegde docxtpl-uitvoer -------------------------------------------------
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_lists_are_paragraphs_not_nested_in_runs(name):
+    body = _body(CASES[name])
+    assert not [p for p in body.iter(qn("w:p")) if p.getparent().tag in (qn("w:r"), qn("w:t"))]
+
+
+def test_special_characters_are_escaped():
+    text = _text(_body(CASES["speciale_tekens"]))
+    assert "Zon & wind <nu>" in text
+    assert "kosten < baten & meer" in text
+    assert "R&W" in text
+
+
+def test_all_signatories_are_rendered():
+    text = _text(_body(CASES["zes_ondertekenaars"]))
+    for i in range(1, 7):
+        assert f"Raadslid {i}" in text
+
+
+def test_missing_logo_renders_nothing():
+    body = _body(CASES["partij_zonder_logo"])
+    assert "None" not in _text(body)
+    assert len(list(body.iter(qn("a:blip")))) == 1
+
+
+def test_no_parties_drops_empty_tables():
+    body = _body(CASES["zonder_partijen"])
+    assert all(tbl.find(qn("w:tr")) is not None for tbl in body.iter(qn("w:tbl")))
+    assert "Raadslid" not in _text(body)
+
+
+def test_crlf_becomes_line_break():
+    body = _body(CASES["crlf"])
+    assert "\r" not in _text(body)
+    assert "Verzoekt" in _text(body) and "het college:" in _text(body)
+    assert len(list(body.iter(qn("w:br")))) >= 3
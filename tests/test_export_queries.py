@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.exporters.motie_docx import motie_export_data, motie_export_query
+from app.models import Motie, Party, User
+
+
+class _Config(TestingConfig):
+    # De standaardopties zijn voor PostgreSQL (connect_timeout)
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    RESEND_API_KEY = ""
+
+
+@pytest.fixture
+def app(tmp_path):
+    _Config.PARTY_LOGO_CACHE_DIR = str(tmp_path / "logos")
+    app = create_app(_Config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _seed(count):
+    parties = [Party(naam=f"Partij {i}", afkorting=f"P{i}") for i in range(3)]
+    db.session.add_all(parties)
+    db.session.flush()
+    users = [
+        User(email=f"lid{i}@example.org", password_hash="x", naam=f"Lid {i}", partij_id=parties[i % 3].id)
+        for i in range(6)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    for i in range(count):
+        motie = Motie(titel=f"Motie {i}", opdracht_formulering="Verzoekt het college:", indiener_id=users[i % 6].id)
+        motie.mede_indieners = [u for u in users if u.id != motie.indiener_id][: 1 + i % 4]
+        db.session.add(motie)
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def _export_statements():
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        data = [motie_export_data(m) for m in motie_export_query().order_by(Motie.id).all()]
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return data, statements
+
+
+def test_export_query_count_does_not_grow_with_motions(app):
+    _seed(1)
+    data_one, one = _export_statements()
+    assert len(data_one) == 1
+
+    db.drop_all()
+    db.create_all()
+    _seed(50)
+    data_many, many = _export_statements()
+    assert len(data_many) == 50
+
+    assert len(many) == len(one), many
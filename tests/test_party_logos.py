@@ -0,0 +1,48 @@
+import time
+import urllib.error
+
+from app.exporters import party_logos
+from app.exporters.party_logos import PartyLogoStore
+
+URL = "https://logo.invalid/partij.png"
+
+
+def _dead_urlopen(calls):
+    def urlopen(request, timeout=None):
+        calls.append(request.full_url)
+        raise urllib.error.URLError("onbereikbaar")
+    return urlopen
+
+
+def test_failed_first_download_is_not_retried_synchronously(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(party_logos.urllib.request, "urlopen", _dead_urlopen(calls))
+    started = []
+    monkeypatch.setattr(PartyLogoStore, "refresh_async", lambda self, pid, url: started.append(url))
+    store = PartyLogoStore(tmp_path, revalidate_seconds=3600)
+
+    for _ in range(5):
+        assert store.resolve(1, None, URL, str(tmp_path)) is None
+    assert calls == [URL]
+    assert started == []
+
+    meta = store._read_meta(store._base(1, URL))
+    assert meta["failed"] is True
+
+
+def test_failed_download_retries_in_background_after_revalidate(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(party_logos.urllib.request, "urlopen", _dead_urlopen(calls))
+    started = []
+    monkeypatch.setattr(PartyLogoStore, "refresh_async", lambda self, pid, url: started.append(url))
+    store = PartyLogoStore(tmp_path, revalidate_seconds=3600)
+    assert store.resolve(1, None, URL, str(tmp_path)) is None
+
+    base = store._base(1, URL)
+    meta = store._read_meta(base)
+    meta["checked_at"] = time.time() - 7200
+    store._write_meta(base, meta)
+
+    assert store.resolve(1, None, URL, str(tmp_path)) is None
+    assert calls == [URL]
+    assert started == [URL]
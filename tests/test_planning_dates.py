@@ -0,0 +1,21 @@
+from datetime import date
+
+import pandas as pd
+
+from app.griffie.routes import categorize_planning_dates, normalize_planning_dates
+
+REFERENCE = date(2026, 1, 15)
+
+
+def test_categorize_without_any_planning_date():
+    dates = normalize_planning_dates(pd.Series(["", None, "tbd"]))
+    result = categorize_planning_dates(dates, REFERENCE)
+    assert result["display"].tolist() == ["", "", ""]
+    assert result["category"].tolist() == [None, None, None]
+
+
+def test_categorize_mixed_dates():
+    dates = pd.Series(pd.to_datetime(["2026-02-01", None, "2026-05-10", "2026-11-03", "2026-02-01"]))
+    result = categorize_planning_dates(dates, REFERENCE)
+    assert result["display"].tolist() == ["1 februari 2026", "", "mei 2026", "Q4 2026", "1 februari 2026"]
+    assert result["category"].tolist() == ["exact", None, "month", "quarter", "exact"]
@@ -0,0 +1,41 @@
+import csv
+import io
+
+from openpyxl import load_workbook
+
+from app.exporters.register import REGISTER_COLUMNS, iter_register_csv, write_register_xlsx
+
+DANGEROUS = [
+    '=HYPERLINK("http://evil.example","klik")',
+    "+31 6 1234",
+    "-2+3",
+    "@SUM(A1:A2)",
+    "\tTab",
+    "\rReturn",
+]
+
+
+def _rows():
+    for i, titel in enumerate(DANGEROUS, start=1):
+        yield [i, titel, "Concept", "", "", "", "", "Anna", "", "", ""]
+
+
+def test_csv_escapes_formula_like_text():
+    data = b"".join(iter_register_csv(_rows())).decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(data), delimiter=";"))
+    assert rows[0] == [name for name, _width in REGISTER_COLUMNS]
+    assert [row[1] for row in rows[1:]] == ["'" + value for value in DANGEROUS]
+    # Getallen en gewone tekst blijven ongewijzigd
+    assert rows[1][0] == "1"
+    assert rows[1][2] == "Concept"
+
+
+def test_xlsx_stores_formula_like_text_as_string():
+    fh = io.BytesIO()
+    write_register_xlsx(_rows(), fh)
+    fh.seek(0)
+    ws = load_workbook(fh)["Motieregister"]
+    cells = [ws.cell(row=i, column=2) for i in range(2, len(DANGEROUS) + 2)]
+    assert [cell.value for cell in cells] == DANGEROUS
+    assert all(cell.data_type == "s" for cell in cells)
+    assert ws.cell(row=2, column=1).value == 1